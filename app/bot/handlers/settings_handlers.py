@@ -165,13 +165,14 @@ async def preview_style(callback: CallbackQuery, state: FSMContext) -> None:
     user_id = callback.from_user.id
     
     # Get current user settings
-    title_color = await UserSettingsService.get_style_setting(user_id, 'title_style', 'color')
-    title_size = await UserSettingsService.get_style_setting(user_id, 'title_style', 'size')
-    title_font = await UserSettingsService.get_style_setting(user_id, 'title_style', 'font')
+    styles = await UserSettingsService.get_style_settings(user_id, 'title_style', 'subtitle_style')
+    title_color = styles['title_style']['color']
+    title_size = styles['title_style']['size']
+    title_font = styles['title_style']['font']
     
-    subtitle_color = await UserSettingsService.get_style_setting(user_id, 'subtitle_style', 'color')
-    subtitle_size = await UserSettingsService.get_style_setting(user_id, 'subtitle_style', 'size')
-    subtitle_font = await UserSettingsService.get_style_setting(user_id, 'subtitle_style', 'font')
+    subtitle_color = styles['subtitle_style']['color']
+    subtitle_size = styles['subtitle_style']['size']
+    subtitle_font = styles['subtitle_style']['font']
     
     # Get human-readable names
     title_color_name = UserSettingsService.get_color_name(title_color)
@@ -525,9 +526,10 @@ async def show_text_settings(callback: CallbackQuery, callback_data: StyleAction
     
     # Get current user settings
     settings_key = f"{text_type}_style"
-    current_color = await UserSettingsService.get_style_setting(user_id, settings_key, 'color')
-    current_size = await UserSettingsService.get_style_setting(user_id, settings_key, 'size')
-    current_font = await UserSettingsService.get_style_setting(user_id, settings_key, 'font')
+    style = (await UserSettingsService.get_style_settings(user_id, settings_key))[settings_key]
+    current_color = style['color']
+    current_size = style['size']
+    current_font = style['font']
     
     # Get human-readable names
     color_name = UserSettingsService.get_color_name(current_color)
@@ -26,7 +26,7 @@ from app.bot.keyboards.main_menu import (
 from app.config.constants import VideoStatus, SUPPORTED_SOURCES, ERROR_MESSAGES, SUCCESS_MESSAGES
 from app.database.connection import get_db_session
 from app.database.models import VideoTask, User, VideoFragment
-from app.services.redis_service import redis_client
+from app.services.redis_service import redis_client, get_task_progress
 
 logger = logging.getLogger(__name__)
 router = Router()
@@ -1191,12 +1191,14 @@ async def refresh_task_status(callback: CallbackQuery, callback_data: VideoTaskA
         elapsed_minutes = int(elapsed.total_seconds() / 60)
         elapsed_seconds = int(elapsed.total_seconds() % 60)
         
+        progress = await get_task_progress(task)
+        
         text = f"""
 🔄 <b>Статус задачи</b>
 
 📋 ID: <code>{task_id}</code>
 {status_emoji} Статус: {status_text}
-⏱️ Прогресс: {task.progress or 0}%
+⏱️ Прогресс: {progress}%
 🕐 Время выполнения: {elapsed_minutes} мин {elapsed_seconds} сек
 
 <b>Детали:</b>
@@ -1375,7 +1377,7 @@ async def refresh_task_status(callback: CallbackQuery, callback_data: VideoTaskA
                     VideoStatus.UPLOADING: "📤 Загрузка в облако..."
                 }
                 
-                progress = task.progress or 0
+                progress = await get_task_progress(task)
                 await callback.message.edit_text(
                     f"🔄 <b>Обработка в процессе</b>\n\n"
                     f"📋 ID задачи: <code>{task_id}</code>\n"
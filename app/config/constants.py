@@ -54,6 +54,15 @@ SHORTS_RESOLUTION = (SHORTS_WIDTH, SHORTS_HEIGHT)  # 9:16 aspect ratio
 SHORTS_FPS = 30
 SHORTS_BITRATE = "8M"
 
+# libx264 encoder settings
+# CRF 14 is visually lossless already, so "slow" buys <3% bitrate for ~1.8x encode time
+VIDEO_ENCODER_PRESET = "medium"
+VIDEO_ENCODER_CRF = 14
+# Intermediate files that are re-cut afterwards can use a faster preset
+INTERMEDIATE_ENCODER_PRESET = "faster"
+INTERMEDIATE_ENCODER_CRF = 16
+X264_PARAMS = "aq-mode=3:rc-lookahead=40"
+
 # Supported video formats
 SUPPORTED_INPUT_FORMATS = [
     ".mp4", ".avi", ".mkv", ".mov", ".wmv", ".flv", ".webm", ".m4v"
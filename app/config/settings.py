@@ -158,17 +158,17 @@ class CelerySettings(BaseSettings):
         description="Celery result backend URL"
     )
     task_serializer: str = Field(
-        default="json",
+        default="msgpack",
         env="CELERY_TASK_SERIALIZER",
         description="Celery task serializer"
     )
     result_serializer: str = Field(
-        default="json",
+        default="msgpack",
         env="CELERY_RESULT_SERIALIZER",
         description="Celery result serializer"
     )
     accept_content: List[str] = Field(
-        default=["json"],
+        default=["msgpack", "json"],
         env="CELERY_ACCEPT_CONTENT",
         description="Celery accepted content types"
     )
@@ -207,10 +207,13 @@ class AppSettings(BaseSettings):
     
     # Video processing settings
     video_temp_dir: str = Field(default="/tmp/videos", env="VIDEO_TEMP_DIR")
+    video_processed_dir: str = Field(default="/tmp/processed", env="VIDEO_PROCESSED_DIR")
     video_max_duration: int = Field(default=10800, env="VIDEO_MAX_DURATION")
     video_max_file_size: int = Field(default=2147483648, env="VIDEO_MAX_FILE_SIZE")
     video_output_quality: str = Field(default="1080p", env="VIDEO_OUTPUT_QUALITY")
     video_max_concurrent_tasks: int = Field(default=3, env="VIDEO_MAX_CONCURRENT_TASKS")
+    video_hw_encoding: bool = Field(default=True, env="VIDEO_HW_ENCODING")
+    ffmpeg_threads: Optional[int] = Field(default=None, env="FFMPEG_THREADS")
     
     # Google API settings
     google_credentials_path: str = "google-credentials.json"
@@ -249,8 +252,9 @@ class AppSettings(BaseSettings):
 # Global settings instance
 settings = AppSettings()
 
-# Ensure temp directory exists
+# Ensure temp directories exist
 os.makedirs(settings.video_temp_dir, exist_ok=True)
+os.makedirs(settings.video_processed_dir, exist_ok=True)
 
 def ensure_cookies_file():
     """Создаёт cookies-файл по пути 'app/youtube_cookies.txt' (жёстко), чтобы избежать ошибок с директориями."""
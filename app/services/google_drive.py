@@ -6,7 +6,9 @@ import os
 import json
 import base64
 import logging
-from typing import Dict, Any, List, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Optional
 from pathlib import Path
 import pickle
 
@@ -14,6 +16,8 @@ from google.oauth2 import service_account
 from google_auth_oauthlib.flow import Flow
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
+import httplib2
 from googleapiclient.discovery import build
 from googleapiclient.http import MediaFileUpload
 from googleapiclient.errors import HttpError
@@ -27,6 +31,9 @@ SCOPES = ['https://www.googleapis.com/auth/drive']
 # Target folder ID for all processed videos
 TARGET_FOLDER_ID = "1q3DdrbnGRSAKL6Omiy6t0MghP4ZGtiTn"
 
+# Сколько файлов загружаем в Drive одновременно
+UPLOAD_MAX_WORKERS = 8
+
 def get_google_credentials() -> Optional[Any]:
     """
     Get Google OAuth credentials from token.pickle file or environment variable.
@@ -199,6 +206,8 @@ class GoogleDriveService:
         """Initialize Google Drive service."""
         self.credentials = get_google_credentials()
         self.auth_type = "none"
+        # httplib2 не потокобезопасен: у каждого потока загрузки свой HTTP-клиент
+        self._local = threading.local()
         
         if self.credentials:
             # Determine authentication type
@@ -235,13 +244,21 @@ class GoogleDriveService:
             "oauth_url": get_oauth_authorization_url() if self.auth_type == "none" else None
         }
     
+    def _thread_http(self) -> AuthorizedHttp:
+        """Get the authorized HTTP client of the current thread."""
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            http = AuthorizedHttp(self.credentials, http=httplib2.Http())
+            self._local.http = http
+        return http
+    
     def _execute_request(self, request):
         """Execute a Google API request with error handling."""
         if not self.service:
             logger.warning("Attempted to execute request with mock service.")
             return None
         try:
-            return request.execute()
+            return request.execute(http=self._thread_http())
         except HttpError as error:
             logger.error(f'An error occurred: {error}')
             return None
@@ -348,7 +365,7 @@ class GoogleDriveService:
             
             if result:
                 # Get file metadata to construct direct download link
-                file_metadata = self.service.files().get(fileId=file_id, fields='id,name,webViewLink').execute()
+                file_metadata = self.service.files().get(fileId=file_id, fields='id,name,webViewLink').execute(http=self._thread_http())
                 
                 # Create direct download link
                 direct_link = f"https://drive.google.com/uc?id={file_id}&export=download"
@@ -528,8 +545,55 @@ class GoogleDriveService:
                 "error": str(e)
             }
     
-    def upload_multiple_files(self, file_paths: List[str], task_id: str = None) -> List[Dict[str, Any]]:
-        """Upload multiple files to the target folder (or user's Drive root for OAuth)."""
+    def _upload_to_folder(self, file_path: str, folder_id: Optional[str]) -> Dict[str, Any]:
+        """Upload one file of a batch and describe the outcome."""
+        if not os.path.exists(file_path):
+            logger.warning(f"File not found, skipping upload: {file_path}")
+            return {
+                "success": False,
+                "file_path": file_path,
+                "error": "File not found"
+            }
+        
+        result = self.upload_file(file_path, folder_id)
+        if result and result.get('id'):
+            logger.info(f"Successfully uploaded and made public: {os.path.basename(file_path)}")
+            return {
+                "success": True,
+                "file_path": file_path,
+                "file_name": result.get('name'),
+                "file_id": result.get('id'),
+                "file_url": result.get('webViewLink'),
+                "direct_url": result.get('directLink'),
+                "size_bytes": int(result.get('size', 0)),
+                "public": result.get('public', False)
+            }
+        
+        logger.error(f"Failed to upload: {file_path}")
+        return {
+            "success": False,
+            "file_path": file_path,
+            "error": "Upload failed"
+        }
+    
+    def upload_multiple_files(
+        self,
+        file_paths: List[str],
+        task_id: str = None,
+        on_uploaded: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Upload multiple files to the target folder (or user's Drive root for OAuth).
+        
+        Args:
+            file_paths: Files to upload
+            task_id: Video task ID, names the OAuth folder
+            on_uploaded: Called with each file's result as soon as that file
+                is done (from an upload thread, in completion order)
+            
+        Returns:
+            Upload results in the order of file_paths
+        """
         if not self.service:
             results = []
             for file_path in file_paths:
@@ -571,37 +635,20 @@ class GoogleDriveService:
 
         logger.info(f"Uploading {len(file_paths)} files to '{folder_name_display}' (ID: {target_folder_id}) for task {task_id or 'unknown'}")
 
+        # Все загрузки отправляются сразу, результаты собираются в исходном порядке
         upload_results = []
-        for file_path in file_paths:
-            if not os.path.exists(file_path):
-                logger.warning(f"File not found, skipping upload: {file_path}")
-                upload_results.append({
-                    "success": False,
-                    "file_path": file_path,
-                    "error": "File not found"
-                })
-                continue
+        if file_paths:
+            def upload_one(file_path: str) -> Dict[str, Any]:
+                result = self._upload_to_folder(file_path, target_folder_id)
+                if on_uploaded:
+                    try:
+                        on_uploaded(result)
+                    except Exception as e:
+                        logger.warning(f"Upload callback failed for {file_path}: {e}")
+                return result
             
-            result = self.upload_file(file_path, target_folder_id)
-            if result and result.get('id'):
-                upload_results.append({
-                    "success": True,
-                    "file_path": file_path,
-                    "file_name": result.get('name'),
-                    "file_id": result.get('id'),
-                    "file_url": result.get('webViewLink'),
-                    "direct_url": result.get('directLink'),
-                    "size_bytes": int(result.get('size', 0)),
-                    "public": result.get('public', False)
-                })
-                logger.info(f"Successfully uploaded and made public: {os.path.basename(file_path)}")
-            else:
-                upload_results.append({
-                    "success": False,
-                    "file_path": file_path,
-                    "error": "Upload failed"
-                })
-                logger.error(f"Failed to upload: {file_path}")
+            with ThreadPoolExecutor(max_workers=min(len(file_paths), UPLOAD_MAX_WORKERS)) as executor:
+                upload_results = list(executor.map(upload_one, file_paths))
 
         # Log summary
         successful_uploads = [r for r in upload_results if r.get("success")]
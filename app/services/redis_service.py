@@ -1,9 +1,22 @@
 """
 Redis service for caching and locking.
 """
+import logging
+from typing import Optional
+
+import redis as redis_sync
 import redis.asyncio as redis
+from app.config.constants import VideoStatus
 from app.config.settings import settings
 
+logger = logging.getLogger(__name__)
+
+# Промежуточный прогресс обработки живёт только в Redis, в Postgres пишутся контрольные точки
+TASK_PROGRESS_KEY = "task:{task_id}:progress"
+TASK_PROGRESS_TTL = 3600
+# Счётчик готовых чанков, когда чанки обрабатываются параллельно
+TASK_CHUNKS_DONE_KEY = "task:{task_id}:chunks_done"
+
 # Create an asynchronous Redis client instance
 redis_client = redis.from_url(
     settings.redis_url,
@@ -11,6 +24,13 @@ redis_client = redis.from_url(
     decode_responses=True
 )
 
+# Synchronous client for Celery workers (connects on first use)
+redis_sync_client = redis_sync.from_url(
+    settings.redis_url,
+    encoding="utf-8",
+    decode_responses=True
+)
+
 async def check_redis_connection():
     """
     Check if the connection to Redis is successful.
@@ -21,4 +41,84 @@ async def check_redis_connection():
         return True
     except Exception as e:
         print(f"Failed to connect to Redis: {e}")
-        return False 
\ No newline at end of file
+        return False 
+
+
+def set_task_progress(task_id: str, progress: int) -> bool:
+    """
+    Store intermediate task progress in Redis.
+    
+    Args:
+        task_id: Video task ID
+        progress: Progress percentage
+        
+    Returns:
+        True if stored, False if Redis is unavailable
+    """
+    try:
+        redis_sync_client.set(TASK_PROGRESS_KEY.format(task_id=task_id), progress, ex=TASK_PROGRESS_TTL)
+        return True
+    except Exception as e:
+        logger.warning(f"Failed to store progress of task {task_id} in Redis: {e}")
+        return False
+
+
+async def get_task_progress(task) -> int:
+    """
+    Get the latest progress of a task.
+    
+    While a task is processing or uploading, Redis may hold a value ahead
+    of the last checkpoint written to the database.
+    
+    Args:
+        task: VideoTask model instance
+        
+    Returns:
+        Progress percentage
+    """
+    db_progress = task.progress or 0
+    if task.status not in (VideoStatus.PROCESSING, VideoStatus.UPLOADING):
+        return db_progress
+    try:
+        value = await redis_client.get(TASK_PROGRESS_KEY.format(task_id=task.id))
+    except Exception as e:
+        logger.warning(f"Failed to read progress of task {task.id} from Redis: {e}")
+        return db_progress
+    return max(db_progress, int(value)) if value else db_progress
+
+
+def count_finished_chunk(task_id: str) -> Optional[int]:
+    """
+    Count one more finished chunk of a task whose chunks run in parallel.
+    
+    Args:
+        task_id: Video task ID
+        
+    Returns:
+        Number of chunks finished so far, None if Redis is unavailable
+    """
+    key = TASK_CHUNKS_DONE_KEY.format(task_id=task_id)
+    try:
+        pipe = redis_sync_client.pipeline()
+        pipe.incr(key)
+        pipe.expire(key, TASK_PROGRESS_TTL)
+        return pipe.execute()[0]
+    except Exception as e:
+        logger.warning(f"Failed to count finished chunk of task {task_id} in Redis: {e}")
+        return None
+
+
+def clear_task_progress(task_id: str) -> None:
+    """
+    Drop the intermediate progress keys of a task, e.g. before it is re-run.
+    
+    Args:
+        task_id: Video task ID
+    """
+    try:
+        redis_sync_client.delete(
+            TASK_PROGRESS_KEY.format(task_id=task_id),
+            TASK_CHUNKS_DONE_KEY.format(task_id=task_id)
+        )
+    except Exception as e:
+        logger.warning(f"Failed to clear progress of task {task_id} in Redis: {e}")
@@ -153,6 +153,27 @@ class UserSettingsService:
         return settings.get(text_type, {}).get(style_key, 
                            UserSettingsService.DEFAULT_SETTINGS[text_type][style_key])
     
+    @staticmethod
+    async def get_style_settings(user_id: int, *text_types: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Get complete style settings for several text types with one settings read.
+        
+        Args:
+            user_id: Telegram user ID
+            *text_types: 'title_style' and/or 'subtitle_style'
+            
+        Returns:
+            Dict mapping each text type to its color/size/font with defaults applied
+        """
+        settings = await UserSettingsService.get_user_settings(user_id)
+        return {
+            text_type: {
+                **UserSettingsService.DEFAULT_SETTINGS[text_type],
+                **settings.get(text_type, {})
+            }
+            for text_type in text_types
+        }
+    
     @staticmethod
     async def set_style_setting(user_id: int, text_type: str, style_key: str, value: Any) -> bool:
         """
@@ -2,6 +2,8 @@
 Video processor module using FFmpeg for cutting and converting videos.
 """
 import os
+import re
+import glob
 import tempfile
 import logging
 import subprocess
@@ -10,6 +12,18 @@ from pathlib import Path
 import json
 import uuid
 import signal
+import functools
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+try:
+    # PyAV ships with faster-whisper; without it probing falls back to ffprobe
+    import av
+except ImportError:
+    av = None
 
 from app.config.constants import (
     SHORTS_RESOLUTION, 
@@ -17,7 +31,11 @@ from app.config.constants import (
     SHORTS_BITRATE,
     MIN_FRAGMENT_DURATION,
     MAX_FRAGMENT_DURATION,
-    get_subtitle_font_path,
+    VIDEO_ENCODER_PRESET,
+    VIDEO_ENCODER_CRF,
+    INTERMEDIATE_ENCODER_PRESET,
+    INTERMEDIATE_ENCODER_CRF,
+    X264_PARAMS,
     get_subtitle_font_name,
     get_subtitle_font_dir
 )
@@ -61,25 +79,286 @@ TEXT_SIZE_PRESETS = {
     'extra_large': {'title': 0.04, 'subtitle': 0.07}, # Уменьшено с 0.06
 }
 
+# Именованные цвета для ASS субтитров (RRGGBB)
+ASS_NAMED_COLORS = {
+    'white': 'FFFFFF',
+    'black': '000000',
+    'red': 'FF0000',
+    'yellow': 'FFFF00',
+    'orange': 'FFA500',
+    'blue': '0000FF',
+    'green': '008000',
+}
+
+# Аппаратные H.264 энкодеры в порядке приоритета и их настройки качества
+HW_ENCODER_OPTIONS = {
+    # p4 + adaptive quantization: the AQ passes win back the quality of p5 at a higher frame rate
+    'h264_nvenc': [
+        '-preset', 'p4', '-tune', 'hq', '-rc', 'vbr', '-cq', '19', '-b:v', '0',
+        '-spatial_aq', '1', '-temporal_aq', '1', '-bf', '3',
+    ],
+    'h264_qsv': ['-preset', 'medium', '-global_quality', '19', '-look_ahead', '1'],
+    'h264_vaapi': ['-rc_mode', 'CQP', '-qp', '19'],
+    'h264_videotoolbox': ['-b:v', SHORTS_BITRATE],
+}
+
+# FFmpeg пишет в stderr только ошибки, без баннера и статистики прогресса
+FFMPEG_QUIET_ARGS = ['-hide_banner', '-loglevel', 'error', '-nostats']
+
+# Из stderr в памяти держится только хвост, для сообщения об ошибке его хватает
+FFMPEG_STDERR_TAIL_LINES = 256
+
+# Текстовые дорожки субтитров, которые ffmpeg конвертирует в WebVTT
+TEXT_SUBTITLE_CODECS = {'subrip', 'ass', 'ssa', 'mov_text', 'webvtt', 'text'}
+WEBVTT_CUE_RE = re.compile(r'((?:\d+:)?\d{2}:\d{2}\.\d{3})\s+-->\s+((?:\d+:)?\d{2}:\d{2}\.\d{3})')
+WEBVTT_TAG_RE = re.compile(r'<[^>]+>')
+
+# Экранирование текста для drawtext за один проход (str.translate).
+# Обратный слеш экранируется вместе с остальными символами, а не после них,
+# поэтому уже добавленные escape-последовательности не удваиваются
+DRAWTEXT_TITLE_ESCAPES = str.maketrans({'\\': '\\\\', "'": "\\'", ':': '\\:'})
+
+# Фон размывается в уменьшенном кадре: стоимость размытия пропорциональна площади,
+# а после растягивания sigma 5 на 1/4 разрешения выглядит как sigma 20.
+# Два прохода boxblur радиуса 6 дают sigma ~5.3 за O(1) на пиксель вместо ядра gblur
+BG_BLUR_DOWNSCALE = 4
+BG_BLUR_RADIUS = 6
+BG_BLUR_PASSES = 2
+
+# Промежуточные файлы пишутся фрагментированным MP4: moov в начале без
+# финальной перезаписи файла, и ffmpeg может читать его во время записи
+FRAGMENTED_MP4_MOVFLAGS = '+frag_keyframe+empty_moov+default_base_moof'
+
+# Минимальная длительность диапазона для process_video_ffmpeg_parallel, сек
+PARALLEL_MIN_RANGE_DURATION = 60
+
+# VAAPI принимает только кадры, загруженные на устройство
+# Первый render node хоста (Intel/AMD), renderD128 если их не видно
+VAAPI_DEVICE = (sorted(glob.glob('/dev/dri/renderD*')) or ['/dev/dri/renderD128'])[0]
+VAAPI_UPLOAD_FILTER = 'format=nv12,hwupload'
+
+# Декодирование на GPU для путей без фильтров: кадры сразу идут в энкодер
+HW_DECODE_ARGS = {
+    'h264_nvenc': ['-hwaccel', 'cuda', '-hwaccel_output_format', 'cuda'],
+    'h264_vaapi': ['-hwaccel', 'vaapi', '-hwaccel_device', VAAPI_DEVICE, '-hwaccel_output_format', 'vaapi'],
+}
+# Декодирование на GPU перед CPU-фильтрами (boxblur, drawtext, ass не умеют работать в VRAM):
+# кадры выгружаются в RAM, а если NVDEC не знает кодек, FFmpeg сам переходит на программный декодер
+HW_FILTERED_DECODE_ARGS = {
+    'h264_nvenc': ['-hwaccel', 'cuda'],
+}
+# Принудительные ключевые кадры должны быть IDR, иначе segment muxer не режет по ним
+HW_FORCED_IDR_ARGS = {
+    'h264_nvenc': ['-forced-idr', '1'],
+}
+
 logger = logging.getLogger(__name__)
 
+# Result of hardware encoder detection, shared by all processors in the process
+_hw_encoder_detected = False
+_hw_encoder: Optional[str] = None
+# Result of the FFmpeg/FFprobe availability check, None until first checked
+_ffmpeg_available: Optional[bool] = None
+
+
+def _probe_with_av(real_path: str) -> Dict[str, Any]:
+    """
+    Probe a media file in-process with PyAV.
+    
+    Returns the same structure as FFprobe's JSON output for the fields
+    get_video_info reads.
+    """
+    with av.open(real_path) as container:
+        streams = []
+        for stream in container.streams:
+            codec_context = stream.codec_context
+            stream_info = {
+                'codec_type': stream.type,
+                'codec_name': codec_context.name if codec_context else 'unknown',
+            }
+            if stream.type == 'video':
+                rate = stream.base_rate or stream.average_rate
+                stream_info.update({
+                    'width': codec_context.width,
+                    'height': codec_context.height,
+                    'pix_fmt': codec_context.pix_fmt or 'unknown',
+                    'r_frame_rate': f"{rate.numerator}/{rate.denominator}" if rate else '30/1',
+                })
+            streams.append(stream_info)
+        
+        return {
+            'streams': streams,
+            'format': {
+                'duration': container.duration / av.time_base if container.duration else 0,
+                'size': container.size,
+                'bit_rate': container.bit_rate or 0,
+            },
+        }
+
+
+@functools.lru_cache(maxsize=256)
+def _run_ffprobe(real_path: str, mtime_ns: int, size: int) -> Dict[str, Any]:
+    """
+    Probe a media file and return FFprobe-style JSON data.
+    
+    PyAV reads the file in-process when it is installed, the ffprobe
+    subprocess is the fallback. Cached by (path, mtime, size), so a
+    rewritten or replaced file gets probed again.
+    """
+    if av is not None:
+        try:
+            return _probe_with_av(real_path)
+        except Exception as e:
+            logger.debug(f"PyAV could not probe {real_path}, using ffprobe: {e}")
+    
+    cmd = [
+        'ffprobe',
+        '-hide_banner',
+        '-loglevel', 'error',
+        '-print_format', 'json',
+        '-show_entries', 'format=duration,size,bit_rate:stream=codec_type,codec_name,width,height,r_frame_rate,pix_fmt',
+        real_path
+    ]
+    
+    result = subprocess.run(cmd, capture_output=True, text=True, check=True, timeout=28800)
+    return json.loads(result.stdout)
+
+
+@functools.lru_cache(maxsize=1)
+def _scan_fonts(fonts_dir: str, mtime_ns: int) -> Dict[str, str]:
+    """
+    Scan the fonts directory for font families.
+    
+    Cached by the directory mtime, which changes when a family is added or removed.
+    """
+    fonts = {}
+    
+    with os.scandir(fonts_dir) as it:
+        entries = sorted(it, key=lambda entry: entry.name)
+    
+    # Add Obelix Pro font specifically
+    for entry in entries:
+        if entry.name == "Obelix Pro.ttf" and entry.is_file():
+            fonts["Obelix Pro"] = entry.path
+            logger.debug(f"Added font: Obelix Pro -> {entry.path}")
+    
+    for family_entry in entries:
+        if not family_entry.is_dir():
+            continue
+        logger.debug(f"Processing font family directory: {family_entry.path}")
+        
+        search_path = family_entry.path
+        static_path = os.path.join(search_path, "static")
+        if os.path.isdir(static_path):
+            search_path = static_path
+        
+        logger.debug(f"Scanning for font files in: {search_path}")
+        with os.scandir(search_path) as it:
+            font_entries = sorted(it, key=lambda entry: entry.name)
+        for font_entry in font_entries:
+            if font_entry.name.lower().endswith(('.ttf', '.otf')) and font_entry.is_file():
+                clean_name = Path(font_entry.name).stem.replace('-', ' ').replace('_', ' ')
+                font_name = f"{family_entry.name} - {clean_name}"
+                
+                if font_name not in fonts:
+                    fonts[font_name] = font_entry.path
+                    logger.debug(f"Added font: {font_name} -> {font_entry.path}")
+    
+    return fonts
+
+
+def _drain_stderr(process: subprocess.Popen) -> Tuple[threading.Thread, deque]:
+    """
+    Read a process's stderr in a background thread keeping only the last lines.
+    
+    Returns:
+        The reader thread and the deque it fills with raw stderr lines
+    """
+    tail = deque(maxlen=FFMPEG_STDERR_TAIL_LINES)
+    
+    def read() -> None:
+        for line in process.stderr:
+            tail.append(line)
+        process.stderr.close()
+    
+    reader = threading.Thread(target=read, daemon=True)
+    reader.start()
+    return reader, tail
+
+
+def _run_ffmpeg(cmd: List[str], timeout: Optional[float] = 28800) -> None:
+    """
+    Run an FFmpeg command keeping only its error output.
+    
+    Progress and banner output are switched off, stdout is discarded and
+    only the last lines of stderr are kept, decoded only when the command fails.
+    
+    Raises:
+        subprocess.CalledProcessError: With decoded stderr if FFmpeg fails
+        subprocess.TimeoutExpired: If FFmpeg does not finish in time
+    """
+    cmd = [cmd[0], *FFMPEG_QUIET_ARGS, *cmd[1:]]
+    process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    reader, stderr_tail = _drain_stderr(process)
+    try:
+        returncode = process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+        raise
+    finally:
+        reader.join()
+    if returncode != 0:
+        raise subprocess.CalledProcessError(
+            returncode, cmd,
+            stderr=b"".join(stderr_tail).decode('utf-8', errors='replace')
+        )
+
 
 class VideoProcessor:
     """Video processor using FFmpeg."""
     
-    def __init__(self, output_dir: Optional[str] = None):
+    def __init__(
+        self,
+        output_dir: Optional[str] = None,
+        preset: str = VIDEO_ENCODER_PRESET,
+        crf: int = VIDEO_ENCODER_CRF
+    ):
         """
         Initialize video processor.
         
         Args:
             output_dir: Directory to save processed videos
+            preset: libx264 preset for final encodes
+            crf: libx264 CRF for final encodes
         """
         self.output_dir = output_dir or tempfile.gettempdir()
         Path(self.output_dir).mkdir(parents=True, exist_ok=True)
+        self.preset = preset
+        self.crf = crf
         
         # Check if FFmpeg is available
         if not self._check_ffmpeg():
             logger.warning("FFmpeg not found. Video processing will be limited.")
+        
+        # Select hardware encoder if available, libx264 otherwise
+        self._v_enc = self._detect_hw_encoder() if settings.video_hw_encoding else None
+        self._v_enc_opts = HW_ENCODER_OPTIONS.get(self._v_enc, [])
+        
+        # Several tasks encode at once, each FFmpeg only gets its share of the cores
+        self.ffmpeg_threads = settings.ffmpeg_threads or max(
+            2, (os.cpu_count() or 1) // max(1, settings.video_max_concurrent_tasks)
+        )
+    
+    def set_output_dir(self, output_dir: str) -> None:
+        """
+        Switch the processor to another output directory, creating it.
+        
+        Args:
+            output_dir: Directory to save processed videos
+        """
+        self.output_dir = output_dir
+        Path(self.output_dir).mkdir(parents=True, exist_ok=True)
     
     @staticmethod
     def create_custom_text_style(
@@ -134,31 +413,25 @@ class VideoProcessor:
             Dict with video information
         """
         try:
-            cmd = [
-                'ffprobe',
-                '-v', 'quiet',
-                '-print_format', 'json',
-                '-show_format',
-                '-show_streams',
-                video_path
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True, timeout=28800)
-            data = json.loads(result.stdout)
+            stat = os.stat(video_path)
+            data = _run_ffprobe(os.path.realpath(video_path), stat.st_mtime_ns, stat.st_size)
             
             # Find video stream
             video_stream = None
             audio_stream = None
-            for stream in data['streams']:
+            subtitle_stream = None
+            for stream in data.get('streams', []):
                 if stream['codec_type'] == 'video':
                     video_stream = stream
                 elif stream['codec_type'] == 'audio':
                     audio_stream = stream
+                elif stream['codec_type'] == 'subtitle' and subtitle_stream is None:
+                    subtitle_stream = stream
             
             if not video_stream:
                 raise ValueError("No video stream found")
             
-            format_info = data['format']
+            format_info = data.get('format', {})
             
             return {
                 'duration': float(format_info.get('duration', 0)),
@@ -171,6 +444,7 @@ class VideoProcessor:
                 'pixel_format': video_stream.get('pix_fmt', 'unknown'),
                 'has_audio': audio_stream is not None,
                 'audio_codec': audio_stream.get('codec_name', 'none') if audio_stream else 'none',
+                'subtitle_codec': subtitle_stream.get('codec_name', 'none') if subtitle_stream else 'none',
             }
             
         except subprocess.CalledProcessError as e:
@@ -180,6 +454,31 @@ class VideoProcessor:
             logger.error(f"Failed to get video info: {e}")
             raise
     
+    def get_video_infos_batch(
+        self,
+        video_paths: List[str],
+        max_workers: int = 8
+    ) -> List[Dict[str, Any]]:
+        """
+        Get video information for several files at once.
+        
+        ffprobe reads a single input, so the probes run concurrently instead of
+        one after another; results already in the probe cache are returned
+        without starting a process.
+        
+        Args:
+            video_paths: Paths to video files
+            max_workers: Maximum number of concurrent ffprobe processes
+            
+        Returns:
+            Video information in the order of video_paths
+        """
+        if len(video_paths) <= 1:
+            return [self.get_video_info(path) for path in video_paths]
+        
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(video_paths))) as executor:
+            return list(executor.map(self.get_video_info, video_paths))
+    
     def create_fragments_precise(
         self, 
         video_path: str, 
@@ -213,75 +512,31 @@ class VideoProcessor:
         total_duration = video_info['duration']
         
         # Calculate fragments with exact timing
-        fragments = []
+        spans = []
         current_time = 0.0
-        fragment_number = 1
         
         while current_time < total_duration:
             # Calculate exact start and end times
             start_time = current_time
             end_time = min(current_time + fragment_duration, total_duration)
-            actual_duration = end_time - start_time
             
             # Skip fragments that are too short
-            if actual_duration < MIN_FRAGMENT_DURATION:
+            if end_time - start_time < MIN_FRAGMENT_DURATION:
                 break
             
-            fragment_filename = f"fragment_{fragment_number:03d}_{uuid.uuid4().hex[:4]}.mp4"
-            fragment_path = os.path.join(self.output_dir, fragment_filename)
-            
-            # Use precise cutting with frame-accurate seeking
-            cmd = [
-                'ffmpeg',
-                '-ss', str(start_time),  # Seek before input for precision
-                '-i', video_path,
-                '-t', str(actual_duration),
-                '-c:v', 'libx264',
+            spans.append((start_time, end_time))
+            current_time = end_time
+        
+        return self._transcode_then_segment(
+            video_path,
+            spans,
+            [
                 '-preset', 'fast',  # Balance between speed and quality
                 '-crf', '20',  # Good quality
-                '-c:a', 'aac',
-                '-b:a', '128k',
-                '-avoid_negative_ts', 'make_zero',
-                '-movflags', '+faststart',
-                '-y',
-                fragment_path
-            ]
-            
-            try:
-                subprocess.run(cmd, check=True, capture_output=True, text=True, timeout=28800)
-                
-                if os.path.exists(fragment_path):
-                    file_size = os.path.getsize(fragment_path)
-                    fragment_info = {
-                        'fragment_number': fragment_number,
-                        'filename': fragment_filename,
-                        'local_path': fragment_path,
-                        'start_time': start_time,
-                        'end_time': end_time,
-                        'duration': actual_duration,
-                        'size_bytes': file_size,
-                        'resolution': f"{video_info['width']}x{video_info['height']}",
-                        'fps': video_info['fps'],
-                        'has_subtitles': False
-                    }
-                    fragments.append(fragment_info)
-                    logger.info(f"Created precise fragment {fragment_number} ({start_time:.2f}s - {end_time:.2f}s): {fragment_filename}")
-                    
-                    # Move to next fragment
-                    current_time = end_time
-                    fragment_number += 1
-                else:
-                    logger.warning(f"Fragment {fragment_number} was not created despite successful FFmpeg command.")
-                    break
-
-            except subprocess.CalledProcessError as e:
-                logger.error(f"Failed to cut precise fragment {fragment_number}. FFmpeg stderr: {e.stderr}")
-                break
-            except subprocess.TimeoutExpired:
-                logger.error(f"Timeout when cutting precise fragment {fragment_number}.")
-                break
-        
-        return fragments
+            ],
+            self._audio_codec_args(video_info, '128k'),
+            video_info
+        )
 
     def create_fragments(
         self, 
@@ -333,7 +588,7 @@ class VideoProcessor:
             # Total fragments to create
             total_fragments = num_full_fragments + (1 if create_remainder_fragment else 0)
         
-        fragments = []
+        spans = []
         
         for i in range(total_fragments):
             # For short videos (less than MIN_FRAGMENT_DURATION), process the entire video
@@ -354,54 +609,131 @@ class VideoProcessor:
                     actual_duration = total_duration - start_time
                     if actual_duration < MIN_FRAGMENT_DURATION and total_duration >= MIN_FRAGMENT_DURATION:
                         break
-
-            fragment_filename = f"fragment_{i+1:03d}_{uuid.uuid4().hex[:4]}.mp4"
-            fragment_path = os.path.join(self.output_dir, fragment_filename)
             
-            # Use precise cutting with minimal re-encoding for accuracy
-            cmd = [
-                'ffmpeg',
-                '-i', video_path,
-                '-ss', str(start_time),  # Moved after -i for more precision
-                '-t', str(actual_duration),
-                '-c:v', 'libx264',  # Light re-encoding for precision
+            spans.append((start_time, start_time + actual_duration))
+        
+        return self._transcode_then_segment(
+            video_path,
+            spans,
+            [
+                # Light re-encoding for precision
                 '-preset', 'ultrafast',  # Fastest encoding preset
                 '-crf', '23',  # Good quality/speed balance
-                '-c:a', 'copy',  # Keep audio as-is for speed
+            ],
+            ['-c:a', 'copy'],  # Keep audio as-is for speed
+            video_info
+        )
+    
+    def _transcode_then_segment(
+        self,
+        video_path: str,
+        spans: List[Tuple[float, float]],
+        x264_args: List[str],
+        audio_args: List[str],
+        video_info: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """
+        Encode the covered range once and split it into fragments by stream copy.
+        
+        Keyframes are forced on every fragment start, so the segment muxer
+        attached to the encoder cuts exactly at the requested times instead of
+        each fragment being decoded and encoded on its own. With NVENC or VAAPI
+        the video is decoded and encoded on the GPU, libx264 is the fallback.
+        
+        Args:
+            video_path: Path to input video
+            spans: Contiguous (start, end) times of the fragments, starting at 0
+            x264_args: libx264 preset/quality arguments for the software path
+            audio_args: Audio codec arguments
+            video_info: Already probed info of the input video
+            
+        Returns:
+            List of fragment information
+            
+        Raises:
+            RuntimeError: If FFmpeg fails or times out, with the tail of its stderr
+        """
+        if not spans:
+            return []
+        
+        segment_times = ",".join(str(start) for start, _ in spans[1:])
+        keyframe_times = ",".join(str(start) for start, _ in spans)
+        segment_prefix = f"fragment_{uuid.uuid4().hex[:8]}_"
+        
+        def build_cmd(hw: bool) -> List[str]:
+            cmd = ['ffmpeg']
+            if hw:
+                # No filters in between, decoded frames go to the encoder without leaving the GPU
+                cmd.extend(HW_DECODE_ARGS[self._v_enc])
+                video_args = [
+                    '-c:v', self._v_enc, *self._v_enc_opts, *HW_FORCED_IDR_ARGS.get(self._v_enc, [])
+                ]
+            else:
+                video_args = ['-c:v', 'libx264', *x264_args]
+            cmd.extend([
+                '-i', video_path,
+                '-t', str(spans[-1][1]),
+                '-map', '0:v:0',
+                '-map', '0:a?',
+                *video_args,
+                *audio_args,
+                '-force_key_frames', keyframe_times,
+                '-f', 'segment',
+            ])
+            if segment_times:
+                cmd.extend(['-segment_times', segment_times])
+            else:
+                # Single fragment: keep the muxer from splitting at all
+                cmd.extend(['-segment_time', str(spans[-1][1] + 1)])
+            cmd.extend([
+                '-reset_timestamps', '1',
+                '-segment_start_number', '1',
+                '-segment_format_options', 'movflags=+faststart',
                 '-avoid_negative_ts', 'make_zero',
                 '-y',
-                fragment_path
-            ]
-            
-            try:
-                subprocess.run(cmd, check=True, capture_output=True, text=True, timeout=28800)
-                
-                if os.path.exists(fragment_path):
-                    file_size = os.path.getsize(fragment_path)
-                    fragment_info = {
-                        'fragment_number': i + 1,
-                        'filename': fragment_filename,
-                        'local_path': fragment_path,
-                        'start_time': start_time,
-                        'end_time': start_time + actual_duration,
-                        'duration': actual_duration,
-                        'size_bytes': file_size,
-                        'resolution': f"{video_info['width']}x{video_info['height']}",
-                        'fps': video_info['fps'],
-                        'has_subtitles': srt_path is not None if 'srt_path' in locals() else False
-                    }
-                    fragments.append(fragment_info)
-                    logger.info(f"Created fragment {i+1}/{num_full_fragments} (exact {actual_duration}s): {fragment_filename}")
-                else:
-                    logger.warning(f"Fragment {i+1} was not created despite successful FFmpeg command.")
-
-            except subprocess.CalledProcessError as e:
-                logger.error(f"Failed to cut fragment {i+1}. FFmpeg stderr: {e.stderr}")
-                # Optionally, skip this fragment and continue
-                continue
-            except subprocess.TimeoutExpired:
-                logger.error(f"Timeout when cutting fragment {i+1}.")
+                os.path.join(self.output_dir, f"{segment_prefix}%03d.mp4")
+            ])
+            return cmd
+        
+        try:
+            if self._v_enc in HW_DECODE_ARGS:
+                try:
+                    _run_ffmpeg(build_cmd(hw=True))
+                except subprocess.CalledProcessError as e:
+                    # E.g. a source codec the GPU decoder doesn't support
+                    logger.warning(f"Hardware cut with {self._v_enc} failed, retrying with libx264: {e.stderr}")
+                    _run_ffmpeg(build_cmd(hw=False))
+            else:
+                _run_ffmpeg(build_cmd(hw=False))
+        except subprocess.CalledProcessError as e:
+            # Один проход режет все фрагменты, поэтому пустой результат выглядел бы как успех
+            logger.error(f"Failed to cut fragments. FFmpeg stderr: {e.stderr}")
+            raise RuntimeError(f"Failed to cut fragments: {(e.stderr or '')[-1000:]}") from e
+        except subprocess.TimeoutExpired as e:
+            logger.error("Timeout when cutting fragments.")
+            raise RuntimeError(f"Timeout when cutting fragments after {e.timeout}s") from e
+        
+        fragment_sizes = self._scan_fragment_sizes(segment_prefix)
+        fragments = []
+        for i, (start_time, end_time) in enumerate(spans):
+            fragment_filename = f"{segment_prefix}{i+1:03d}.mp4"
+            if fragment_filename not in fragment_sizes:
+                logger.warning(f"Fragment {i+1} was not created despite successful FFmpeg command.")
                 continue
+            
+            fragments.append({
+                'fragment_number': i + 1,
+                'filename': fragment_filename,
+                'local_path': os.path.join(self.output_dir, fragment_filename),
+                'start_time': start_time,
+                'end_time': end_time,
+                'duration': end_time - start_time,
+                'size_bytes': fragment_sizes[fragment_filename],
+                'resolution': f"{video_info['width']}x{video_info['height']}",
+                'fps': video_info['fps'],
+                'has_subtitles': False
+            })
+            logger.info(f"Created fragment {i+1}/{len(spans)} ({start_time:.2f}s - {end_time:.2f}s): {fragment_filename}")
         
         return fragments
     
@@ -433,13 +765,11 @@ class VideoProcessor:
             # Build FFmpeg command
             cmd = [
                 'ffmpeg',
+                '-ss', str(start_time),  # Input seek instead of decoding up to start_time
                 '-i', video_path,
-                '-ss', str(start_time),
                 '-t', str(duration),
                 '-vf', self._build_video_filters(output_width, output_height),
-                '-c:v', 'libx264',
-                '-preset', 'slow',
-                '-crf', '14',
+                *self._video_codec_args(),
                 '-r', str(SHORTS_FPS),
                 '-c:a', 'aac',
                 '-b:a', '128k',
@@ -449,25 +779,18 @@ class VideoProcessor:
             ]
             
             # Run FFmpeg
-            result = subprocess.run(
-                cmd, 
-                capture_output=True, 
-                text=True, 
-                check=True,
-                timeout=28800  # 5 minute timeout per fragment
-            )
+            _run_ffmpeg(cmd)
             
-            # Get output file info
+            # Output parameters are fixed by the command, no need to probe the result
             if os.path.exists(output_path):
                 file_size = os.path.getsize(output_path)
-                output_info = self.get_video_info(output_path)
                 
                 return {
                     'local_path': output_path,
                     'size_bytes': file_size,
-                    'resolution': f"{output_info['width']}x{output_info['height']}",
-                    'fps': output_info['fps'],
-                    'bitrate': output_info['bitrate'],
+                    'resolution': f"{output_width}x{output_height}",
+                    'fps': SHORTS_FPS,
+                    'bitrate': int(file_size * 8 / max(duration, 0.01)),
                     'success': True
                 }
             else:
@@ -485,6 +808,131 @@ class VideoProcessor:
     
 
     
+    def _detect_hw_encoder(self) -> Optional[str]:
+        """
+        Detect a usable hardware H.264 encoder.
+        
+        The encoder has to be compiled into FFmpeg and able to open a device,
+        so each candidate is checked with a one-frame test encode. The result
+        is cached for the lifetime of the process.
+        
+        Returns:
+            Encoder name or None if only software encoding is available
+        """
+        global _hw_encoder_detected, _hw_encoder
+        
+        if _hw_encoder_detected:
+            return _hw_encoder
+        _hw_encoder_detected = True
+        
+        try:
+            result = subprocess.run(
+                ['ffmpeg', '-hide_banner', '-encoders'],
+                capture_output=True, text=True, check=True, timeout=10
+            )
+        except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired):
+            return None
+        
+        for encoder in HW_ENCODER_OPTIONS:
+            if encoder not in result.stdout:
+                continue
+            if encoder == 'h264_vaapi':
+                if not os.path.exists(VAAPI_DEVICE):
+                    continue
+                test_cmd = [
+                    'ffmpeg', '-hide_banner',
+                    '-vaapi_device', VAAPI_DEVICE,
+                    '-f', 'lavfi', '-i', 'color=black:s=256x256:d=0.1',
+                    '-vf', VAAPI_UPLOAD_FILTER,
+                ]
+            else:
+                test_cmd = [
+                    'ffmpeg', '-hide_banner',
+                    '-f', 'lavfi', '-i', 'color=black:s=256x256:d=0.1',
+                ]
+            test_cmd += [
+                '-frames:v', '1',
+                '-c:v', encoder,
+                '-f', 'null', '-'
+            ]
+            try:
+                subprocess.run(
+                    test_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True, timeout=30
+                )
+            except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
+                logger.info(f"Hardware encoder {encoder} is compiled in but not usable")
+                continue
+            
+            logger.info(f"Using hardware encoder: {encoder}")
+            _hw_encoder = encoder
+            return encoder
+        
+        logger.info("No hardware encoder available, using libx264")
+        return None
+    
+    def _video_codec_args(
+        self,
+        intermediate: bool = False,
+        hw_upload: bool = False,
+        keyframe_interval: Optional[float] = None
+    ) -> List[str]:
+        """
+        Get FFmpeg video encoder arguments.
+        
+        Args:
+            intermediate: Use the faster preset for files that will be re-cut later
+            hw_upload: Caller appends VAAPI_UPLOAD_FILTER to its filter graph,
+                so h264_vaapi may be used
+            keyframe_interval: Force a keyframe every N seconds so the output
+                can be stream-copy cut exactly at multiples of N
+            
+        Returns:
+            List of FFmpeg arguments
+        """
+        keyframe_args = []
+        if keyframe_interval:
+            keyframe_args = ['-force_key_frames', f'expr:gte(t,n_forced*{keyframe_interval})']
+        
+        if self._v_enc and (self._v_enc != 'h264_vaapi' or hw_upload):
+            if keyframe_args:
+                # Forced frames must be IDR, otherwise a copy cut starts on a non-decodable frame
+                keyframe_args += HW_FORCED_IDR_ARGS.get(self._v_enc, [])
+            return ['-c:v', self._v_enc] + self._v_enc_opts + keyframe_args
+        
+        if intermediate:
+            preset, crf = INTERMEDIATE_ENCODER_PRESET, INTERMEDIATE_ENCODER_CRF
+        else:
+            preset, crf = self.preset, self.crf
+        
+        args = [
+            '-c:v', 'libx264',
+            '-preset', preset,
+            '-crf', str(crf),
+            '-x264-params', X264_PARAMS,
+        ]
+        if keyframe_args:
+            # No extra scene-cut keyframes between the forced ones
+            args += keyframe_args + ['-sc_threshold', '0']
+        return args
+    
+    @staticmethod
+    def _audio_codec_args(video_info: Dict[str, Any], bitrate: str = '192k') -> List[str]:
+        """
+        Get FFmpeg audio encoder arguments for an input.
+        
+        AAC sources are stream-copied, the audio is not decoded and re-encoded.
+        
+        Args:
+            video_info: Info of the input video from get_video_info
+            bitrate: AAC bitrate when the audio has to be re-encoded
+            
+        Returns:
+            List of FFmpeg arguments
+        """
+        if video_info.get('audio_codec') == 'aac':
+            return ['-c:a', 'copy']
+        return ['-c:a', 'aac', '-b:a', bitrate]
+    
     def _get_output_resolution(self, quality: str) -> Tuple[int, int]:
         """
         Get output resolution based on quality setting.
@@ -515,15 +963,20 @@ class VideoProcessor:
             return 30.0
     
     def _check_ffmpeg(self) -> bool:
-        """Check if FFmpeg is available."""
+        """Check if FFmpeg is available (checked once per process)."""
+        global _ffmpeg_available
+        
+        if _ffmpeg_available is not None:
+            return _ffmpeg_available
         try:
             subprocess.run(['ffmpeg', '-version'], 
-                         capture_output=True, check=True, timeout=10)
+                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True, timeout=10)
             subprocess.run(['ffprobe', '-version'], 
-                         capture_output=True, check=True, timeout=10)
-            return True
+                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True, timeout=10)
+            _ffmpeg_available = True
         except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired):
-            return False
+            _ffmpeg_available = False
+        return _ffmpeg_available
     
     def cleanup_file(self, file_path: str) -> bool:
         """Clean up processed file."""
@@ -537,6 +990,92 @@ class VideoProcessor:
             logger.error(f"Failed to cleanup file {file_path}: {e}")
             return False
     
+    @staticmethod
+    def _blurred_background_filter(width: int, height: int) -> str:
+        """
+        Build the filter chain for the blurred full-frame background.
+        
+        Args:
+            width: Target width
+            height: Target height
+            
+        Returns:
+            FFmpeg filter chain without input/output labels
+        """
+        # Even dimensions keep yuv420p chroma aligned
+        small_width = width // BG_BLUR_DOWNSCALE // 2 * 2
+        small_height = height // BG_BLUR_DOWNSCALE // 2 * 2
+        return (
+            f"scale={small_width}:{small_height}:force_original_aspect_ratio=increase,"
+            f"crop={small_width}:{small_height},"
+            f"boxblur={BG_BLUR_RADIUS}:{BG_BLUR_PASSES},"
+            f"scale={width}:{height}"
+        )
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=16)
+    def _layout_filter(width: int, height: int) -> str:
+        """
+        Build the layout part of the shorts filter graph ending in [with_main].
+        
+        The layout only depends on the output size, so the text is built once
+        per resolution. Internal labels are kept short.
+        
+        Args:
+            width: Target width
+            height: Target height
+            
+        Returns:
+            FFmpeg filter graph from [0:v] to [with_main]
+        """
+        # Main video stream: scale to fit in center area (leaving space for title and subtitles)
+        main_height = int(height * 0.7)  # 70% of height for main video
+        main_area_top = int(height * 0.15)  # 15% from top for title
+        
+        # The background is taken from the already scaled main video, so the
+        # full resolution source is scaled only once
+        return (
+            f"[0:v]scale='min({width},iw*{main_height}/ih)':'min({main_height},ih)',split=2[m][b];"
+            # Background stream: blur heavily and scale to fill entire frame
+            f"[b]{VideoProcessor._blurred_background_filter(width, height)}[bb];"
+            # Overlay main video on blurred background
+            f"[bb][m]overlay=(W-w)/2:{main_area_top}[with_main]"
+        )
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=16)
+    def _cropped_layout_filter(width: int, height: int) -> str:
+        """
+        Build the layout graph of process_video_ffmpeg ending in [layout].
+        
+        Unlike _layout_filter the main video fills the full width and is
+        cropped to its area. Cached per resolution.
+        
+        Args:
+            width: Target width
+            height: Target height
+            
+        Returns:
+            FFmpeg filter graph from [0:v] to [layout]
+        """
+        # 1. Main video (scaled and centered with correct aspect ratio) - Fixed positioning  
+        main_height = int(height * 0.65)  # Height of the main video area
+        main_area_top = int(height * 0.175)  # Top position of main video area
+        
+        # Scale maintaining aspect ratio and crop to fit exactly
+        # First scale to fill the area (maintaining aspect ratio). The scaled frame
+        # still has the whole picture, so the background is split off after it and
+        # the full resolution source is scaled only once
+        return (
+            f"[0:v]scale={width}:{main_height}:force_original_aspect_ratio=increase,split=2[m][b];"
+            # 2. Background (blurred and scaled)
+            f"[b]{VideoProcessor._blurred_background_filter(width, height)}[bb];"
+            # Then crop to exact size
+            f"[m]crop={width}:{main_height}[mc];"
+            # 3. Overlay main video on blurred background
+            f"[bb][mc]overlay=x=(W-w)/2:y={main_area_top}[layout]"
+        )
+    
     def _build_video_filters(
         self, 
         width: int, 
@@ -564,63 +1103,81 @@ class VideoProcessor:
         # 3. Title overlay at the top
         # 4. Subtitle area reserved at the bottom
         
-        filters = []
-        
-        # Split input into two streams for background and main video
-        filters.append("[0:v]split=2[bg][main]")
-        
-        # Background stream: blur heavily and scale to fill entire frame
-        filters.append(f"[bg]scale={width}:{height}:force_original_aspect_ratio=increase,crop={width}:{height},gblur=sigma=20[bg_blurred]")
-        
-        # Main video stream: scale to fit in center area (leaving space for title and subtitles)
-        main_height = int(height * 0.7)  # 70% of height for main video
-        main_area_top = int(height * 0.15)  # 15% from top for title
-        
-        filters.append(f"[main]scale='min({width},iw*{main_height}/ih)':'min({main_height},ih)'[main_scaled]")
-        
-        # Overlay main video on blurred background
-        filters.append(f"[bg_blurred][main_scaled]overlay=(W-w)/2:{main_area_top}[with_main]")
+        # Cached layout head, only the title tail is built per call
+        layout_filter = self._layout_filter(width, height)
         
         # Add title overlay if provided
         if title:
-            # Use custom style or default
-            style = title_style or DEFAULT_TEXT_STYLES['title']
-            style['color'] = 'red'  # Жёстко фиксируем цвет
-            
-            # Use custom font if provided, otherwise use Obelix Pro font
-            if font_path and os.path.exists(font_path):
-                fontfile = font_path
-            else:
-                # Try Obelix Pro font first
-                obelix_font_path = "/app/fonts/Obelix Pro.ttf"
-                if os.path.exists(obelix_font_path):
-                    fontfile = obelix_font_path
-                else:
-                    fontfile = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
-            
-            title_escaped = title.replace("'", "\\'").replace(":", "\\:").replace("\\", "\\\\")
-            
-            # Build title filter with custom styling
-            font_size = int(height * style['size_ratio'])
-            y_position = int(height * style['position_y_ratio'])
-            
-            # drawtext для титров
-            title_filter = f"drawtext:text='{title_escaped}':fontfile={fontfile}:fontsize={font_size}:fontcolor={style['color']}:bordercolor={style.get('border_color', 'black')}:borderw={style.get('border_width', 3)}:x=(w-text_w)/2:y={y_position}"
-            filters.append(f"[with_main]{title_filter}[output]")
+            title_filter = self._title_drawtext(width, height, title, font_path, title_style)
+            return f"{layout_filter};[with_main]{title_filter}[output]"
         # Note: If no title, the final output is [with_main], not [output]
         
         # Note: Fade effects removed due to FFmpeg compatibility issues
         # Can be added later with proper syntax: fade=in:0:30,fade=out:st=duration-30:d=30
         
-        return ";".join(filters)
+        return layout_filter
     
-    def get_available_fonts(self) -> Dict[str, str]:
+    def _title_drawtext(
+        self,
+        width: int,
+        height: int,
+        title: str,
+        font_path: str = None,
+        title_style: Dict[str, Any] = None,
+        name: Optional[str] = None
+    ) -> str:
+        """
+        Build the drawtext filter for the title at the top of the frame.
+        
+        Args:
+            width: Target width
+            height: Target height
+            title: Title text
+            font_path: Path to custom font file
+            title_style: Custom style settings for title
+            name: Filter instance name, lets sendcmd address it as drawtext@name
+            
+        Returns:
+            drawtext filter without input/output labels
+        """
+        # Use custom style or default
+        style = dict(title_style or DEFAULT_TEXT_STYLES['title'])
+        style['color'] = 'red'  # Жёстко фиксируем цвет
+        
+        # Use custom font if provided, otherwise use Obelix Pro font
+        if font_path and os.path.exists(font_path):
+            fontfile = font_path
+        else:
+            # Try Obelix Pro font first
+            obelix_font_path = "/app/fonts/Obelix Pro.ttf"
+            if os.path.exists(obelix_font_path):
+                fontfile = obelix_font_path
+            else:
+                fontfile = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+        
+        title_escaped = title.translate(DRAWTEXT_TITLE_ESCAPES)
+        
+        # Build title filter with custom styling
+        font_size = int(height * style['size_ratio'])
+        y_position = int(height * style['position_y_ratio'])
+        
+        # drawtext для титров
+        filter_name = f"drawtext@{name}" if name else "drawtext"
+        return f"{filter_name}=text='{title_escaped}':fontfile={fontfile}:fontsize={font_size}:fontcolor={style['color']}:bordercolor={style.get('border_color', 'black')}:borderw={style.get('border_width', 3)}:x=(w-text_w)/2:y={y_position}"
+    
+    @staticmethod
+    def _sendcmd_escape(arg: str) -> str:
+        """Escape a sendcmd argument so separators and quotes stay part of it."""
+        return re.sub(r"([\\'\"\s,;\[\]])", r"\\\1", arg)
+    
+    def get_available_fonts(self) -> Dict[str, str]:
         """
         Get available fonts from the fonts directory.
         
         This function scans the /app/fonts directory for font families. For each family,
         it looks for font files in a 'static' subdirectory first. If it exists,
         it scans that directory. Otherwise, it scans the family's root directory.
+        The scan is cached until the fonts directory changes.
 
         Returns:
             Dict mapping font names to font file paths
@@ -628,40 +1185,12 @@ class VideoProcessor:
         fonts = {}
         fonts_dir = "/app/fonts"
 
-        if not os.path.isdir(fonts_dir):
+        try:
+            # Callers may modify the result, the cached dict stays intact
+            fonts = dict(_scan_fonts(fonts_dir, os.stat(fonts_dir).st_mtime_ns))
+        except (FileNotFoundError, NotADirectoryError):
             logger.warning(f"Fonts directory not found or not a directory: {fonts_dir}")
             return fonts
-
-        logger.info(f"Scanning fonts directory: {fonts_dir}")
-        try:
-            # Add Obelix Pro font specifically
-            obelix_path = os.path.join(fonts_dir, "Obelix Pro.ttf")
-            if os.path.exists(obelix_path):
-                fonts["Obelix Pro"] = obelix_path
-                logger.debug(f"Added font: Obelix Pro -> {obelix_path}")
-                
-            for font_family in sorted(os.listdir(fonts_dir)):
-                family_path = os.path.join(fonts_dir, font_family)
-                if os.path.isdir(family_path):
-                    logger.debug(f"Processing font family directory: {family_path}")
-                    
-                    search_path = family_path
-                    static_path = os.path.join(family_path, "static")
-
-                    if os.path.isdir(static_path):
-                        search_path = static_path
-                    
-                    logger.debug(f"Scanning for font files in: {search_path}")
-                    for font_file in sorted(os.listdir(search_path)):
-                        if font_file.lower().endswith(('.ttf', '.otf')):
-                            font_path = os.path.join(search_path, font_file)
-                            if os.path.isfile(font_path):
-                                clean_name = Path(font_file).stem.replace('-', ' ').replace('_', ' ')
-                                font_name = f"{font_family} - {clean_name}"
-                                
-                                if font_name not in fonts:
-                                    fonts[font_name] = font_path
-                                    logger.debug(f"Added font: {font_name} -> {font_path}")
         except Exception as e:
             logger.error(f"Error scanning fonts directory '{fonts_dir}': {e}", exc_info=True)
             
@@ -698,25 +1227,25 @@ class VideoProcessor:
             
             # Build filter for preview (same as video but output as image)
             video_filter = self._build_video_filters(output_width, output_height, title, font_path)
+            filter_script_path = self._write_filter_script(video_filter)
             
             cmd = [
                 'ffmpeg',
-                '-i', video_path,
                 '-ss', preview_time,
+                '-i', video_path,
                 '-vframes', '1',
-                '-filter_complex', video_filter,
+                '-filter_complex_threads', str(self.ffmpeg_threads),
+                '-filter_complex_script', filter_script_path,
                 '-map', '[output]',
+                '-threads', str(self.ffmpeg_threads),
                 '-y',
                 output_path
             ]
             
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                check=True,
-                timeout=28800
-            )
+            try:
+                _run_ffmpeg(cmd)
+            finally:
+                os.remove(filter_script_path)
             
             return os.path.exists(output_path)
             
@@ -731,7 +1260,8 @@ class VideoProcessor:
         quality: str = "1080p",
         title: str = "",
         subtitle_style: str = "modern",
-        font_path: str = None
+        font_path: str = None,
+        max_parallel_encodes: Optional[int] = None
     ) -> List[Dict[str, Any]]:
         """
         Cut video into fragments with professional shorts layout and subtitles.
@@ -743,6 +1273,9 @@ class VideoProcessor:
             title: Title to display at the top
             subtitle_style: Style of subtitles (modern, classic, colorful)
             font_path: Path to custom font file
+            max_parallel_encodes: Number of concurrent FFmpeg encodes, defaults to
+                a quarter of this task's thread budget (ffmpeg_threads) for
+                libx264 and 1 for hardware encoders
             
         Returns:
             List of fragment information
@@ -779,8 +1312,8 @@ class VideoProcessor:
             num_fragments = num_full_fragments + (1 if create_remainder_fragment else 0)
             actual_fragment_duration = fragment_duration
         
-        fragments = []
-        
+        # Fragments are contiguous from 0, only the too short tail is dropped
+        fragment_spans = []
         for i in range(num_fragments):
             # For short videos (less than MIN_FRAGMENT_DURATION), process the entire video
             if total_duration < MIN_FRAGMENT_DURATION:
@@ -803,26 +1336,93 @@ class VideoProcessor:
             if actual_duration < 5 and total_duration >= MIN_FRAGMENT_DURATION:
                 continue
             
-            fragment_filename = f"fragment_{i+1:03d}.mp4"
-            fragment_path = os.path.join(self.output_dir, fragment_filename)
-            
             # Create fragment title
             fragment_title = f"{title} - Часть {i+1}" if title else f"Фрагмент {i+1}"
-            
-            # Process fragment with professional layout
-            fragment_info = self._process_professional_fragment(
-                video_path=video_path,
-                output_path=fragment_path,
-                start_time=start_time,
-                duration=actual_duration,
-                quality=quality,
-                title=fragment_title,
-                subtitle_style=subtitle_style,
-                font_path=font_path,
-                has_subtitles=True  # Enable subtitles in create_fragments_with_subtitles
-            )
-            
-            fragment_info.update({
+            fragment_spans.append((start_time, end_time, actual_duration, fragment_title))
+        
+        if not fragment_spans:
+            return []
+        
+        encode_duration = fragment_spans[-1][1]
+        output_width, output_height = self._get_output_resolution(quality)
+        custom_title_style = self.create_custom_text_style('title', 'red', 'medium')
+        custom_subtitle_style = self.create_custom_text_style('subtitle', 'white', 'medium')
+        
+        # Subtitles for the whole range are recognised in one Whisper run
+        subtitles = self.generate_subtitles_from_audio(
+            video_path=video_path,
+            start_time=0,
+            duration=encode_duration,
+            video_info=video_info
+        )
+        if not subtitles:
+            logger.warning("No subtitles generated for fragments")
+        
+        # libx264 threading stops scaling past a few threads, so several encodes
+        # of contiguous fragment groups keep this task's cores busy. The encodes
+        # share the task's thread budget (ffmpeg_threads), so parallel Celery
+        # workers on one host don't each claim every core. Hardware encoders
+        # have a limited number of sessions and stay with one encode.
+        thread_budget = max(1, self.ffmpeg_threads)
+        if max_parallel_encodes is None:
+            max_parallel_encodes = 1 if self._v_enc else max(1, thread_budget // 4)
+        num_groups = max(1, min(max_parallel_encodes, len(fragment_spans), thread_budget))
+        threads = max(1, thread_budget // num_groups)
+        group_size, extra = divmod(len(fragment_spans), num_groups)
+        groups = []
+        first_index = 0
+        for g in range(num_groups):
+            count = group_size + (1 if g < extra else 0)
+            groups.append((first_index, fragment_spans[first_index:first_index + count]))
+            first_index += count
+        
+        number_width = max(3, len(str(num_fragments)))
+        ass_style = self._subtitle_ass_style(subtitle_style, custom_subtitle_style)
+        audio_args = self._audio_codec_args(video_info)
+        if num_groups > 1:
+            logger.info(f"Encoding {len(fragment_spans)} fragments in {num_groups} parallel encodes with {threads} threads each")
+        
+        # FFmpeg does the work in child processes, threads only wait for them
+        with ThreadPoolExecutor(max_workers=num_groups) as executor:
+            futures = [
+                executor.submit(
+                    self._encode_fragment_group,
+                    video_path,
+                    group_spans,
+                    first_index + 1,
+                    number_width,
+                    output_width,
+                    output_height,
+                    font_path,
+                    custom_title_style,
+                    subtitles,
+                    ass_style,
+                    actual_fragment_duration,
+                    threads,
+                    audio_args
+                )
+                for first_index, group_spans in groups
+            ]
+            has_subtitles = all([future.result() for future in futures])
+        
+        fragment_sizes = self._scan_fragment_sizes("fragment_", number_width)
+        fragments = []
+        for i, (start_time, end_time, actual_duration, fragment_title) in enumerate(fragment_spans):
+            fragment_filename = f"fragment_{i+1:0{number_width}d}.mp4"
+            if fragment_filename not in fragment_sizes:
+                logger.warning(f"Fragment {i+1} was not created by the segment muxer")
+                continue
+            file_size = fragment_sizes[fragment_filename]
+            
+            fragments.append({
+                'local_path': os.path.join(self.output_dir, fragment_filename),
+                'size_bytes': file_size,
+                'resolution': f"{output_width}x{output_height}",
+                'fps': SHORTS_FPS,
+                'bitrate': int(file_size * 8 / max(actual_duration, 0.01)),
+                'has_title': True,
+                'has_subtitles': has_subtitles,
+                'success': True,
                 'fragment_number': i + 1,
                 'filename': fragment_filename,
                 'start_time': start_time,
@@ -831,12 +1431,145 @@ class VideoProcessor:
                 'title': fragment_title,
                 'subtitle_style': subtitle_style
             })
-            
-            fragments.append(fragment_info)
             logger.info(f"Created professional fragment {i+1}/{num_fragments}: {fragment_filename}")
         
         return fragments
     
+    def _encode_fragment_group(
+        self,
+        video_path: str,
+        spans: List[Tuple[float, float, float, str]],
+        start_number: int,
+        number_width: int,
+        output_width: int,
+        output_height: int,
+        font_path: Optional[str],
+        title_style: Dict[str, Any],
+        subtitles: List[Dict[str, Any]],
+        ass_style: Dict[str, Any],
+        keyframe_interval: float,
+        threads: int,
+        audio_args: List[str]
+    ) -> bool:
+        """
+        Encode contiguous fragments in one FFmpeg pass with the segment muxer.
+        
+        A single title drawtext gets the next fragment title from sendcmd at
+        every boundary, the segment muxer splits the encode into
+        fragment_<number>.mp4 files.
+        
+        Args:
+            video_path: Path to input video
+            spans: (start, end, duration, title) of each fragment, contiguous
+            start_number: Number of the first fragment file
+            number_width: Zero padding of fragment numbers
+            output_width: Output width
+            output_height: Output height
+            font_path: Path to custom font file
+            title_style: Title text style
+            subtitles: Subtitles with absolute timestamps
+            ass_style: ASS subtitle style
+            keyframe_interval: Fragment duration, keyframes are forced on its multiples
+            threads: Encoder threads for this pass
+            audio_args: Audio encoder arguments from _audio_codec_args
+            
+        Returns:
+            True if subtitles were burned in
+        """
+        group_start = spans[0][0]
+        group_end = spans[-1][1]
+        
+        # Output timestamps start at 0 after the input seek, all times are relative to group_start
+        title_cmd_path = os.path.join(self.output_dir, f"titles_{uuid.uuid4().hex[:8]}.cmd")
+        title_commands = "".join(
+            f"{start_time - group_start} drawtext@title reinit {self._sendcmd_escape('text=' + fragment_title.translate(DRAWTEXT_TITLE_ESCAPES))};\n"
+            for start_time, _, _, fragment_title in spans[1:]
+        )
+        title_filter = self._title_drawtext(
+            output_width, output_height, spans[0][3], font_path, title_style, name='title'
+        )
+        sanitized_title_cmd_path = title_cmd_path.replace('\\', '/').replace(':', '\\:')
+        filters = [self._build_video_filters(output_width, output_height)]
+        filters.append(f"[with_main]sendcmd=f='{sanitized_title_cmd_path}',{title_filter}[output]")
+        output_stream = '[output]'
+        
+        ass_path = None
+        group_subtitles = self._slice_subtitles(subtitles or [], group_start, group_end)
+        if group_subtitles:
+            ass_path = os.path.join(self.output_dir, f"subtitles_{uuid.uuid4().hex[:8]}.ass")
+            if self._generate_ass_file(
+                group_subtitles,
+                ass_path,
+                output_width,
+                output_height,
+                ass_style,
+                get_subtitle_font_name()
+            ):
+                filters.append(f"{output_stream}{self._ass_filter(ass_path)}[subtitled]")
+                output_stream = '[subtitled]'
+        subtitled = output_stream == '[subtitled]'
+        
+        # VAAPI encodes from GPU surfaces, upload the finished frames at the end of the graph
+        use_vaapi = self._v_enc == 'h264_vaapi'
+        hw_device_args = []
+        if use_vaapi:
+            filters.append(f"{output_stream}{VAAPI_UPLOAD_FILTER}[hw]")
+            output_stream = '[hw]'
+            hw_device_args = ['-vaapi_device', VAAPI_DEVICE]
+        
+        segment_times = ",".join(str(span[0] - group_start) for span in spans[1:])
+        filter_script_path = None
+        try:
+            with open(title_cmd_path, 'w', encoding='utf-8') as f:
+                f.write(title_commands)
+            
+            # Each filter on its own line, which is the usual layout of filter scripts
+            filter_script_path = self._write_filter_script(";\n".join(filters))
+            
+            cmd = [
+                'ffmpeg',
+                *hw_device_args,
+                *HW_FILTERED_DECODE_ARGS.get(self._v_enc, []),
+                '-ss', str(group_start),
+                '-i', video_path,
+                '-t', str(group_end - group_start),
+                '-filter_complex_threads', str(threads),
+                '-filter_complex_script', filter_script_path,
+                '-map', output_stream,
+                '-map', '0:a?',
+                *self._video_codec_args(hw_upload=use_vaapi, keyframe_interval=keyframe_interval),
+                '-threads', str(threads),
+                '-r', str(SHORTS_FPS),
+                *audio_args,
+                '-f', 'segment',
+            ]
+            if segment_times:
+                cmd.extend(['-segment_times', segment_times])
+            else:
+                # Single fragment: keep the muxer from splitting at all
+                cmd.extend(['-segment_time', str(group_end - group_start + 1)])
+            cmd.extend([
+                '-reset_timestamps', '1',
+                '-segment_start_number', str(start_number),
+                '-segment_format_options', 'movflags=+faststart',
+                '-y',
+                os.path.join(self.output_dir, f"fragment_%0{number_width}d.mp4")
+            ])
+            
+            _run_ffmpeg(cmd)
+        except subprocess.CalledProcessError as e:
+            logger.error(f"FFmpeg failed: {e.stderr}")
+            raise RuntimeError(f"Professional video processing failed: {e.stderr}")
+        except subprocess.TimeoutExpired:
+            logger.error("FFmpeg timeout during professional processing")
+            raise RuntimeError("Professional video processing timeout")
+        finally:
+            for temp_path in (filter_script_path, title_cmd_path, ass_path):
+                if temp_path and os.path.exists(temp_path):
+                    os.remove(temp_path)
+        
+        return subtitled
+    
     def _process_professional_fragment(
         self,
         video_path: str,
@@ -851,7 +1584,8 @@ class VideoProcessor:
             title_color: str = 'red',
         title_size: str = 'medium',
         subtitle_color: str = 'white',
-        subtitle_size: str = 'medium'
+        subtitle_size: str = 'medium',
+        video_info: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
         Process a single video fragment with professional shorts layout.
@@ -870,6 +1604,7 @@ class VideoProcessor:
             title_size: Size preset for title
             subtitle_color: Color preset for subtitles
             subtitle_size: Size preset for subtitles
+            video_info: Already probed info of the input video
             
         Returns:
             Dict with fragment processing results
@@ -882,84 +1617,94 @@ class VideoProcessor:
             custom_title_style = self.create_custom_text_style('title', title_color, title_size) if title else None
             custom_subtitle_style = self.create_custom_text_style('subtitle', subtitle_color, subtitle_size)
             
-            # Build FFmpeg command for professional shorts
-            cmd = [
-                'ffmpeg',
-                '-i', video_path,
-                '-ss', str(start_time),
-                '-t', str(duration),
-                '-filter_complex', self._build_video_filters(output_width, output_height, title, font_path, custom_title_style),
-                '-map', '[output]',  # Map the processed video stream
-                '-map', '0:a?',  # Map the original audio stream if it exists
-                '-c:v', 'libx264',
-                '-preset', 'slow',
-                '-crf', '14',  # Higher quality for professional look
-                '-r', str(SHORTS_FPS),
-                '-c:a', 'aac',
-                '-b:a', '192k',  # Higher audio quality
-                '-movflags', '+faststart',
-                '-y',  # Overwrite output file
-                output_path
-            ]
-            
-            # Run FFmpeg
-            result = subprocess.run(
-                cmd, 
-                capture_output=True, 
-                text=True, 
-                check=True,
-                timeout=28800  # Увеличено до 1 часа
-            )
+            filter_complex = self._build_video_filters(output_width, output_height, title, font_path, custom_title_style)
+            output_stream = '[output]'
             
-            # Add subtitles if enabled
-            if has_subtitles and os.path.exists(output_path):
+            # Subtitles are burned in by the same encode instead of a second pass over the fragment
+            ass_path = None
+            subtitled = False
+            if has_subtitles:
                 logger.info(f"Adding subtitles to fragment: {output_path}")
                 
                 # Generate subtitles for this fragment
                 subtitles = self.generate_subtitles_from_audio(
                     video_path=video_path,
                     start_time=start_time,
-                    duration=duration
+                    duration=duration,
+                    video_info=video_info
                 )
                 
                 if subtitles:
-                    # Create temporary file for video with subtitles
-                    temp_output = output_path.replace('.mp4', '_temp.mp4')
-                    
-                    # Add animated subtitles
-                    if self.add_animated_subtitles(
-                        video_path=output_path,
-                        output_path=temp_output,
-                        subtitles=subtitles,
-                        subtitle_style=subtitle_style,
-                        custom_subtitle_style=custom_subtitle_style
+                    ass_path = os.path.splitext(output_path)[0] + ".ass"
+                    if self._generate_ass_file(
+                        subtitles,
+                        ass_path,
+                        output_width,
+                        output_height,
+                        self._subtitle_ass_style(subtitle_style, custom_subtitle_style),
+                        get_subtitle_font_name()
                     ):
-                        # Replace original with subtitled version
-                        if os.path.exists(temp_output):
-                            os.replace(temp_output, output_path)
-                            logger.info(f"Successfully added subtitles to fragment")
-                        else:
-                            logger.warning(f"Failed to create subtitled version")
-                    else:
-                        logger.warning(f"Failed to add subtitles to fragment")
+                        filter_complex += f";{output_stream}{self._ass_filter(ass_path)}[subtitled]"
+                        output_stream = '[subtitled]'
+                        subtitled = True
                 else:
                     logger.warning(f"No subtitles generated for fragment")
             
-            # Get output file info
+            # VAAPI encodes from GPU surfaces, upload the finished frames at the end of the graph
+            use_vaapi = self._v_enc == 'h264_vaapi'
+            hw_device_args = []
+            if use_vaapi:
+                filter_complex += f";{output_stream}{VAAPI_UPLOAD_FILTER}[hw]"
+                output_stream = '[hw]'
+                hw_device_args = ['-vaapi_device', VAAPI_DEVICE]
+            
+            # The graph is read from a file, long titles can't overflow argv
+            filter_script_path = self._write_filter_script(filter_complex)
+            
+            # Build FFmpeg command for professional shorts
+            cmd = [
+                'ffmpeg',
+                *hw_device_args,
+                *HW_FILTERED_DECODE_ARGS.get(self._v_enc, []),
+                '-ss', str(start_time),  # Input seek instead of decoding up to start_time
+                '-i', video_path,
+                '-t', str(duration),
+                '-filter_complex_threads', str(self.ffmpeg_threads),
+                '-filter_complex_script', filter_script_path,
+                '-map', output_stream,  # Map the processed video stream
+                '-map', '0:a?',  # Map the original audio stream if it exists
+                '-threads', str(self.ffmpeg_threads),
+                *self._video_codec_args(hw_upload=use_vaapi),
+                '-r', str(SHORTS_FPS),
+                # AAC sources are copied, others get higher quality AAC
+                *self._audio_codec_args(video_info or self.get_video_info(video_path)),
+                '-movflags', '+faststart',
+                '-y',  # Overwrite output file
+                output_path
+            ]
+            
+            # Run FFmpeg
+            try:
+                _run_ffmpeg(cmd)
+            finally:
+                for temp_path in (filter_script_path, ass_path):
+                    if temp_path and os.path.exists(temp_path):
+                        os.remove(temp_path)
+            
+            # Get output file info (resolution and fps are set by the command itself)
             if os.path.exists(output_path):
                 file_size = os.path.getsize(output_path)
-                output_info = self.get_video_info(output_path)
                 
                 return {
                     'local_path': output_path,
                     'size_bytes': file_size,
-                    'resolution': f"{output_info['width']}x{output_info['height']}",
-                    'fps': output_info['fps'],
-                    'bitrate': output_info['bitrate'],
+                    'resolution': f"{output_width}x{output_height}",
+                    'fps': SHORTS_FPS,
+                    'bitrate': int(file_size * 8 / max(duration, 0.01)),
                     'has_title': bool(title),
                     'title': title,
                     'subtitle_style': subtitle_style,
-                    'has_subtitles': has_subtitles,
+                    'has_subtitles': subtitled,
                     'success': True
                 }
             else:
@@ -975,6 +1720,28 @@ class VideoProcessor:
             logger.error(f"Professional fragment processing failed: {e}")
             raise
     
+    @staticmethod
+    def _subtitle_ass_style(
+        subtitle_style: str,
+        custom_subtitle_style: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Apply a subtitle style preset (modern, classic, colorful) to the text style.
+        
+        Args:
+            subtitle_style: Style of subtitles (modern, classic, colorful)
+            custom_subtitle_style: Custom style settings for subtitles
+            
+        Returns:
+            Style dict for _generate_ass_file
+        """
+        style = dict(custom_subtitle_style or DEFAULT_TEXT_STYLES['subtitle'])
+        if subtitle_style == "colorful":
+            style['color'] = "yellow"
+        elif subtitle_style == "classic":
+            style['border_width'] = max(2, style.get('border_width', 3) - 1)
+        return style
+    
     def add_animated_subtitles(
         self,
         video_path: str,
@@ -1001,87 +1768,41 @@ class VideoProcessor:
             width = video_info['width']
             height = video_info['height']
             
-            style = custom_subtitle_style or DEFAULT_TEXT_STYLES['subtitle']
+            style = self._subtitle_ass_style(subtitle_style, custom_subtitle_style)
             
-            subtitle_y = int(height * style['position_y_ratio'])
-            font_size = int(height * style['size_ratio'])
-            
-            subtitle_filters = []
-
-            for subtitle in subtitles:
-                word = subtitle['text']
-                word_start = subtitle['start']
-                word_end = subtitle['end']
-                
-                # Animation parameters
-                anim_duration = 0.3  # seconds
-                pop_scale = 1.1 # Pop to 110%
-                
-                # Ensure animation doesn't exceed word duration
-                actual_anim_duration = min(anim_duration, word_end - word_start)
-                
-                word_escaped = word.replace("'", r"\'").replace(":", r"\:").replace(",", r"\,")
-
-                if subtitle_style == "modern":
-                    text_color = style['color']
-                    border_color = style.get('border_color', 'black')
-                    border_width = style.get('border_width', 3)
-                elif subtitle_style == "colorful":
-                    text_color = "yellow"
-                    border_color = style.get('border_color', 'black')
-                    border_width = style.get('border_width', 3)
-                else:  # classic
-                    text_color = style['color']
-                    border_color = style.get('border_color', 'black')
-                    border_width = max(2, style.get('border_width', 3) - 1)
-                
-                subtitle_font = get_subtitle_font_path()
-                
-                # Time variable for animation progress (0 to 1)
-                anim_progress = f"min(1, (t-{word_start})/{actual_anim_duration})"
-                
-                # Font size animation: pop-up and settle
-                # Grows to pop_scale then back to 1.0
-                fs_anim = f"if(lt(t,{word_start}),0,if(lt(t,{word_start}+{actual_anim_duration}),{font_size}*(1+{pop_scale-1}*2*{anim_progress}*(1-{anim_progress})),{font_size}))"
-
-                # Alpha animation: fade-in
-                alpha_anim = f"if(lt(t,{word_start}),0,if(lt(t,{word_start}+{actual_anim_duration}),{anim_progress},1))"
-                
-                subtitle_filter = (
-                    f"drawtext="
-                    f"text='{word_escaped}':fontfile={subtitle_font}:fontsize={fs_anim}:fontcolor={text_color}:bordercolor={border_color}:borderw={border_width}:x=(w-text_w)/2:y={subtitle_y}-text_h/2:alpha={alpha_anim}:enable='between(t,{word_start},{word_end})'"
+            # All words go into one ASS file rendered by a single libass filter
+            # instead of a drawtext node per word
+            ass_path = os.path.splitext(output_path)[0] + ".ass"
+            try:
+                events_count = self._generate_ass_file(
+                    subtitles,
+                    ass_path,
+                    width,
+                    height,
+                    style,
+                    get_subtitle_font_name()
                 )
-                
-                subtitle_filters.append(subtitle_filter)
-            
-            if subtitle_filters:
-                full_filter = ",".join(subtitle_filters)
+                if not events_count:
+                    return False
                 
                 cmd = [
                     'ffmpeg',
                     '-i', video_path,
-                    '-vf', full_filter,
+                    '-vf', self._ass_filter(ass_path),
                     '-map', '0:v',  # Map video stream
                     '-map', '0:a?',  # Map audio stream if exists
-                    '-c:v', 'libx264',
-                    '-preset', 'slow',
-                    '-crf', '14',
+                    *self._video_codec_args(),
                     '-c:a', 'copy',  # Copy audio without re-encoding
                     '-y',
                     output_path
                 ]
                 
-                result = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    text=True,
-                    check=True,
-                    timeout=28800
-                )
-                
-                return os.path.exists(output_path)
+                _run_ffmpeg(cmd)
+            finally:
+                if os.path.exists(ass_path):
+                    os.remove(ass_path)
             
-            return False
+            return os.path.exists(output_path)
             
         except Exception as e:
             logger.error(f"Failed to add animated subtitles: {e}")
@@ -1091,7 +1812,8 @@ class VideoProcessor:
         self,
         video_path: str,
         start_time: float = 0,
-        duration: Optional[float] = None
+        duration: Optional[float] = None,
+        video_info: Optional[Dict[str, Any]] = None
     ) -> List[Dict[str, Any]]:
         """
         Generate subtitles from video audio using faster-whisper speech recognition.
@@ -1100,16 +1822,21 @@ class VideoProcessor:
             video_path: Path to video file
             start_time: Start time in seconds for subtitle generation
             duration: Duration in seconds (if None, process entire video)
+            video_info: Already probed video info (probed here if None)
             
         Returns:
             List of subtitle segments with timing
         """
         try:
             # Check if video has audio stream
-            video_info = self.get_video_info(video_path)
+            if video_info is None:
+                video_info = self.get_video_info(video_path)
+            # Duration for the simple subtitle fallbacks
+            fallback_duration = duration or video_info['duration']
+            
             if not video_info.get('has_audio', False):
                 logger.info("Video has no audio stream, using simple subtitle generation")
-                return self._generate_simple_subtitles(start_time, duration or video_info['duration'])
+                return self._generate_simple_subtitles(start_time, fallback_duration)
             
             # Create temporary audio file
             temp_audio = os.path.join(self.output_dir, "temp_audio.wav")
@@ -1117,8 +1844,8 @@ class VideoProcessor:
             # Extract audio segment from video
             cmd = [
                 'ffmpeg',
-                '-i', video_path,
                 '-ss', str(start_time),
+                '-i', video_path,
             ]
             
             if duration:
@@ -1135,17 +1862,17 @@ class VideoProcessor:
             ])
             
             try:
-                result = subprocess.run(cmd, capture_output=True, text=True, check=True, timeout=28800)
+                _run_ffmpeg(cmd)
             except subprocess.CalledProcessError as e:
                 logger.error(f"FFmpeg audio extraction failed: {e.stderr}")
                 logger.error(f"FFmpeg command: {' '.join(cmd)}")
                 # Fallback to simple subtitle generation without audio analysis
                 logger.info("Falling back to simple subtitle generation")
-                return self._generate_simple_subtitles(start_time, duration or video_info['duration'])
+                return self._generate_simple_subtitles(start_time, fallback_duration)
             
             if not os.path.exists(temp_audio):
                 logger.warning("Audio file was not created, falling back to simple subtitles")
-                return self._generate_simple_subtitles(start_time, duration or self.get_video_info(video_path)['duration'])
+                return self._generate_simple_subtitles(start_time, fallback_duration)
             
             # Use faster-whisper for speech recognition
             logger.info("Starting speech recognition with faster-whisper...")
@@ -1246,19 +1973,89 @@ class VideoProcessor:
                     # Clean up temporary audio file
                     if os.path.exists(temp_audio):
                         os.remove(temp_audio)
-                    return self._generate_simple_subtitles(start_time, duration or self.get_video_info(video_path)['duration'])
+                    return self._generate_simple_subtitles(start_time, fallback_duration)
                     
             except ImportError:
                 logger.error("faster-whisper not available, falling back to simple subtitles")
                 # Clean up temporary audio file
                 if os.path.exists(temp_audio):
                     os.remove(temp_audio)
-                return self._generate_simple_subtitles(start_time, duration or self.get_video_info(video_path)['duration'])
+                return self._generate_simple_subtitles(start_time, fallback_duration)
             
         except Exception as e:
             logger.error(f"Failed to generate subtitles: {e}")
             return []
     
+    def extract_embedded_subtitles(
+        self,
+        video_path: str,
+        video_info: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Read the first text subtitle stream of the container instead of running Whisper.
+        
+        Each cue is split into words spread evenly over its time, so the result
+        has the same word-level format as generate_subtitles_from_audio.
+        
+        Args:
+            video_path: Path to video file
+            video_info: Already probed video info
+            
+        Returns:
+            List of subtitle segments, empty if the file has no text subtitles
+        """
+        if video_info is None:
+            video_info = self.get_video_info(video_path)
+        if video_info.get('subtitle_codec') not in TEXT_SUBTITLE_CODECS:
+            return []
+        
+        cmd = [
+            'ffmpeg',
+            '-v', 'error',
+            '-i', video_path,
+            '-map', '0:s:0',
+            '-f', 'webvtt',
+            'pipe:1'
+        ]
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, check=True, timeout=600)
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+            logger.warning(f"Failed to extract embedded subtitles: {e}")
+            return []
+        
+        def to_seconds(timestamp: str) -> float:
+            seconds = 0.0
+            for part in timestamp.split(':'):
+                seconds = seconds * 60 + float(part)
+            return seconds
+        
+        subtitles = []
+        # Cues are separated by blank lines: optional id, timing line, text lines
+        for block in result.stdout.split('\n\n'):
+            lines = block.strip().splitlines()
+            for i, line in enumerate(lines):
+                match = WEBVTT_CUE_RE.match(line)
+                if match:
+                    break
+            else:
+                continue
+            
+            words = WEBVTT_TAG_RE.sub('', ' '.join(lines[i + 1:])).split()
+            if not words:
+                continue
+            
+            cue_start = to_seconds(match.group(1))
+            word_duration = (to_seconds(match.group(2)) - cue_start) / len(words)
+            for j, word in enumerate(words):
+                subtitles.append({
+                    'start': cue_start + j * word_duration,
+                    'end': cue_start + (j + 1) * word_duration,
+                    'text': word
+                })
+        
+        logger.info(f"Extracted {len(subtitles)} words from embedded subtitles")
+        return subtitles
+    
     def _generate_simple_subtitles(self, start_time: float, total_duration: float) -> List[Dict[str, Any]]:
         """
         Generate simple subtitles without audio analysis.
@@ -1293,23 +2090,22 @@ class VideoProcessor:
             for text in demo_texts:
                 all_words.extend(text.split())
             
-            # Calculate timing for each word
+            # Calculate timing for all words at once
             if all_words:
+                end_time = start_time + total_duration
                 word_duration = total_duration / len(all_words)
                 
-                for i, word in enumerate(all_words):
-                    word_start = start_time + (i * word_duration)
-                    word_end = word_start + word_duration
-                    
-                    # Stop if we exceed the total duration
-                    if word_start >= start_time + total_duration:
-                        break
-                    
-                    subtitles.append({
-                        'start': word_start,
-                        'end': min(word_end, start_time + total_duration),
-                        'text': word.strip()
-                    })
+                starts = start_time + np.arange(len(all_words)) * word_duration
+                ends = np.minimum(starts + word_duration, end_time)
+                # Stop at the first word that exceeds the total duration
+                words_count = int(np.count_nonzero(starts < end_time))
+                
+                subtitles = [
+                    {'start': float(word_start), 'end': float(word_end), 'text': word.strip()}
+                    for word_start, word_end, word in zip(
+                        starts[:words_count], ends[:words_count], all_words[:words_count]
+                    )
+                ]
             
             logger.info(f"Generated {len(subtitles)} word-by-word simple subtitle segments")
             return subtitles
@@ -1334,8 +2130,8 @@ class VideoProcessor:
     ) -> Dict[str, Any]:
         """
         Process video with the correct workflow:
-        1. First process the full video (add title, subtitles)
-        2. Then cut the processed video into fragments
+        1. Generate subtitles for the full video
+        2. Render title, subtitles and layout in one pass that writes the fragments directly
         
         Args:
             video_path: Path to input video
@@ -1361,9 +2157,6 @@ class VideoProcessor:
             video_info = self.get_video_info(video_path)
             total_duration = video_info['duration']
             
-            # Create processed video filename
-            processed_video_path = os.path.join(self.output_dir, "processed_full_video.mp4")
-            
             # Get output resolution
             output_width, output_height = self._get_output_resolution(quality)
             
@@ -1377,149 +2170,116 @@ class VideoProcessor:
             # Determine output stream name based on whether title is present
             output_stream = '[output]' if title else '[with_main]'
             
-            # First pass: Create video with title and proper layout
+            # Step 2: Subtitles are burned in by the same encode, no second pass over the full video
+            ass_path = None
+            if enable_subtitles and video_info.get('has_audio', False):
+                logger.info("Generating subtitles for the full video...")
+                
+                # Generate subtitles for the entire video
+                subtitles = self.generate_subtitles_from_audio(
+                    video_path=video_path,  # Use original video for audio extraction
+                    start_time=0,
+                    duration=total_duration,
+                    video_info=video_info
+                )
+                
+                if subtitles:
+                    logger.info(f"Generated {len(subtitles)} subtitle segments")
+                    ass_path = os.path.join(self.output_dir, f"subtitles_{uuid.uuid4().hex[:8]}.ass")
+                    if self._generate_ass_file(
+                        subtitles,
+                        ass_path,
+                        output_width,
+                        output_height,
+                        self._subtitle_ass_style(subtitle_style, custom_subtitle_style),
+                        get_subtitle_font_name()
+                    ):
+                        video_filter += f";{output_stream}{self._ass_filter(ass_path)}[subtitled]"
+                        output_stream = '[subtitled]'
+                else:
+                    logger.warning("No subtitles generated for full video")
+            
+            # Calculate number of fragments
+            if total_duration < fragment_duration:
+                num_fragments = 1
+            else:
+                # Calculate number of FULL fragments with EXACT duration
+                num_fragments = int(total_duration // fragment_duration)
+            
+            # Use total video duration if it's shorter than a fragment, otherwise EXACT fragment_duration
+            actual_duration = min(total_duration, fragment_duration)
+            
+            # Step 3: One pass renders title, subtitles and layout and the segment muxer
+            # writes the fragments directly, no full-length intermediate to decode again.
+            # Keyframes are forced on every fragment boundary so the cuts are exact.
+            number_width = max(3, len(str(num_fragments)))
+            segment_pattern = os.path.join(self.output_dir, f"fragment_%0{number_width}d.mp4")
+            
+            # VAAPI encodes from GPU surfaces, upload the finished frames at the end of the graph
+            use_vaapi = self._v_enc == 'h264_vaapi'
+            hw_device_args = []
+            if use_vaapi:
+                video_filter += f";{output_stream}{VAAPI_UPLOAD_FILTER}[hw]"
+                output_stream = '[hw]'
+                hw_device_args = ['-vaapi_device', VAAPI_DEVICE]
+            
             cmd = [
                 'ffmpeg',
+                *hw_device_args,
+                *HW_FILTERED_DECODE_ARGS.get(self._v_enc, []),
                 '-i', video_path,
+                '-t', str(num_fragments * actual_duration),  # Only FULL fragments
                 '-filter_complex', video_filter,
                 '-map', output_stream,  # Map processed video
                 '-map', '0:a?',  # Map original audio if exists
-                '-c:v', 'libx264',
-                '-preset', 'slow',
-                '-crf', '14',
+                *self._video_codec_args(hw_upload=use_vaapi, keyframe_interval=fragment_duration),
                 '-r', str(SHORTS_FPS),
                 '-c:a', 'aac',
                 '-b:a', '192k',
                 '-ar', '44100',  # Standard audio sample rate
                 '-ac', '2',  # Stereo audio
-                '-movflags', '+faststart',
+                '-f', 'segment',
+                '-segment_time', str(fragment_duration),
+                '-reset_timestamps', '1',
+                '-segment_start_number', '1',
+                '-segment_format_options', 'movflags=+faststart',
                 '-y',
-                processed_video_path
+                segment_pattern
             ]
             
             # Run FFmpeg
-            logger.info("Creating video with title and layout...")
+            logger.info("Creating fragments with title, subtitles and layout...")
             logger.info(f"FFmpeg command: {' '.join(cmd)}")
             
             try:
-                result = subprocess.run(cmd, capture_output=True, text=True, check=True, timeout=28800)
+                _run_ffmpeg(cmd)
                 logger.info("FFmpeg completed successfully")
-                if result.stderr:
-                    logger.warning(f"FFmpeg stderr: {result.stderr}")
             except subprocess.CalledProcessError as e:
                 logger.error(f"FFmpeg failed with return code {e.returncode}")
                 logger.error(f"FFmpeg stderr: {e.stderr}")
-                logger.error(f"FFmpeg stdout: {e.stdout}")
                 raise
             except subprocess.TimeoutExpired:
                 logger.error("FFmpeg timeout during video processing")
                 raise
-            
-            # Step 2: Add subtitles to the processed video (if enabled)
-            if enable_subtitles and video_info.get('has_audio', False):
-                logger.info("Generating subtitles for the full video...")
-                
-                # Generate subtitles for the entire video
-                subtitles = self.generate_subtitles_from_audio(
-                    video_path=video_path,  # Use original video for audio extraction
-                    start_time=0,
-                    duration=total_duration
-                )
-                
-                if subtitles:
-                    logger.info(f"Generated {len(subtitles)} subtitle segments")
-                    
-                    # Create temporary file for video with subtitles
-                    temp_subtitled_path = processed_video_path.replace('.mp4', '_subtitled.mp4')
-                    
-                    # Add subtitles to the processed video
-                    if self.add_animated_subtitles(
-                        video_path=processed_video_path,
-                        output_path=temp_subtitled_path,
-                        subtitles=subtitles,
-                        subtitle_style=subtitle_style,
-                        custom_subtitle_style=custom_subtitle_style
-                    ):
-                        # Replace processed video with subtitled version
-                        os.replace(temp_subtitled_path, processed_video_path)
-                        logger.info("Successfully added subtitles to full video")
-                    else:
-                        logger.warning("Failed to add subtitles to full video")
-                else:
-                    logger.warning("No subtitles generated for full video")
-            
-            # Step 3: Cut the processed video into fragments
-            logger.info("Step 3: Cutting processed video into fragments...")
+            finally:
+                if ass_path and os.path.exists(ass_path):
+                    os.remove(ass_path)
             
             fragments = []
-            
-            try:
-                processed_video_info = self.get_video_info(processed_video_path)
-                processed_duration = processed_video_info['duration']
-            except Exception as e:
-                logger.error(f"Could not get info for processed video, falling back to original duration. Error: {e}")
-                processed_duration = total_duration
-
-            # Calculate number of fragments
-            if processed_duration < fragment_duration:
-                num_fragments = 1
-            else:
-                # Calculate number of FULL fragments with EXACT duration
-                num_fragments = int(processed_duration // fragment_duration)
-
-            if num_fragments == 0 and processed_duration > 0:
-                logger.warning(f"Video duration ({processed_duration}s) is less than fragment duration ({fragment_duration}s). Creating one fragment.")
-                num_fragments = 1
-
-
-            for i in range(num_fragments):
-                start_time = i * fragment_duration
-                
-                # Use total video duration if it's shorter than a fragment
-                if processed_duration < fragment_duration:
-                    actual_duration = processed_duration
-                else:
-                    # ALWAYS use the EXACT fragment_duration
-                    actual_duration = fragment_duration
-                
-                # Safety break, though logic should prevent this
-                if start_time >= processed_duration:
-                    break
-                
-                fragment_filename = f"fragment_{i+1:03d}.mp4"
+            fragment_sizes = self._scan_fragment_sizes("fragment_", number_width)
+            for i, fragment_filename in enumerate(sorted(fragment_sizes)[:num_fragments]):
                 fragment_path = os.path.join(self.output_dir, fragment_filename)
-                
-                # Simple cut without re-encoding (much faster and preserves quality)
-                cut_cmd = [
-                    'ffmpeg',
-                    '-i', processed_video_path,
-                    '-ss', str(start_time),
-                    '-t', str(actual_duration),
-                    '-c', 'copy',  # Copy streams without re-encoding
-                    '-avoid_negative_ts', 'make_zero',
-                    '-y',
-                    fragment_path
-                ]
-                
-                # Run FFmpeg for cutting
-                result = subprocess.run(cut_cmd, capture_output=True, text=True, check=True, timeout=28800)
-                
-                if os.path.exists(fragment_path):
-                    file_size = os.path.getsize(fragment_path)
-                    fragment_info = {
-                        'fragment_number': i + 1,
-                        'filename': fragment_filename,
-                        'local_path': fragment_path,
-                        'start_time': start_time,
-                        'duration': actual_duration,
-                        'size_bytes': file_size,
-                        'title': f"{title} - Часть {i+1}" if title else f"Фрагмент {i+1}"
-                    }
-                    fragments.append(fragment_info)
-                    logger.info(f"Created fragment {i+1}/{num_fragments} (exact {actual_duration}s): {fragment_filename}")
-            
-            # Clean up the processed full video (optional, can keep it)
-            # os.remove(processed_video_path)
+                fragment_info = {
+                    'fragment_number': i + 1,
+                    'filename': fragment_filename,
+                    'local_path': fragment_path,
+                    'start_time': i * fragment_duration,
+                    'duration': actual_duration,
+                    'size_bytes': fragment_sizes[fragment_filename],
+                    'title': f"{title} - Часть {i+1}" if title else f"Фрагмент {i+1}"
+                }
+                fragments.append(fragment_info)
+                logger.info(f"Created fragment {i+1}/{num_fragments} (exact {actual_duration}s): {fragment_filename}")
             
             # Генерация файла ссылок на скачивание
             links_file = self.generate_download_links_file(fragments, base_url="https://ваш_домен/downloads")
@@ -1529,7 +2289,6 @@ class VideoProcessor:
                 'total_duration': total_duration,
                 'num_fragments': len(fragments),
                 'fragments': fragments,
-                'processed_video_path': processed_video_path,
                 'download_links_file': links_file
             }
             
@@ -1543,31 +2302,56 @@ class VideoProcessor:
     def process_video_ffmpeg(
         self,
         video_path: str,
-        settings: Dict[str, Any]
+        settings: Dict[str, Any],
+        time_range: Optional[Tuple[float, float]] = None,
+        subtitles_data: Optional[List[Dict[str, Any]]] = None,
+        env: Optional[Dict[str, str]] = None,
+        threads: Optional[int] = None
     ) -> Dict[str, Any]:
         """
-        Process the entire video using a single, powerful FFmpeg command.
-        This includes layout, title, and subtitles for maximum performance.
+        Process the entire video with two piped FFmpeg processes.
+        The first one decodes and builds the layout (scale, blur, overlay),
+        the second one draws title and subtitles and encodes, so both run
+        in parallel on raw frames passed through the pipe.
+        
+        Args:
+            video_path: Path to input video
+            settings: Processing settings. With 'segment_duration' the encode
+                writes fragments of that length directly instead of one file
+            time_range: (start, end) in seconds to process only part of the video
+            subtitles_data: Ready subtitles relative to the range start;
+                generated from the audio when None
+            env: Environment for the FFmpeg processes
+            threads: Thread budget shared by both processes, defaults to
+                ffmpeg_threads
         """
         logger.info("Starting high-performance FFmpeg video processing...")
         
-        # Get video info to calculate dimensions and duration
-        video_info = self.get_video_info(video_path)
         output_width, output_height = self._get_output_resolution(settings.get("quality", "1080p"))
         
         # Define output path for the processed video
         processed_video_path = os.path.join(self.output_dir, f"processed_ffmpeg_{uuid.uuid4().hex[:8]}.mp4")
         
+        segment_duration = settings.get("segment_duration")
+        if segment_duration and not (MIN_FRAGMENT_DURATION <= segment_duration <= MAX_FRAGMENT_DURATION):
+            raise ValueError(f"Fragment duration must be between {MIN_FRAGMENT_DURATION} and {MAX_FRAGMENT_DURATION} seconds")
+        
         # --- Subtitle Generation ---
-        subtitles_data = []
-        if settings.get("enable_subtitles", True):
-            try:
-                logger.info("Generating subtitles...")
-                subtitles_data = self.generate_subtitles_from_audio(video_path)
-                if not subtitles_data:
-                    logger.warning("No subtitles were generated.")
-            except Exception as e:
-                logger.error(f"Subtitle generation failed: {e}. Continuing without subtitles.")
+        if subtitles_data is None:
+            subtitles_data = []
+            if settings.get("enable_subtitles", True):
+                try:
+                    logger.info("Generating subtitles...")
+                    subtitles_data = (
+                        self.extract_embedded_subtitles(video_path)
+                        or self.generate_subtitles_from_audio(video_path)
+                    )
+                    if not subtitles_data:
+                        logger.warning("No subtitles were generated.")
+                    elif time_range:
+                        subtitles_data = self._slice_subtitles(subtitles_data, *time_range)
+                except Exception as e:
+                    logger.error(f"Subtitle generation failed: {e}. Continuing without subtitles.")
 
         # --- Font and Style Configuration ---
         font_path = settings.get("font_path")
@@ -1583,37 +2367,15 @@ class VideoProcessor:
                 font_dir_for_ffmpeg = "/usr/share/fonts/truetype/dejavu"
                 font_name_for_style = "DejaVu Sans"
 
-        # Separate font configuration for subtitles (Obelix Pro)
-        subtitle_font_path = get_subtitle_font_path()
-        # IMPORTANT: Escape font path for FFmpeg filter syntax.
-        # This handles spaces (by quoting), backslashes, and colons.
-        escaped_path = subtitle_font_path.replace('\\', '/').replace(':', '\\:')
-        sanitized_subtitle_font_path = f"'{escaped_path}'"
-
         # Sanitize paths for FFmpeg filters
         sanitized_font_dir = font_dir_for_ffmpeg.replace('\\', '/').replace(':', '\\:')
 
-        # --- Build Complex Filter ---
-        video_filters = []
-        
-        # 1. Background (blurred and scaled)
-        video_filters.append("[0:v]split=2[bg][main]")
-        video_filters.append(f"[bg]scale={output_width}:{output_height}:force_original_aspect_ratio=increase,crop={output_width}:{output_height},gblur=sigma=20[bg_blurred]")
-        
-        # 2. Main video (scaled and centered with correct aspect ratio) - Fixed positioning  
-        main_height = int(output_height * 0.65)  # Height of the main video area
-        main_area_top = int(output_height * 0.175)  # Top position of main video area
-        
-        # Scale maintaining aspect ratio and crop to fit exactly
-        # First scale to fill the area (maintaining aspect ratio)
-        video_filters.append(f"[main]scale={output_width}:{main_height}:force_original_aspect_ratio=increase[main_scaled]")
-        # Then crop to exact size
-        video_filters.append(f"[main_scaled]crop={output_width}:{main_height}[main_cropped]")
-        
-        # 3. Overlay main video on blurred background
-        video_filters.append(f"[bg_blurred][main_cropped]overlay=x=(W-w)/2:y={main_area_top}[layout]")
+        # --- Build Layout Filter (producer process) ---
+        layout_filter = self._cropped_layout_filter(output_width, output_height)
         
-        current_stream = "[layout]"
+        # --- Build Text Filter (consumer process, reads the layout from the pipe) ---
+        video_filters = []
+        current_stream = "[0:v]"
         
         # 4. Title overlay (if provided) - Fixed font and background
         title = settings.get("title", "")
@@ -1625,7 +2387,7 @@ class VideoProcessor:
             )
             title_font_size = int(output_height * title_style['size_ratio'])
             title_y = int(output_height * title_style['position_y_ratio'])
-            sanitized_title = title.replace("'", "\\'").replace(":", "\\:").replace("\\", "\\\\")
+            sanitized_title = title.translate(DRAWTEXT_TITLE_ESCAPES)
             
             title_filter = (
                 f"drawtext=fontfile='{sanitized_font_dir}/{font_name_for_style}.ttf':text='{sanitized_title}':"
@@ -1638,7 +2400,7 @@ class VideoProcessor:
 
             # Add subheader below title
             subheader_text = "IP-cl.funtime.su"
-            sanitized_subheader = subheader_text.replace("'", "\\'").replace(":", "\\:").replace("\\", "\\\\")
+            sanitized_subheader = subheader_text.translate(DRAWTEXT_TITLE_ESCAPES)
             subheader_font_size = int(output_height * 0.04)  # even larger
             subheader_y = int(output_height * 0.10)  # below title
             subheader_filter = (
@@ -1650,91 +2412,142 @@ class VideoProcessor:
             video_filters.append(f"{current_stream}{subheader_filter}[subtitled]")
             current_stream = "[subtitled]"
         
-        # 5. Animated Subtitle Overlay
+        # 5. Animated Subtitle Overlay - one libass pass renders every word
+        ass_path = None
         if subtitles_data:
             subtitle_style_opts = self.create_custom_text_style(
                 'subtitle',
                 settings.get('subtitle_color', 'white'),
                 settings.get('subtitle_size', 'medium')
             )
-            subtitle_y = int(output_height * subtitle_style_opts['position_y_ratio'])
-            font_size = int(output_height * subtitle_style_opts['size_ratio'])
-            text_color = subtitle_style_opts['color']
-            border_color = subtitle_style_opts.get('border_color', 'black')
-            border_width = subtitle_style_opts.get('border_width', 3)
-
-            subtitle_drawtext_filters = []
-            for sub in subtitles_data:
-                word_escaped = sub['text'].replace("'", r"\'").replace(":", r"\:").replace(",", r"\,")
-                word_start = sub['start']
-                word_end = sub['end']
-                
-                anim_duration = 0.2
-                pop_scale = 1.3
-                actual_anim_duration = min(anim_duration, word_end - word_start)
-                if actual_anim_duration <= 0.01: continue
-
-                # IMPORTANT: Commas inside expression must be escaped for the filter graph parser.
-                anim_progress = f"min(1\\,max(0\\,(t-{word_start})/{actual_anim_duration}))"
-                size_multiplier = f"(1+({pop_scale}-1)*4*{anim_progress}*(1-{anim_progress}))"
-                
-                # Expressions for fontsize and alpha with escaped commas
-                fs_anim = f"if(between(t\\,{word_start}\\,{word_start}+{actual_anim_duration})\\,{font_size}*{size_multiplier}\\,{font_size})"
-                alpha_anim = f"if(lt(t\\,{word_start})\\,0\\,if(lt(t\\,{word_start}+{actual_anim_duration})\\,{anim_progress}\\,1))"
-                
-                # Construct the filter on a single line to avoid formatting issues
-                drawtext_filter = f"drawtext=text='{word_escaped}':fontfile={sanitized_subtitle_font_path}:fontsize={fs_anim}:fontcolor={text_color}:bordercolor={border_color}:borderw={border_width}:x=(w-text_w)/2:y={subtitle_y}-text_h/2:alpha={alpha_anim}:enable='between(t,{word_start},{word_end})'"
-                subtitle_drawtext_filters.append(drawtext_filter)
+            ass_path = os.path.join(self.output_dir, f"subtitles_{uuid.uuid4().hex[:8]}.ass")
+            events_count = self._generate_ass_file(
+                subtitles_data,
+                ass_path,
+                output_width,
+                output_height,
+                subtitle_style_opts,
+                get_subtitle_font_name()
+            )
 
-            if subtitle_drawtext_filters:
-                full_subtitle_filter = ",".join(subtitle_drawtext_filters)
-                video_filters.append(f"{current_stream}{full_subtitle_filter}[output]")
+            if events_count:
+                video_filters.append(f"{current_stream}{self._ass_filter(ass_path)}[output]")
                 current_stream = "[output]"
 
-        # Ensure output stream is always defined
-        output_stream_name = current_stream
+        # 6. VAAPI encodes surfaces on the GPU, upload the finished frames
+        use_vaapi = self._v_enc == 'h264_vaapi'
+        if use_vaapi:
+            video_filters.append(f"{current_stream}{VAAPI_UPLOAD_FILTER}[hw]")
+            current_stream = "[hw]"
 
         # --- FFmpeg Command Execution ---
-        # The filter graph is now written to a file to avoid "Argument list too long" errors.
+        # The text filter graph is written to a file to avoid "Argument list too long" errors.
         filter_script_path = None
         try:
-            # Create a temporary file to hold the filter graph
-            with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.txt', encoding='utf-8') as f:
-                filter_script_path = f.name
-                # Write each filter on a new line, which is the correct format for filter scripts
-                f.write(";\n".join(video_filters))
-                f.write("\n")
-
-            logger.info(f"Generated FFmpeg filter script at: {filter_script_path}")
+            # Producer: decode + layout, raw frames and PCM audio to stdout
+            # Both processes run at the same time and split the thread budget:
+            # the producer's half goes to its filters, the consumer's to filters and encoder
+            thread_budget = max(2, threads or self.ffmpeg_threads)
+            producer_threads = str(thread_budget // 2)
+            consumer_threads = str(thread_budget - thread_budget // 2)
 
-            cmd = [
-                'ffmpeg',
+            producer_cmd = [
+                'ffmpeg', *FFMPEG_QUIET_ARGS,
+                '-filter_complex_threads', producer_threads, '-filter_threads', producer_threads,
+                *HW_FILTERED_DECODE_ARGS.get(self._v_enc, [])
+            ]
+            if time_range:
+                # Demuxer-side seek, each range only decodes its own GOPs
+                start, end = time_range
+                producer_cmd.extend(['-ss', str(start), '-t', str(end - start)])
+            producer_cmd.extend([
                 '-i', video_path,
-                '-filter_complex_script', filter_script_path,  # Use the script file
-                '-map', output_stream_name,
+                '-filter_complex', layout_filter,
+                '-map', '[layout]',
                 '-map', '0:a?',
-                '-c:v', 'libx264',
-                '-preset', 'slow',
-                '-crf', '14',
-                '-profile:v', 'high',
+                '-c:v', 'rawvideo',
                 '-pix_fmt', 'yuv420p',
+                '-c:a', 'pcm_s16le',
+                '-f', 'nut',
+                'pipe:1'
+            ])
+
+            # Consumer: title/subtitles + encode
+            consumer_cmd = [
+                'ffmpeg', *FFMPEG_QUIET_ARGS,
+                '-filter_complex_threads', consumer_threads, '-filter_threads', consumer_threads
+            ]
+            if use_vaapi:
+                consumer_cmd.extend(['-vaapi_device', VAAPI_DEVICE])
+            consumer_cmd.extend(['-f', 'nut', '-i', 'pipe:0'])
+            if video_filters:
+                # Create a temporary file to hold the filter graph
+                with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.txt', encoding='utf-8') as f:
+                    filter_script_path = f.name
+                    # Write each filter on a new line, which is the correct format for filter scripts
+                    f.write(";\n".join(video_filters))
+                    f.write("\n")
+
+                logger.info(f"Generated FFmpeg filter script at: {filter_script_path}")
+                consumer_cmd.extend(['-filter_complex_script', filter_script_path, '-map', current_stream])
+            else:
+                consumer_cmd.extend(['-map', '0:v'])
+            consumer_cmd.extend([
+                '-map', '0:a?',
+                *self._video_codec_args(hw_upload=use_vaapi, keyframe_interval=segment_duration),
+                '-threads', consumer_threads,
+                '-profile:v', 'high',
+            ])
+            if not use_vaapi:
+                # hwupload already fixed the pixel format for VAAPI
+                consumer_cmd.extend(['-pix_fmt', 'yuv420p'])
+            consumer_cmd.extend([
                 '-c:a', 'aac',
                 '-b:a', '192k',
-                '-y',
-                processed_video_path
-            ]
+            ])
+            if segment_duration:
+                # Same encode run emits the fragments, keyframes land exactly on the cuts
+                segment_prefix = f"fragment_{uuid.uuid4().hex[:8]}_"
+                consumer_cmd.extend([
+                    '-f', 'segment',
+                    '-segment_time', str(segment_duration),
+                    '-reset_timestamps', '1',
+                    '-segment_start_number', '1',
+                    '-segment_format_options', 'movflags=+faststart',
+                    '-y',
+                    os.path.join(self.output_dir, f"{segment_prefix}%03d.mp4")
+                ])
+            else:
+                consumer_cmd.extend(['-movflags', FRAGMENTED_MP4_MOVFLAGS, '-y', processed_video_path])
 
             # Get ffmpeg timeout from settings
             ffmpeg_timeout = settings.get('ffmpeg_timeout', 28800)
 
-            logger.info("Executing unified FFmpeg command with filter script...")
-            logger.debug(f"FFMPEG COMMAND: {' '.join(cmd)}")
-            subprocess.run(cmd, check=True, capture_output=True, text=True, timeout=ffmpeg_timeout)
+            logger.info("Executing piped FFmpeg layout/encode commands...")
+            logger.debug(f"FFMPEG PRODUCER: {' '.join(producer_cmd)}")
+            logger.debug(f"FFMPEG CONSUMER: {' '.join(consumer_cmd)}")
+            self._run_piped_ffmpeg(producer_cmd, consumer_cmd, ffmpeg_timeout, env=env)
+
+            # Callers must not run a second subtitle pass over this output
+            subtitles_embedded = bool(ass_path and events_count)
+
+            if segment_duration:
+                fragments = self._collect_segment_fragments(
+                    segment_prefix, segment_duration, output_width, output_height, subtitles_embedded
+                )
+                logger.info(f"High-performance processing complete. Created {len(fragments)} fragments")
+                return {
+                    'processed_video_path': None,
+                    'fragments': fragments,
+                    'subtitles_embedded': subtitles_embedded
+                }
+
             logger.info(f"High-performance processing complete. Output: {processed_video_path}")
 
             return {
                 'processed_video_path': processed_video_path,
-                'fragments': []  # Fragmentation will be a separate step
+                'fragments': [],  # Fragmentation will be a separate step
+                'subtitles_embedded': subtitles_embedded
             }
 
         except subprocess.CalledProcessError as e:
@@ -1748,23 +2561,457 @@ class VideoProcessor:
             if filter_script_path and os.path.exists(filter_script_path):
                 os.remove(filter_script_path)
                 logger.info(f"Cleaned up temporary filter script: {filter_script_path}")
+            if ass_path and os.path.exists(ass_path):
+                os.remove(ass_path)
+    
+    def _collect_segment_fragments(
+        self,
+        segment_prefix: str,
+        segment_duration: float,
+        width: int,
+        height: int,
+        has_subtitles: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Build fragment info for files written by the segment muxer.
+        
+        A trailing fragment shorter than MIN_FRAGMENT_DURATION is removed,
+        the same way create_fragments skips it.
+        
+        Args:
+            segment_prefix: Filename prefix of the segments in output_dir
+            segment_duration: Requested fragment duration in seconds
+            width: Output width
+            height: Output height
+            has_subtitles: Whether subtitles were burned in by the encode
+            
+        Returns:
+            List of fragment information
+        """
+        segment_sizes = self._scan_fragment_sizes(segment_prefix)
+        segment_names = sorted(segment_sizes)
+        
+        if not segment_names:
+            return []
+        
+        # Only the last segment can be shorter than requested, so probe just that one
+        last_info = self.get_video_info(os.path.join(self.output_dir, segment_names[-1]))
+        
+        fragments = []
+        for i, segment_name in enumerate(segment_names):
+            segment_path = os.path.join(self.output_dir, segment_name)
+            duration = segment_duration
+            if i == len(segment_names) - 1:
+                duration = min(segment_duration, last_info['duration'])
+                if duration < MIN_FRAGMENT_DURATION and fragments:
+                    os.remove(segment_path)
+                    break
+            
+            fragments.append({
+                'fragment_number': i + 1,
+                'filename': segment_name,
+                'local_path': segment_path,
+                'start_time': i * segment_duration,
+                'end_time': i * segment_duration + duration,
+                'duration': duration,
+                'size_bytes': segment_sizes[segment_name],
+                'resolution': f"{width}x{height}",
+                'fps': last_info['fps'],
+                'has_subtitles': has_subtitles
+            })
+        
+        return fragments
+    
+    def _scan_fragment_sizes(self, prefix: str, number_width: Optional[int] = None) -> Dict[str, int]:
+        """
+        Collect sizes of numbered MP4 files in output_dir with one directory sweep.
+        
+        Args:
+            prefix: Filename prefix followed by the fragment number
+            number_width: Exact number of digits, any width (3+) when None
+            
+        Returns:
+            Dict mapping filename to size in bytes
+        """
+        sizes = {}
+        with os.scandir(self.output_dir) as entries:
+            for entry in entries:
+                name = entry.name
+                if not (name.startswith(prefix) and name.endswith('.mp4')):
+                    continue
+                number = name[len(prefix):-len('.mp4')]
+                if not number.isdigit():
+                    continue
+                if number_width and len(number) != number_width or len(number) < 3:
+                    continue
+                sizes[name] = entry.stat().st_size
+        return sizes
+    
+    def process_video_ffmpeg_parallel(
+        self,
+        video_path: str,
+        settings: Dict[str, Any],
+        num_workers: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Process a long video as several time ranges in parallel and concat the parts.
+        
+        Every range runs its own process_video_ffmpeg pipeline. With NVENC the
+        ranges are spread over the available GPUs via CUDA_VISIBLE_DEVICES.
+        
+        Args:
+            video_path: Path to input video
+            settings: Processing settings (same as process_video_ffmpeg);
+                'segment_duration' only applies when a single range is used
+            num_workers: Number of parallel ranges, defaults to GPU count
+                for NVENC or a quarter of the thread budget (ffmpeg_threads)
+                for libx264
+            
+        Returns:
+            Same result as process_video_ffmpeg
+        """
+        video_info = self.get_video_info(video_path)
+        total_duration = video_info['duration']
+        
+        num_gpus = self._count_cuda_devices() if self._v_enc == 'h264_nvenc' else 0
+        if num_workers is None:
+            num_workers = num_gpus or max(1, self.ffmpeg_threads // 4)
+        # Короткие части не окупают лишний запуск FFmpeg
+        num_workers = max(1, min(num_workers, int(total_duration // PARALLEL_MIN_RANGE_DURATION)))
+        
+        if num_workers == 1:
+            return self.process_video_ffmpeg(video_path, settings)
+        
+        logger.info(f"Processing video in {num_workers} parallel ranges ({num_gpus} GPUs)")
+        
+        # Subtitles are recognised once for the whole audio track and split by range
+        subtitles_data = []
+        if settings.get("enable_subtitles", True):
+            try:
+                subtitles_data = (
+                    self.extract_embedded_subtitles(video_path, video_info=video_info)
+                    or self.generate_subtitles_from_audio(video_path, video_info=video_info)
+                )
+            except Exception as e:
+                logger.error(f"Subtitle generation failed: {e}. Continuing without subtitles.")
+        
+        # Parts are joined into one file, so they must not be segmented
+        range_settings = {**settings, 'segment_duration': None}
+        range_duration = total_duration / num_workers
+        ranges = [
+            (i * range_duration, total_duration if i == num_workers - 1 else (i + 1) * range_duration)
+            for i in range(num_workers)
+        ]
+        
+        def run_range(index: int) -> str:
+            env = None
+            if num_gpus:
+                env = dict(os.environ, CUDA_VISIBLE_DEVICES=str(index % num_gpus))
+            start, end = ranges[index]
+            result = self.process_video_ffmpeg(
+                video_path,
+                range_settings,
+                time_range=(start, end),
+                subtitles_data=self._slice_subtitles(subtitles_data, start, end),
+                env=env,
+                # Диапазоны идут одновременно и делят бюджет потоков задачи
+                threads=max(2, self.ffmpeg_threads // num_workers)
+            )
+            return result['processed_video_path']
+        
+        part_paths = []
+        list_path = os.path.join(self.output_dir, f"concat_{uuid.uuid4().hex[:8]}.txt")
+        try:
+            # FFmpeg does the work in child processes, threads only wait for them
+            with ThreadPoolExecutor(max_workers=num_workers) as executor:
+                futures = [executor.submit(run_range, i) for i in range(num_workers)]
+            # Executor has waited for every range: collect all finished parts
+            # before raising, so the finally block removes every one of them
+            range_error = None
+            for future in futures:
+                try:
+                    part_paths.append(future.result())
+                except Exception as e:
+                    range_error = range_error or e
+            if range_error:
+                raise range_error
+            
+            with open(list_path, 'w', encoding='utf-8') as f:
+                for part_path in part_paths:
+                    escaped = os.path.abspath(part_path).replace("'", "'\\''")
+                    f.write(f"file '{escaped}'\n")
+            
+            processed_video_path = os.path.join(self.output_dir, f"processed_ffmpeg_{uuid.uuid4().hex[:8]}.mp4")
+            cmd = [
+                'ffmpeg',
+                '-f', 'concat',
+                '-safe', '0',
+                '-i', list_path,
+                '-c', 'copy',
+                '-y',
+                processed_video_path
+            ]
+            try:
+                _run_ffmpeg(cmd)
+            except subprocess.CalledProcessError as e:
+                logger.error(f"Concat of processed parts failed. STDERR: {e.stderr}")
+                raise RuntimeError(f"FFmpeg failed during concat: {e.stderr}")
+            
+            logger.info(f"Parallel processing complete. Output: {processed_video_path}")
+            return {
+                'processed_video_path': processed_video_path,
+                'fragments': [],
+                'subtitles_embedded': bool(subtitles_data)
+            }
+        finally:
+            # Части удаляются и при ошибке одного из диапазонов
+            for part_path in part_paths + [list_path]:
+                if os.path.exists(part_path):
+                    os.remove(part_path)
+    
+    @staticmethod
+    def _slice_subtitles(
+        subtitles: List[Dict[str, Any]],
+        start: float,
+        end: float
+    ) -> List[Dict[str, Any]]:
+        """
+        Select subtitles overlapping [start, end) and shift them to the range start.
+        
+        Args:
+            subtitles: Subtitles with absolute timestamps
+            start: Range start in seconds
+            end: Range end in seconds
+            
+        Returns:
+            Subtitles with timestamps relative to the range
+        """
+        sliced = []
+        for sub in subtitles:
+            if sub['end'] <= start or sub['start'] >= end:
+                continue
+            sliced.append({
+                **sub,
+                'start': max(sub['start'], start) - start,
+                'end': min(sub['end'], end) - start,
+            })
+        return sliced
+    
+    @staticmethod
+    def _count_cuda_devices() -> int:
+        """Count NVIDIA GPUs listed by nvidia-smi, 0 if none are available."""
+        try:
+            result = subprocess.run(
+                ['nvidia-smi', '-L'],
+                capture_output=True, text=True, check=True, timeout=10
+            )
+        except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired):
+            return 0
+        return sum(1 for line in result.stdout.splitlines() if line.startswith('GPU '))
+    
+    def _run_piped_ffmpeg(
+        self,
+        producer_cmd: List[str],
+        consumer_cmd: List[str],
+        timeout: float,
+        env: Optional[Dict[str, str]] = None
+    ) -> None:
+        """
+        Run two FFmpeg processes with the producer's stdout piped into the consumer's stdin.
+        
+        Args:
+            producer_cmd: Command writing a stream to pipe:1
+            consumer_cmd: Command reading the stream from pipe:0
+            timeout: Timeout in seconds for the whole pipeline
+            env: Environment for both processes, inherited when None
+            
+        Raises:
+            subprocess.CalledProcessError: If either process fails
+            subprocess.TimeoutExpired: If the pipeline does not finish in time
+        """
+        # Producer stderr goes to a file so it can't fill up a pipe and block
+        with tempfile.TemporaryFile() as producer_stderr:
+            producer = subprocess.Popen(producer_cmd, stdout=subprocess.PIPE, stderr=producer_stderr, env=env)
+            try:
+                consumer = subprocess.Popen(
+                    consumer_cmd,
+                    stdin=producer.stdout,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.PIPE,
+                    env=env
+                )
+            except Exception:
+                producer.kill()
+                producer.wait()
+                raise
+            # Only the consumer holds the read end now, so the producer gets SIGPIPE if it exits
+            producer.stdout.close()
+            reader, consumer_stderr_tail = _drain_stderr(consumer)
+            
+            try:
+                consumer.wait(timeout=timeout)
+                producer.wait(timeout=60)
+            except subprocess.TimeoutExpired:
+                consumer.kill()
+                producer.kill()
+                consumer.wait()
+                producer.wait()
+                raise
+            finally:
+                reader.join()
+            
+            # A failing consumer also breaks the producer, so report it first
+            if consumer.returncode != 0:
+                raise subprocess.CalledProcessError(
+                    consumer.returncode, consumer_cmd,
+                    stderr=b"".join(consumer_stderr_tail).decode('utf-8', errors='replace')
+                )
+            if producer.returncode != 0:
+                producer_stderr.seek(0)
+                raise subprocess.CalledProcessError(
+                    producer.returncode, producer_cmd,
+                    stderr=producer_stderr.read().decode('utf-8', errors='replace')
+                )
+    
+    @staticmethod
+    def _ass_filter(ass_path: str) -> str:
+        """Build the libass filter for an ASS file rendered with the subtitle font."""
+        sanitized_ass_path = ass_path.replace('\\', '/').replace(':', '\\:')
+        sanitized_font_dir = get_subtitle_font_dir().replace('\\', '/').replace(':', '\\:')
+        return f"ass=filename='{sanitized_ass_path}':fontsdir='{sanitized_font_dir}'"
+    
+    @staticmethod
+    def _write_filter_script(filter_graph: str) -> str:
+        """
+        Write a filter graph to a temporary file for -filter_complex_script.
+        
+        Reading the graph from a file keeps long graphs out of argv (ARG_MAX).
+        
+        Args:
+            filter_graph: Filter graph text
+            
+        Returns:
+            Path to the script file, the caller removes it
+        """
+        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.txt', encoding='utf-8') as f:
+            f.write(filter_graph)
+            f.write("\n")
+            return f.name
+    
+    @staticmethod
+    def _to_ass_color(color: str) -> str:
+        """Converts a color name or #RRGGBB to ASS format (&HAABBGGRR)."""
+        rgb = ASS_NAMED_COLORS.get(color.lower(), color.lstrip('#'))
+        if len(rgb) != 6:
+            rgb = ASS_NAMED_COLORS['white']
+        return f"&H00{rgb[4:6]}{rgb[2:4]}{rgb[0:2]}".upper()
+    
+    def _generate_ass_file(
+        self,
+        subtitles: List[Dict[str, Any]],
+        ass_path: str,
+        width: int,
+        height: int,
+        style: Dict[str, Any],
+        font_name: str
+    ) -> int:
+        """
+        Generates an ASS subtitle file with word-by-word pop-up animation.
+        
+        Args:
+            subtitles: List of subtitle segments with timing (word-level)
+            ass_path: Path of the ASS file to write
+            width: Video width
+            height: Video height
+            style: Subtitle style settings
+            font_name: Font family name for libass
+            
+        Returns:
+            Number of written subtitle events
+        """
+        def to_ass_time(seconds: float) -> str:
+            """Converts seconds to ASS time format (H:MM:SS.cc)."""
+            centis = max(0, int(round(seconds * 100)))
+            seconds, centis = divmod(centis, 100)
+            minutes, seconds = divmod(seconds, 60)
+            hours, minutes = divmod(minutes, 60)
+            return f"{hours}:{minutes:02d}:{seconds:02d}.{centis:02d}"
+        
+        subtitle_y = int(height * style['position_y_ratio'])
+        font_size = int(height * style['size_ratio'])
+        text_color = self._to_ass_color(style['color'])
+        border_color = self._to_ass_color(style.get('border_color', 'black'))
+        border_width = style.get('border_width', 3)
+        
+        anim_duration = 0.2
+        pop_scale = 1.3
+        
+        lines = [
+            "[Script Info]",
+            "ScriptType: v4.00+",
+            f"PlayResX: {width}",
+            f"PlayResY: {height}",
+            "WrapStyle: 2",
+            "ScaledBorderAndShadow: yes",
+            "",
+            "[V4+ Styles]",
+            "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+            "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, "
+            "Shadow, Alignment, MarginL, MarginR, MarginV, Encoding",
+            f"Style: Word,{font_name},{font_size},{text_color},{text_color},{border_color},&H00000000,"
+            f"0,0,0,0,100,100,0,0,1,{border_width},0,5,0,0,0,1",
+            "",
+            "[Events]",
+            "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+        ]
+        
+        events_count = 0
+        for sub in subtitles:
+            word_start = sub['start']
+            word_end = sub['end']
+            actual_anim_duration = min(anim_duration, word_end - word_start)
+            if actual_anim_duration <= 0.01:
+                continue
+            
+            # Braces and backslashes start override tags in ASS
+            word = sub['text'].replace('\\', '/').replace('{', '(').replace('}', ')').replace('\n', ' ')
+            
+            # Fade in, grow to pop_scale and settle back to 100%
+            anim_ms = int(actual_anim_duration * 1000)
+            half_ms = anim_ms // 2
+            scale = int(pop_scale * 100)
+            override = (
+                f"{{\\an5\\pos({width // 2},{subtitle_y})\\fad({anim_ms},0)"
+                f"\\t(0,{half_ms},\\fscx{scale}\\fscy{scale})"
+                f"\\t({half_ms},{anim_ms},\\fscx100\\fscy100)}}"
+            )
+            lines.append(
+                f"Dialogue: 0,{to_ass_time(word_start)},{to_ass_time(word_end)},Word,,0,0,0,,{override}{word}"
+            )
+            events_count += 1
+        
+        with open(ass_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines))
+            f.write("\n")
+        logger.info(f"Generated ASS file with {events_count} events at: {ass_path}")
+        return events_count
     
     def _generate_srt_file(self, subtitles: List[Dict[str, Any]], srt_path: str):
         """Generates an SRT subtitle file from subtitle data."""
         def to_srt_time(seconds: float) -> str:
             """Converts seconds to SRT time format (HH:MM:SS,ms)."""
-            if seconds < 0: seconds = 0
-            millis = int((seconds % 1) * 1000)
-            seconds = int(seconds)
-            minutes, seconds = divmod(seconds, 60)
-            hours, minutes = divmod(minutes, 60)
-            return f"{hours:02d}:{minutes:02d}:{seconds:02d},{millis:03d}"
+            millis = int(seconds * 1000) if seconds > 0 else 0
+            hours, millis = divmod(millis, 3600000)
+            minutes, millis = divmod(millis, 60000)
+            secs, millis = divmod(millis, 1000)
+            return "%02d:%02d:%02d,%03d" % (hours, minutes, secs, millis)
 
+        body = "".join(
+            f"{i + 1}\n{to_srt_time(sub['start'])} --> {to_srt_time(sub['end'])}\n{sub['text'].strip()}\n\n"
+            for i, sub in enumerate(subtitles)
+        )
         with open(srt_path, 'w', encoding='utf-8') as f:
-            for i, sub in enumerate(subtitles):
-                f.write(f"{i + 1}\n")
-                f.write(f"{to_srt_time(sub['start'])} --> {to_srt_time(sub['end'])}\n")
-                f.write(f"{sub['text'].strip()}\n\n")
+            f.write(body)
         logger.info(f"Generated SRT file at: {srt_path}")
     
     def split_video(self, input_path: str, chunk_duration: int = 300) -> List[str]:
@@ -1791,37 +3038,36 @@ class VideoProcessor:
             
             # Вычисляем количество частей
             num_chunks = math.ceil(total_duration / chunk_duration)
-            chunk_paths = []
             
             logger.info(f"Splitting video into {num_chunks} chunks of {chunk_duration}s each")
             
-            for i in range(num_chunks):
-                start_time = i * chunk_duration
-                actual_duration = min(chunk_duration, total_duration - start_time)
-                
-                # Создаем имя файла для части
-                chunk_filename = f"chunk_{i+1:03d}.mp4"
-                chunk_path = os.path.join(self.output_dir, chunk_filename)
-                
-                # Нарезаем часть без перекодирования (быстро)
-                cmd = [
-                    'ffmpeg',
-                    '-ss', str(start_time),
-                    '-i', input_path,
-                    '-t', str(actual_duration),
-                    '-c', 'copy',  # Копирование без перекодирования
-                    '-avoid_negative_ts', 'make_zero',
-                    '-y',
-                    chunk_path
-                ]
-                
-                result = subprocess.run(cmd, capture_output=True, text=True, check=True, timeout=28800)
-                
-                if os.path.exists(chunk_path):
-                    chunk_paths.append(chunk_path)
-                    logger.info(f"Created chunk {i+1}/{num_chunks}: {chunk_filename}")
-                else:
-                    logger.warning(f"Failed to create chunk {i+1}")
+            # Один проход segment muxer с копированием потоков вместо процесса на каждую часть:
+            # вход читается один раз, части режутся по ключевым кадрам, как и при -c copy с -ss
+            chunk_prefix = f"chunk_{uuid.uuid4().hex[:8]}_"
+            cmd = [
+                'ffmpeg',
+                '-i', input_path,
+                '-map', '0:v:0',
+                '-map', '0:a?',
+                '-c', 'copy',  # Копирование без перекодирования
+                '-f', 'segment',
+                '-segment_time', str(chunk_duration),
+                '-reset_timestamps', '1',
+                '-segment_start_number', '1',
+                '-avoid_negative_ts', 'make_zero',
+                '-y',
+                os.path.join(self.output_dir, f"{chunk_prefix}%03d.mp4")
+            ]
+            _run_ffmpeg(cmd)
+            
+            chunk_names = sorted(self._scan_fragment_sizes(chunk_prefix))
+            chunk_paths = [os.path.join(self.output_dir, name) for name in chunk_names]
+            for i, name in enumerate(chunk_names):
+                logger.info(f"Created chunk {i+1}/{len(chunk_names)}: {name}")
+            
+            if not chunk_paths:
+                logger.warning("Segment muxer created no chunks, using the original file")
+                return [input_path]
             
             logger.info(f"Video split completed: {len(chunk_paths)} chunks created")
             return chunk_paths
@@ -1840,11 +3086,13 @@ class VideoProcessor:
         """
         if output_path is None:
             output_path = os.path.join(self.output_dir, "download_links.txt")
+        base = base_url.rstrip('/')
+        links = [
+            f"{base}/{fragment.get('filename') or os.path.basename(fragment['local_path'])}\n"
+            for fragment in fragments
+        ]
         with open(output_path, 'w', encoding='utf-8') as f:
-            for fragment in fragments:
-                filename = fragment.get('filename') or os.path.basename(fragment['local_path'])
-                link = f"{base_url.rstrip('/')}/{filename}"
-                f.write(link + '\n')
+            f.writelines(links)
         logger.info(f"Сгенерирован файл ссылок для скачивания: {output_path}")
         return output_path
  
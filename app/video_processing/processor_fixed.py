@@ -4,6 +4,8 @@ Video processing module for creating professional shorts with custom fonts.
 import os
 import subprocess
 import logging
+import json
+import functools
 from typing import Dict, Any, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
@@ -14,6 +16,58 @@ SHORTS_FPS = 30
 MIN_FRAGMENT_DURATION = 10  # seconds
 MAX_FRAGMENT_DURATION = 300  # 5 minutes
 
+
+@functools.lru_cache(maxsize=1)
+def _scan_fonts(fonts_dir: str, mtime_ns: int) -> Dict[str, str]:
+    """
+    Collect system fonts and font families from the fonts directory.
+    
+    Cached by the fonts directory mtime, which changes when a family is added or removed.
+    """
+    fonts = {}
+    
+    # Default system fonts
+    system_fonts = {
+        "DejaVu Sans Bold": "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+        "DejaVu Sans": "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+        "Liberation Sans Bold": "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
+        "Liberation Sans": "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+    }
+    
+    # Add system fonts that exist
+    for name, path in system_fonts.items():
+        if os.path.exists(path):
+            fonts[name] = path
+    
+    # Custom fonts from fonts directory
+    if os.path.exists(fonts_dir):
+        # Add Obelix Pro font specifically
+        obelix_path = os.path.join(fonts_dir, "Obelix Pro.ttf")
+        if os.path.exists(obelix_path):
+            fonts["Obelix Pro"] = obelix_path
+        
+        for font_family in os.listdir(fonts_dir):
+            family_path = os.path.join(fonts_dir, font_family)
+            if os.path.isdir(family_path):
+                # Look for font files in static subdirectory
+                static_path = os.path.join(family_path, "static")
+                if os.path.exists(static_path):
+                    for font_file in os.listdir(static_path):
+                        if font_file.endswith(('.ttf', '.otf')):
+                            font_name = f"{font_family} - {font_file.replace('.ttf', '').replace('.otf', '')}"
+                            font_path = os.path.join(static_path, font_file)
+                            fonts[font_name] = font_path
+                
+                # Also check root of family directory
+                for font_file in os.listdir(family_path):
+                    if font_file.endswith(('.ttf', '.otf')):
+                        font_name = f"{font_family} - {font_file.replace('.ttf', '').replace('.otf', '')}"
+                        font_path = os.path.join(family_path, font_file)
+                        fonts[font_name] = font_path
+    
+    return fonts
+
+
 class VideoProcessor:
     """Video processor for creating professional shorts with custom fonts."""
     
@@ -51,7 +105,6 @@ class VideoProcessor:
             ]
             
             result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            import json
             data = json.loads(result.stdout)
             
             # Find video stream
@@ -114,9 +167,9 @@ class VideoProcessor:
         """Check if FFmpeg is available."""
         try:
             subprocess.run(['ffmpeg', '-version'], 
-                         capture_output=True, check=True, timeout=10)
+                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True, timeout=10)
             subprocess.run(['ffprobe', '-version'], 
-                         capture_output=True, check=True, timeout=10)
+                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True, timeout=10)
             return True
         except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired):
             return False
@@ -180,49 +233,13 @@ class VideoProcessor:
         Returns:
             Dict mapping font names to font file paths
         """
-        fonts = {}
-        
-        # Default system fonts
-        system_fonts = {
-            "DejaVu Sans Bold": "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
-            "DejaVu Sans": "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
-            "Liberation Sans Bold": "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
-            "Liberation Sans": "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
-        }
-        
-        # Add system fonts that exist
-        for name, path in system_fonts.items():
-            if os.path.exists(path):
-                fonts[name] = path
-        
-        # Custom fonts from fonts directory
         fonts_dir = "/app/fonts"
-        if os.path.exists(fonts_dir):
-            # Add Obelix Pro font specifically
-            obelix_path = os.path.join(fonts_dir, "Obelix Pro.ttf")
-            if os.path.exists(obelix_path):
-                fonts["Obelix Pro"] = obelix_path
-            
-            for font_family in os.listdir(fonts_dir):
-                family_path = os.path.join(fonts_dir, font_family)
-                if os.path.isdir(family_path):
-                    # Look for font files in static subdirectory
-                    static_path = os.path.join(family_path, "static")
-                    if os.path.exists(static_path):
-                        for font_file in os.listdir(static_path):
-                            if font_file.endswith(('.ttf', '.otf')):
-                                font_name = f"{font_family} - {font_file.replace('.ttf', '').replace('.otf', '')}"
-                                font_path = os.path.join(static_path, font_file)
-                                fonts[font_name] = font_path
-                    
-                    # Also check root of family directory
-                    for font_file in os.listdir(family_path):
-                        if font_file.endswith(('.ttf', '.otf')):
-                            font_name = f"{font_family} - {font_file.replace('.ttf', '').replace('.otf', '')}"
-                            font_path = os.path.join(family_path, font_file)
-                            fonts[font_name] = font_path
-        
-        return fonts
+        try:
+            mtime_ns = os.stat(fonts_dir).st_mtime_ns
+        except OSError:
+            mtime_ns = 0
+        # Копия, чтобы вызывающий код не испортил закэшированный результат
+        return dict(_scan_fonts(fonts_dir, mtime_ns))
     
     def create_preview_image(
         self, 
@@ -257,8 +274,8 @@ class VideoProcessor:
             
             cmd = [
                 'ffmpeg',
+                '-ss', preview_time,  # Input seek, frames before the preview are not decoded
                 '-i', video_path,
-                '-ss', preview_time,
                 '-vframes', '1',
                 '-filter_complex', video_filter,
                 '-map', '[output]',
@@ -266,10 +283,10 @@ class VideoProcessor:
                 output_path
             ]
             
-            result = subprocess.run(
+            subprocess.run(
                 cmd,
-                capture_output=True,
-                text=True,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
                 check=True,
                 timeout=30
             )
@@ -408,8 +425,8 @@ class VideoProcessor:
             # Build FFmpeg command for professional shorts with precise timing
             cmd = [
                 'ffmpeg',
+                '-ss', str(start_time),  # Input seek, still frame-accurate when re-encoding
                 '-i', video_path,
-                '-ss', str(start_time),  # Precise seeking after input
                 '-t', str(duration),
                 '-filter_complex', self._build_video_filters(output_width, output_height, title, font_path),
                 '-map', '[output]',  # Map the processed video stream
@@ -427,10 +444,11 @@ class VideoProcessor:
             ]
             
             # Run FFmpeg
-            result = subprocess.run(
+            # stderr is only decoded if FFmpeg fails
+            subprocess.run(
                 cmd, 
-                capture_output=True, 
-                text=True, 
+                stdout=subprocess.DEVNULL, 
+                stderr=subprocess.PIPE, 
                 check=True,
                 timeout=600  # 10 minute timeout for complex processing
             )
@@ -455,8 +473,9 @@ class VideoProcessor:
                 raise RuntimeError("Output file was not created")
                 
         except subprocess.CalledProcessError as e:
-            logger.error(f"FFmpeg failed: {e.stderr}")
-            raise RuntimeError(f"Professional video processing failed: {e.stderr}")
+            stderr = e.stderr.decode('utf-8', 'replace') if e.stderr else ''
+            logger.error(f"FFmpeg failed: {stderr}")
+            raise RuntimeError(f"Professional video processing failed: {stderr}")
         except subprocess.TimeoutExpired:
             logger.error("FFmpeg timeout during professional processing")
             raise RuntimeError("Professional video processing timeout")
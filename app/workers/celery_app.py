@@ -20,10 +20,11 @@ celery_app = Celery(
 
 # Configure Celery
 celery_app.conf.update(
-    # Serialization
-    task_serializer="json",
-    result_serializer="json",
-    accept_content=["json"],
+    # Serialization: msgpack is smaller and faster than JSON for fragment lists,
+    # JSON is still accepted for messages queued before the switch
+    task_serializer="msgpack",
+    result_serializer="msgpack",
+    accept_content=["msgpack", "json"],
     
     # Timezone
     timezone="UTC",
@@ -33,6 +34,10 @@ celery_app.conf.update(
     task_acks_late=False,  # Changed from True to prevent duplicate execution
     task_reject_on_worker_lost=False,  # Changed from True to prevent auto-retry
     task_track_started=True,
+    # Этапы цепочки с acks_late (скачивание, разбиение, чанки) подтверждаются после
+    # выполнения; сообщение не должно вернуться в очередь, пока задача ещё идёт,
+    # поэтому visibility timeout Redis больше task_time_limit
+    broker_transport_options={'visibility_timeout': 32400},  # 9 часов
     
     # Results
     result_expires=3600,  # 1 hour
@@ -41,6 +46,8 @@ celery_app.conf.update(
     # Worker settings
     worker_max_tasks_per_child=1000,
     worker_disable_rate_limits=False,
+    # Safe default for encode workers; upload-only workers raise it with
+    # --prefetch-multiplier (see docker-compose.yml)
     worker_prefetch_multiplier=1,
     
     # Task routing
@@ -48,7 +55,12 @@ celery_app.conf.update(
         'app.workers.video_tasks.download_video': {'queue': 'video_download'},
         'app.workers.video_tasks.process_video': {'queue': 'video_processing'},
         'app.workers.video_tasks.process_video_chain_optimized': {'queue': 'video_processing'},
+        'app.workers.video_tasks.process_downloaded_video_optimized': {'queue': 'video_processing'},
+        'app.workers.video_tasks.process_single_chunk': {'queue': 'video_processing'},
+        'app.workers.video_tasks.finalize_chunks': {'queue': 'video_processing'},
         'app.workers.upload_tasks.upload_to_drive': {'queue': 'uploads'},
+        'app.workers.upload_tasks.upload_fragment_to_drive': {'queue': 'uploads'},
+        'app.workers.upload_tasks.combine_upload_results': {'queue': 'uploads'},
         'app.workers.upload_tasks.update_spreadsheet': {'queue': 'default'},
     },
     
@@ -68,6 +80,7 @@ celery_app.conf.update(
     # Task annotations for rate limiting
     task_annotations={
         'app.workers.video_tasks.download_video': {'rate_limit': '5/m'},
+        # Per job, as before; the per-fragment chord subtasks are not throttled
         'app.workers.upload_tasks.upload_to_drive': {'rate_limit': '10/m'},
         'app.workers.upload_tasks.update_spreadsheet': {'rate_limit': '60/m'},
     },
@@ -3,7 +3,7 @@ Celery tasks for upload operations.
 """
 from typing import Dict, Any, List
 
-from celery import shared_task
+from celery import chord, shared_task
 from celery.utils.log import get_task_logger
 
 from app.workers.celery_app import VideoTask
@@ -16,6 +16,10 @@ def upload_to_drive(self, task_id: str, fragments: List[Dict[str, Any]]) -> Dict
     """
     Upload video fragments to Google Drive.
     
+    Every fragment is uploaded by its own upload_fragment_to_drive subtask,
+    so uploads run in parallel and a failed fragment is retried on its own.
+    The task is replaced by a chord whose callback combines the results.
+    
     Args:
         task_id: Video task ID
         fragments: List of video fragments to upload
@@ -23,38 +27,68 @@ def upload_to_drive(self, task_id: str, fragments: List[Dict[str, Any]]) -> Dict
     Returns:
         Dict with upload results
     """
-    logger.info(f"Starting Google Drive upload for task {task_id}")
+    logger.info(f"Starting Google Drive upload for task {task_id}: {len(fragments)} fragments")
+    
+    if not fragments:
+        return combine_upload_results([], task_id)
+    
+    raise self.replace(chord(
+        [upload_fragment_to_drive.s(task_id, fragment) for fragment in fragments],
+        combine_upload_results.s(task_id)
+    ))
+
+
+@shared_task(base=VideoTask, bind=True)
+def upload_fragment_to_drive(self, task_id: str, fragment: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Upload a single video fragment to Google Drive.
     
+    Args:
+        task_id: Video task ID
+        fragment: Video fragment to upload
+        
+    Returns:
+        Dict with the fragment upload result
+    """
     try:
         # TODO: Implement actual Google Drive upload
         # For now, return mock upload data
-        upload_results = []
-        
-        for fragment in fragments:
-            upload_result = {
-                "fragment_id": fragment["id"],
-                "drive_url": f"https://drive.google.com/file/d/mock_id_{fragment['id']}/view",
-                "file_id": f"mock_id_{fragment['id']}",
-                "uploaded_at": "2024-01-01T00:00:00Z",
-                "size_bytes": fragment["size_bytes"]
-            }
-            upload_results.append(upload_result)
-        
-        result = {
-            "task_id": task_id,
-            "uploaded_count": len(upload_results),
-            "total_size_mb": sum(r["size_bytes"] for r in upload_results) / (1024 * 1024),
-            "uploads": upload_results
+        return {
+            "fragment_id": fragment["id"],
+            "drive_url": f"https://drive.google.com/file/d/mock_id_{fragment['id']}/view",
+            "file_id": f"mock_id_{fragment['id']}",
+            "uploaded_at": "2024-01-01T00:00:00Z",
+            "size_bytes": fragment["size_bytes"]
         }
         
-        logger.info(f"Google Drive upload completed for task {task_id}: {len(upload_results)} files")
-        return result
-        
     except Exception as exc:
-        logger.error(f"Google Drive upload failed for task {task_id}: {exc}")
+        logger.error(f"Google Drive upload of fragment {fragment.get('id')} failed for task {task_id}: {exc}")
         raise self.retry(exc=exc, countdown=60, max_retries=3)
 
 
+@shared_task(base=VideoTask, bind=True)
+def combine_upload_results(self, upload_results: List[Dict[str, Any]], task_id: str) -> Dict[str, Any]:
+    """
+    Combine the fragment uploads of a task into one result.
+    
+    Args:
+        upload_results: Results of upload_fragment_to_drive in fragment order
+        task_id: Video task ID
+        
+    Returns:
+        Dict with upload results
+    """
+    result = {
+        "task_id": task_id,
+        "uploaded_count": len(upload_results),
+        "total_size_mb": sum(r["size_bytes"] for r in upload_results) / (1024 * 1024),
+        "uploads": upload_results
+    }
+    
+    logger.info(f"Google Drive upload completed for task {task_id}: {len(upload_results)} files")
+    return result
+
+
 @shared_task(base=VideoTask, bind=True)
 def update_spreadsheet(self, task_id: str, user_id: int, video_data: Dict[str, Any]) -> Dict[str, Any]:
     """
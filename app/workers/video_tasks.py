@@ -2,15 +2,28 @@
 Celery tasks for video processing operations.
 """
 import os
+import re
+import copy
+import time
 import uuid
+import asyncio
+import shutil
+import threading
 import tempfile
 import logging
-from typing import Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
 
-from celery import shared_task
+from celery import shared_task, chain, chord, group
+from celery.signals import task_postrun, worker_process_init, worker_process_shutdown
 from celery.utils.log import get_task_logger
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from aiogram import Bot
+from aiogram.types import FSInputFile
+from sqlalchemy import create_engine, text, update, select, cast, func, JSON
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import sessionmaker, scoped_session
 
 from app.workers.celery_app import VideoTask
 from app.config.constants import VideoStatus, DEFAULT_TEXT_STYLES, get_subtitle_font_path
@@ -19,25 +32,243 @@ from app.database.models import VideoTask as VideoTaskModel, VideoFragment, User
 from app.video_processing.downloader import VideoDownloader
 from app.video_processing.processor import VideoProcessor
 from app.services.user_settings import UserSettingsService
+from app.services.google_drive import GoogleDriveService
+from app.services.redis_service import set_task_progress, count_finished_chunk, clear_task_progress
+from app.services.google_sheets import GoogleSheetsService
+from app.bot.keyboards.main_menu import get_back_keyboard
 
 logger = logging.getLogger(__name__)
 
 # Create synchronous database session for Celery tasks
-engine = create_engine(settings.database_url.replace('+asyncpg', '+psycopg2'))
+engine = create_engine(
+    settings.database_url.replace('+asyncpg', '+psycopg2'),
+    pool_size=max(10, settings.video_max_concurrent_tasks * 2),
+    max_overflow=20,
+    pool_pre_ping=True,  # Проверка соединения перед выдачей из пула
+    pool_recycle=1800,  # Recycle connections every 30 minutes
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Одна сессия на поток воркера, переиспользуется между обновлениями статуса
+Session = scoped_session(SessionLocal)
 
 
+@contextmanager
 def get_sync_db_session():
-    """Get synchronous database session for Celery tasks."""
-    return SessionLocal()
+    """
+    Get the thread-local synchronous database session for Celery tasks.
+    
+    The session is not closed on exit: uncommitted work is rolled back
+    (as close() did) and the connection returns to the pool, while the
+    Session object itself is reused until the task finishes.
+    """
+    session = Session()
+    try:
+        yield session
+    finally:
+        session.rollback()
+
+
+@worker_process_init.connect
+def _reset_engine(**kwargs) -> None:
+    """Give each forked worker its own pool instead of the parent's sockets."""
+    engine.dispose(close=False)
+
+
+@task_postrun.connect
+def _remove_db_session(**kwargs) -> None:
+    """Drop the thread-local session once a task has finished."""
+    Session.remove()
+
+
+# Цикл событий и Bot живут весь процесс воркера: aiohttp-сессия бота привязана
+# к циклу, так что соединения с Telegram API переиспользуются между задачами
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+_worker_bot = None
+
+
+def _get_worker_loop() -> asyncio.AbstractEventLoop:
+    """Get the event loop of this worker process, creating it on first use."""
+    global _worker_loop
+    if _worker_loop is None or _worker_loop.is_closed():
+        _worker_loop = asyncio.new_event_loop()
+    return _worker_loop
+
+
+def _get_worker_bot():
+    """Get the Telegram Bot of this worker process, creating it on first use."""
+    global _worker_bot
+    if _worker_bot is None:
+        _worker_bot = Bot(token=settings.telegram_bot_token.get_secret_value())
+    return _worker_bot
+
+
+@worker_process_init.connect
+def _reset_worker_loop(**kwargs) -> None:
+    """Don't inherit the parent's loop and bot: each forked worker creates its own."""
+    global _worker_loop, _worker_bot
+    _worker_loop = None
+    _worker_bot = None
+
+
+@worker_process_shutdown.connect
+def _close_worker_bot(**kwargs) -> None:
+    """Close the cached bot session and event loop when the worker process exits."""
+    global _worker_bot
+    if _worker_loop is None or _worker_loop.is_closed():
+        return
+    try:
+        if _worker_bot is not None:
+            _worker_loop.run_until_complete(_worker_bot.session.close())
+            _worker_bot = None
+    finally:
+        _worker_loop.close()
+
+
+# Понятные пользователю сообщения об ошибках скачивания: первое совпадение побеждает
+DOWNLOAD_ERROR_MESSAGES = [
+    (re.compile(r"Sign in to confirm you're not a bot|(?i:bot detection)"),
+     "YouTube требует подтверждения. Попробуйте другое видео или повторите позже."),
+    (re.compile(r"Video unavailable"), "Видео недоступно. Проверьте ссылку или попробуйте другое видео."),
+    (re.compile(r"Video is private"), "Видео является приватным и недоступно для скачивания."),
+    (re.compile(r"removed by the uploader"), "Видео было удалено автором."),
+    (re.compile(r"Video too long"), "Видео слишком длинное (максимум 3 часа)."),
+    (re.compile(r"Video too large"), "Видео слишком большое (максимум 2GB)."),
+    (re.compile(r"Invalid YouTube URL"), "Некорректная ссылка на YouTube."),
+    (re.compile(r"timeout", re.IGNORECASE), "Превышено время ожидания при скачивании."),
+    (re.compile(r"403|(?i:forbidden)"), "Доступ к видео ограничен."),
+    (re.compile(r"All download strategies failed"),
+     "YouTube блокирует автоматическое скачивание этого видео. Попробуйте другое видео."),
+]
+# Ошибки, после которых повторное скачивание бессмысленно
+PERMANENT_DOWNLOAD_ERROR = re.compile(r"unavailable|private|removed|invalid url", re.IGNORECASE)
+BOT_DETECTION_ERROR = re.compile(r"bot detection", re.IGNORECASE)
 
 
-def get_user_id_by_task(task_id):
+def _set_task_state(
+    task_id: str,
+    durable: bool = True,
+    metadata: Optional[Dict[str, Any]] = None,
+    **fields: Any
+) -> Optional[int]:
+    """
+    Update task columns with a single UPDATE ... RETURNING, without loading the row.
+    
+    Args:
+        task_id: Video task ID
+        durable: False for progress-only updates, their commit doesn't wait
+            for the WAL flush (losing one on a crash is harmless)
+        metadata: Keys to merge into video_metadata (merged in SQL via jsonb ||)
+        **fields: Column values to set
+        
+    Returns:
+        User ID of the task, None if the task doesn't exist
+    """
+    if metadata:
+        fields['video_metadata'] = cast(
+            func.coalesce(cast(VideoTaskModel.video_metadata, JSONB), cast({}, JSONB))
+            .op('||')(cast(metadata, JSONB)),
+            JSON,
+        )
     with get_sync_db_session() as session:
-        task = session.get(VideoTaskModel, task_id)
-        return task.user_id if task else None
+        if not durable:
+            session.execute(text("SET LOCAL synchronous_commit TO OFF"))
+        user_id = session.execute(
+            update(VideoTaskModel)
+            .where(VideoTaskModel.id == task_id)
+            .values(**fields)
+            .returning(VideoTaskModel.user_id)
+        ).scalar_one_or_none()
+        session.commit()
+    if user_id is None:
+        logger.warning(f"Task {task_id} not found, state update {list(fields)} skipped")
+    return user_id
 
-@shared_task(base=VideoTask, bind=True)
+
+def _make_task_dir(path: str) -> None:
+    """
+    Create a per-task directory under an existing root.
+    
+    The roots are created when settings are loaded, so this is normally a
+    single mkdir; makedirs is only the fallback if a root was removed.
+    
+    Args:
+        path: Task directory path
+    """
+    try:
+        os.mkdir(path)
+    except FileExistsError:
+        pass
+    except FileNotFoundError:
+        os.makedirs(path, exist_ok=True)
+
+
+def _drop_page_cache(path: str) -> None:
+    """
+    Tell the kernel a file's cached pages won't be needed again.
+    
+    No-op where posix_fadvise is unavailable or the file is on tmpfs.
+    
+    Args:
+        path: File that has been fully read
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    except OSError as e:
+        logger.debug(f"posix_fadvise failed for {path}: {e}")
+
+
+def _claim_task(task_id: str, is_retry: bool) -> Optional[Dict[str, Any]]:
+    """
+    Move a task to DOWNLOADING unless it is finished or already being processed.
+    
+    The duplicate check and the status change are one conditional UPDATE;
+    the status is only read back to explain a refusal.
+    
+    Args:
+        task_id: Video task ID
+        is_retry: Retries may take over a task that is still PROCESSING/UPLOADING
+        
+    Returns:
+        None if the task was claimed, otherwise the error result for the chain
+    """
+    skip_statuses = [VideoStatus.COMPLETED, VideoStatus.FAILED]
+    if not is_retry:
+        skip_statuses += [VideoStatus.PROCESSING, VideoStatus.UPLOADING]
+    
+    with get_sync_db_session() as session:
+        claimed = session.execute(
+            update(VideoTaskModel)
+            .where(VideoTaskModel.id == task_id, VideoTaskModel.status.notin_(skip_statuses))
+            .values(status=VideoStatus.DOWNLOADING, progress=10)
+            .returning(VideoTaskModel.id)
+        ).scalar_one_or_none()
+        if claimed is not None:
+            session.commit()
+            return None
+        status = session.execute(
+            select(VideoTaskModel.status).where(VideoTaskModel.id == task_id)
+        ).scalar_one_or_none()
+    
+    if status is None:
+        logger.error(f"Task {task_id} not found in database")
+        return {"error": "Task not found"}
+    
+    # If task is already completed or failed, don't process again
+    if status in (VideoStatus.COMPLETED, VideoStatus.FAILED):
+        logger.info(f"Task {task_id} already {status.value}, skipping duplicate execution")
+        return {"error": f"Task already {status.value}"}
+    
+    # Task is already being processed by another worker
+    logger.warning(f"Task {task_id} is already being processed by another worker")
+    return {"error": "Task already being processed"}
+
+@shared_task(base=VideoTask, bind=True, acks_late=True, reject_on_worker_lost=True)
 def download_video(self, task_id: str, url: str, quality: str = "best", settings_dict: Dict[str, Any] = None) -> Dict[str, Any]:
     """
     Download video from URL.
@@ -56,34 +287,21 @@ def download_video(self, task_id: str, url: str, quality: str = "best", settings
     if settings_dict is None:
         settings_dict = {}
     
-    # Add delay between retries to avoid rapid requests
-    if self.request.retries > 0:
-        import time
-        delay = min(30 * (2 ** self.request.retries), 300)  # Max 5 minute delay
-        logger.info(f"Retry attempt {self.request.retries}, waiting {delay} seconds to avoid rate limiting...")
-        time.sleep(delay)
-    
     try:
         # Update task status
-        with get_sync_db_session() as session:
-            task = session.get(VideoTaskModel, task_id)
-            if task:
-                task.status = VideoStatus.DOWNLOADING
-                task.progress = 0
-                session.commit()
+        # The same UPDATE returns the user_id of this task
+        user_id = _set_task_state(task_id, status=VideoStatus.DOWNLOADING, progress=0)
         
         # Create download directory
-        download_dir = f"/tmp/videos/{task_id}"
-        os.makedirs(download_dir, exist_ok=True)
-        
-        # Get user_id for this task
-        user_id = get_user_id_by_task(task_id)
+        download_dir = os.path.join(settings.video_temp_dir, task_id)
+        _make_task_dir(download_dir)
         # Получаем индивидуальный прокси пользователя (sync)
         user_proxy = None
         if user_id:
-            import asyncio
             try:
-                user_settings = asyncio.run(UserSettingsService.get_user_settings(user_id))
+                user_settings = _get_worker_loop().run_until_complete(
+                    UserSettingsService.get_user_settings(user_id)
+                )
                 user_proxy = user_settings.get('download_proxy')
             except Exception as e:
                 logger.warning(f"Не удалось получить индивидуальный прокси пользователя {user_id}: {e}")
@@ -107,60 +325,29 @@ def download_video(self, task_id: str, url: str, quality: str = "best", settings
             logger.error(f"Download error for task {task_id}: {error_msg}")
             
             # Categorize the error for better user feedback
-            if "Sign in to confirm you're not a bot" in error_msg or "bot detection" in error_msg.lower():
-                user_friendly_error = "YouTube требует подтверждения. Попробуйте другое видео или повторите позже."
-            elif "Video unavailable" in error_msg:
-                user_friendly_error = "Видео недоступно. Проверьте ссылку или попробуйте другое видео."
-            elif "Video is private" in error_msg:
-                user_friendly_error = "Видео является приватным и недоступно для скачивания."
-            elif "removed by the uploader" in error_msg:
-                user_friendly_error = "Видео было удалено автором."
-            elif "Video too long" in error_msg:
-                user_friendly_error = "Видео слишком длинное (максимум 3 часа)."
-            elif "Video too large" in error_msg:
-                user_friendly_error = "Видео слишком большое (максимум 2GB)."
-            elif "Invalid YouTube URL" in error_msg:
-                user_friendly_error = "Некорректная ссылка на YouTube."
-            elif "timeout" in error_msg.lower():
-                user_friendly_error = "Превышено время ожидания при скачивании."
-            elif "403" in error_msg or "forbidden" in error_msg.lower():
-                user_friendly_error = "Доступ к видео ограничен."
-            elif "All download strategies failed" in error_msg:
-                user_friendly_error = "YouTube блокирует автоматическое скачивание этого видео. Попробуйте другое видео."
-            else:
-                user_friendly_error = f"Ошибка скачивания: {error_msg[:100]}"
+            user_friendly_error = next(
+                (message for pattern, message in DOWNLOAD_ERROR_MESSAGES if pattern.search(error_msg)),
+                f"Ошибка скачивания: {error_msg[:100]}"
+            )
             
             # Update task with user-friendly error
-            with get_sync_db_session() as session:
-                task = session.get(VideoTaskModel, task_id)
-                if task:
-                    task.status = VideoStatus.FAILED
-                    task.error_message = user_friendly_error
-                    session.commit()
+            _set_task_state(task_id, status=VideoStatus.FAILED, error_message=user_friendly_error)
             
             # Re-raise with original error for retry logic
             raise download_error
         
         # Update task with metadata
-        with get_sync_db_session() as session:
-            task = session.get(VideoTaskModel, task_id)
-            if task:
-                # Update video_metadata (not metadata)
-                if task.video_metadata is None:
-                    task.video_metadata = {}
-                task.video_metadata.update({
-                    "title": download_result["title"],
-                    "duration": download_result["duration"],
-                    "size_bytes": download_result["file_size"],
-                    "format": download_result["format"],
-                    "resolution": download_result["resolution"],
-                    "fps": 30,  # Default FPS
-                    "thumbnail": download_result.get("thumbnail"),
-                    "description": download_result.get("description", ""),
-                    "uploader": download_result.get("author", "")
-                })
-                task.progress = 100
-                session.commit()
+        _set_task_state(task_id, progress=100, metadata={
+            "title": download_result["title"],
+            "duration": download_result["duration"],
+            "size_bytes": download_result["file_size"],
+            "format": download_result["format"],
+            "resolution": download_result["resolution"],
+            "fps": 30,  # Default FPS
+            "thumbnail": download_result.get("thumbnail"),
+            "description": download_result.get("description", ""),
+            "uploader": download_result.get("author", "")
+        })
         
         logger.info(f"Video download completed for task {task_id}")
         return download_result
@@ -171,23 +358,31 @@ def download_video(self, task_id: str, url: str, quality: str = "best", settings
         # Update task status to failed if not already updated
         try:
             with get_sync_db_session() as session:
-                task = session.get(VideoTaskModel, task_id)
-                if task and task.status != VideoStatus.FAILED:
-                    task.status = VideoStatus.FAILED
-                    if not task.error_message:  # Only set if not already set above
-                        task.error_message = str(exc)[:200]  # Limit error message length
-                    session.commit()
+                session.execute(
+                    update(VideoTaskModel)
+                    .where(VideoTaskModel.id == task_id, VideoTaskModel.status != VideoStatus.FAILED)
+                    .values(
+                        status=VideoStatus.FAILED,
+                        # Only set if not already set above; limit error message length
+                        error_message=func.coalesce(
+                            func.nullif(VideoTaskModel.error_message, ''), str(exc)[:200]
+                        ),
+                    )
+                )
+                session.commit()
         except Exception as db_error:
             logger.error(f"Failed to update task status: {db_error}")
         
         # Don't retry if it's a permanent error
-        if any(keyword in str(exc).lower() for keyword in ['unavailable', 'private', 'removed', 'invalid url']):
+        exc_msg = str(exc)
+        if PERMANENT_DOWNLOAD_ERROR.search(exc_msg):
             logger.info(f"Permanent error detected for task {task_id}, not retrying: {exc}")
             raise exc  # Don't retry
         
         # Retry with exponential backoff, but limited retries for bot detection
-        max_retries = 1 if "bot detection" in str(exc).lower() else 3
-        countdown = 90 * (2 ** self.request.retries)  # Start with 90 seconds
+        max_retries = 1 if BOT_DETECTION_ERROR.search(exc_msg) else 3
+        # Пауза между попытками — отложенное сообщение в брокере, слот воркера свободен
+        countdown = min(90 * (2 ** self.request.retries), 600)  # Start with 90 seconds, max 10 minutes
         
         logger.info(f"Scheduling retry {self.request.retries + 1}/{max_retries} for task {task_id} in {countdown} seconds")
         raise self.retry(exc=exc, countdown=countdown, max_retries=max_retries)
@@ -210,12 +405,7 @@ def process_video(self, task_id: str, local_path: str, settings_dict: Dict[str,
     
     try:
         # Update task status
-        with get_sync_db_session() as session:
-            task = session.get(VideoTaskModel, task_id)
-            if task:
-                task.status = VideoStatus.PROCESSING
-                task.progress = 0
-                session.commit()
+        _set_task_state(task_id, status=VideoStatus.PROCESSING, progress=0)
         
         # Extract settings
         fragment_duration = settings_dict.get("fragment_duration", 30)
@@ -223,11 +413,8 @@ def process_video(self, task_id: str, local_path: str, settings_dict: Dict[str,
         enable_subtitles = settings_dict.get("enable_subtitles", True)
         title = settings_dict.get("title", "")
         
-        # Create output directory
-        output_dir = f"/tmp/processed/{task_id}"
-        os.makedirs(output_dir, exist_ok=True)
-        
-        # Initialize processor
+        # Initialize processor (it creates its output directory)
+        output_dir = os.path.join(settings.video_processed_dir, task_id)
         processor = VideoProcessor(output_dir)
         
         # Process video into fragments with professional layout
@@ -251,9 +438,9 @@ def process_video(self, task_id: str, local_path: str, settings_dict: Dict[str,
             )
         
         fragments = []
-        total_fragments = len(fragments_data)
+        fragment_rows = []
         
-        for i, fragment_data in enumerate(fragments_data):
+        for fragment_data in fragments_data:
             fragment_id = str(uuid.uuid4())
             
             # Prepare fragment info
@@ -273,35 +460,36 @@ def process_video(self, task_id: str, local_path: str, settings_dict: Dict[str,
             }
             fragments.append(fragment_info)
             
-            # Save fragment to database
-            with get_sync_db_session() as session:
-                fragment = VideoFragment(
-                    id=fragment_id,
-                    task_id=task_id,
-                    fragment_number=fragment_data["fragment_number"],
-                    filename=fragment_data["filename"],
-                    local_path=fragment_data["local_path"],
-                    duration=fragment_data["duration"],
-                    start_time=fragment_data["start_time"],
-                    end_time=fragment_data["end_time"],
-                    size_bytes=fragment_data["size_bytes"],
-                    has_subtitles=enable_subtitles
+            fragment_rows.append(dict(
+                id=fragment_id,
+                task_id=task_id,
+                fragment_number=fragment_data["fragment_number"],
+                filename=fragment_data["filename"],
+                local_path=fragment_data["local_path"],
+                duration=fragment_data["duration"],
+                start_time=fragment_data["start_time"],
+                end_time=fragment_data["end_time"],
+                size_bytes=fragment_data["size_bytes"],
+                has_subtitles=enable_subtitles
+            ))
+        
+        # Save all fragments and the final progress in one transaction
+        with get_sync_db_session() as session:
+            session.bulk_insert_mappings(VideoFragment, fragment_rows)
+            if fragment_rows:
+                session.execute(
+                    update(VideoTaskModel)
+                    .where(VideoTaskModel.id == task_id)
+                    .values(progress=100)
                 )
-                session.add(fragment)
-                session.commit()
-            
-            # Update progress
-            progress = int((i + 1) / total_fragments * 100)
-            with get_sync_db_session() as session:
-                task = session.get(VideoTaskModel, task_id)
-                if task:
-                    task.progress = progress
-                    session.commit()
+            session.commit()
         
         # Clean up original downloaded file
-        if os.path.exists(local_path):
-            os.remove(local_path)
+        try:
+            os.unlink(local_path)
             logger.info(f"Cleaned up original file: {local_path}")
+        except FileNotFoundError:
+            pass
         
         logger.info(f"Video processing completed for task {task_id}, created {len(fragments)} fragments")
         return fragments
@@ -310,12 +498,7 @@ def process_video(self, task_id: str, local_path: str, settings_dict: Dict[str,
         logger.error(f"Video processing failed for task {task_id}: {exc}")
         
         # Update task status to failed
-        with get_sync_db_session() as session:
-            task = session.get(VideoTaskModel, task_id)
-            if task:
-                task.status = VideoStatus.FAILED
-                task.error_message = str(exc)
-                session.commit()
+        _set_task_state(task_id, status=VideoStatus.FAILED, error_message=str(exc))
         
         raise self.retry(exc=exc, countdown=120, max_retries=2)
 
@@ -327,32 +510,14 @@ def process_uploaded_file_chain(self, task_id: str, file_id: str, file_name: str
     """
     logger.info(f"Starting uploaded file processing chain for task {task_id}")
     
-    # Check for duplicate tasks
-    with get_sync_db_session() as session:
-        task = session.get(VideoTaskModel, task_id)
-        if not task:
-            logger.error(f"Task {task_id} not found in database")
-            return {"error": "Task not found"}
-        
-        # If task is already completed or failed, don't process again
-        if task.status in [VideoStatus.COMPLETED, VideoStatus.FAILED]:
-            logger.info(f"Task {task_id} already {task.status.value}, skipping duplicate execution")
-            return {"error": f"Task already {task.status.value}"}
-        
-        # Check if task is already being processed by another worker
-        if task.status in [VideoStatus.PROCESSING, VideoStatus.UPLOADING] and self.request.retries == 0:
-            logger.warning(f"Task {task_id} is already being processed by another worker")
-            return {"error": "Task already being processed"}
+    # Check for duplicate tasks; the same UPDATE moves the task to Step 1
+    refusal = _claim_task(task_id, is_retry=self.request.retries > 0)
+    if refusal:
+        return refusal
     
     try:
         # Step 1: Download file from Telegram
         logger.info(f"Step 1/7: Downloading file from Telegram for task {task_id}")
-        with get_sync_db_session() as session:
-            task = session.get(VideoTaskModel, task_id)
-            if task:
-                task.status = VideoStatus.DOWNLOADING
-                task.progress = 10
-                session.commit()
         
         # We need to get the bot instance - this will need to be passed or accessed differently
         # For now, we'll create a sync version of the download
@@ -361,8 +526,7 @@ def process_uploaded_file_chain(self, task_id: str, file_id: str, file_name: str
         # Step 2: Split video into chunks if it's long
         logger.info(f"Step 2/7: Checking if video needs to be split for task {task_id}")
         
-        output_dir = f"/tmp/processed/{task_id}"
-        os.makedirs(output_dir, exist_ok=True)
+        output_dir = os.path.join(settings.video_processed_dir, task_id)
         processor = VideoProcessor(output_dir)
         
         # Split video into chunks if longer than 5 minutes
@@ -373,12 +537,7 @@ def process_uploaded_file_chain(self, task_id: str, file_id: str, file_name: str
         
         # Step 3: Process each chunk separately
         logger.info(f"Step 3/7: Processing video chunks for task {task_id}")
-        with get_sync_db_session() as session:
-            task = session.get(VideoTaskModel, task_id)
-            if task:
-                task.status = VideoStatus.PROCESSING
-                task.progress = 30
-                session.commit()
+        _set_task_state(task_id, status=VideoStatus.PROCESSING, progress=30)
 
         # Get user style settings
         user_settings = get_user_settings(task_id)
@@ -398,8 +557,8 @@ def process_uploaded_file_chain(self, task_id: str, file_id: str, file_name: str
                 
                 # Create chunk-specific output directory
                 chunk_output_dir = os.path.join(output_dir, f"chunk_{i+1}")
-                os.makedirs(chunk_output_dir, exist_ok=True)
-                chunk_processor = VideoProcessor(chunk_output_dir)
+                # Один процессор на все чанки, меняется только каталог вывода
+                processor.set_output_dir(chunk_output_dir)
                 
                 # Process chunk with title including part number only if enabled and multiple chunks
                 chunk_title = settings_dict.get("title", "")
@@ -412,26 +571,26 @@ def process_uploaded_file_chain(self, task_id: str, file_id: str, file_name: str
                 
                 # Use shorter timeout for chunks
                 chunk_settings['ffmpeg_timeout'] = min(processing_settings.get('ffmpeg_timeout', 3600), 3600)
+                # Fragments are written by the same encode, no separate cutting pass
+                chunk_settings['segment_duration'] = settings_dict.get("fragment_duration", 30)
                 
-                chunk_result = chunk_processor.process_video_ffmpeg(
+                chunk_result = processor.process_video_ffmpeg(
                     video_path=chunk_path,
                     settings=chunk_settings
                 )
+                # Фрагменты чанка готовы, сам чанк больше не нужен: на диске не копятся все чанки сразу
+                cleanup_temp_files([chunk_path])
                 
                 processed_chunks.append({
                     'chunk_number': i + 1,
                     'chunk_path': chunk_path,
-                    'processed_path': chunk_result['processed_video_path'],
-                    'processor': chunk_processor
+                    'fragments': chunk_result['fragments']
                 })
                 
-                # Update progress
+                # Update progress in Redis, Postgres only keeps the stage checkpoints
                 chunk_progress = 30 + int((i + 1) / total_chunks * 30)  # 30-60%
-                with get_sync_db_session() as session:
-                    task = session.get(VideoTaskModel, task_id)
-                    if task:
-                        task.progress = chunk_progress
-                        session.commit()
+                if not set_task_progress(task_id, chunk_progress):
+                    _set_task_state(task_id, durable=False, progress=chunk_progress)
                         
                 logger.info(f"Chunk {i+1}/{total_chunks} processed successfully")
                 
@@ -455,27 +614,8 @@ def process_uploaded_file_chain(self, task_id: str, file_id: str, file_name: str
         fragment_counter = 1
         
         for chunk_info in processed_chunks:
-            chunk_processor = chunk_info['processor']
-            processed_path = chunk_info['processed_path']
-            
-            # Create fragments from this chunk
-            chunk_title = settings_dict.get('title', '')
-            add_part_numbers = settings_dict.get("add_part_numbers", False)
-            
-            # Only add part number if explicitly enabled and multiple chunks exist
-            if len(processed_chunks) > 1 and chunk_title and add_part_numbers:
-                fragment_title = f"{chunk_title} - Часть {chunk_info['chunk_number']}"
-            else:
-                fragment_title = chunk_title
-            
-            chunk_fragments = chunk_processor.create_fragments(
-                video_path=processed_path,
-                fragment_duration=settings_dict.get("fragment_duration", 30),
-                title=fragment_title
-            )
-            
             # Renumber fragments globally and update paths
-            for fragment_data in chunk_fragments:
+            for fragment_data in chunk_info['fragments']:
                 fragment_data['fragment_number'] = fragment_counter
                 fragment_data['chunk_number'] = chunk_info['chunk_number']
                 all_fragments.append(fragment_data)
@@ -483,63 +623,39 @@ def process_uploaded_file_chain(self, task_id: str, file_id: str, file_name: str
         
         fragments = all_fragments
         
-        # Step 5: Save fragments to database
-        for fragment_data in fragments:
-            with get_sync_db_session() as session:
-                fragment_model = VideoFragment(
-                    id=str(uuid.uuid4()),
-                    task_id=task_id,
-                    fragment_number=fragment_data['fragment_number'],
-                    filename=fragment_data['filename'],
-                    local_path=fragment_data['local_path'],
-                    duration=fragment_data['duration'],
-                    start_time=fragment_data['start_time'],
-                    end_time=fragment_data.get('start_time', 0) + fragment_data['duration'],
-                    size_bytes=fragment_data['size_bytes'],
-                    has_subtitles=settings_dict.get('enable_subtitles', True)
-                )
-                session.add(fragment_model)
-                session.commit()
-                fragment_data['id'] = fragment_model.id
-
-        # Step 6: Upload to Google Drive
+        # Step 5-6: Upload to Google Drive while the fragments are saved to the database
         logger.info(f"Step 6/7: Uploading to Google Drive for task {task_id}")
-        with get_sync_db_session() as session:
-            task = session.get(VideoTaskModel, task_id)
-            if task:
-                task.status = VideoStatus.UPLOADING
-                task.progress = 70
-                session.commit()
+        task_user_id = _set_task_state(task_id, status=VideoStatus.UPLOADING, progress=70)
         
-        from app.services.google_drive import GoogleDriveService
         drive_service = GoogleDriveService()
-        upload_results = drive_service.upload_multiple_files(
-            file_paths=[f["local_path"] for f in fragments],
-            task_id=task_id
-        )
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            upload_future = executor.submit(
+                drive_service.upload_multiple_files,
+                file_paths=[f["local_path"] for f in fragments],
+                task_id=task_id,
+                on_uploaded=_upload_progress_callback(task_id, len(fragments))
+            )
+            save_fragments(task_id, fragments, settings_dict)
+            upload_results = upload_future.result()
         successful_uploads = [r for r in upload_results if r.get("success")]
         logger.info(f"Successfully uploaded {len(successful_uploads)}/{len(fragments)} files to Google Drive.")
 
-        # Update fragments with Google Drive URLs
-        for i, upload_result in enumerate(upload_results):
-            if upload_result.get("success") and i < len(fragments):
-                fragment_data = fragments[i]
-                
-                drive_url = upload_result.get("direct_url", "")
-                
-                with get_sync_db_session() as session:
-                    fragment_model = session.get(VideoFragment, fragment_data['id'])
-                    if fragment_model:
-                        fragment_model.drive_url = drive_url
-                        fragment_model.drive_file_id = upload_result.get("file_id", "")
-                        session.commit()
+        # Update fragments with Google Drive URLs: one batched UPDATE and one commit
+        drive_url_updates = [
+            {"id": fragments[i]['id'], "drive_url": upload_result.get("direct_url", "")}
+            for i, upload_result in enumerate(upload_results)
+            if upload_result.get("success") and i < len(fragments)
+        ]
+        if drive_url_updates:
+            with get_sync_db_session() as session:
+                session.bulk_update_mappings(VideoFragment, drive_url_updates)
+                session.commit()
 
         # Step 7: Log to Google Sheets
         logger.info(f"Step 7/7: Logging to Google Sheets for task {task_id}")
         
-        with get_sync_db_session() as session:
-            task = session.get(VideoTaskModel, task_id)
-            user_id = task.user_id if task else 0
+        # User ID was returned by the UPLOADING update
+        user_id = task_user_id or 0
         
         sheet_result = log_to_sheets(
             task_id=task_id,
@@ -551,28 +667,22 @@ def process_uploaded_file_chain(self, task_id: str, file_id: str, file_name: str
         )
 
         # Step 8: Mark task as completed
-        with get_sync_db_session() as session:
-            task = session.get(VideoTaskModel, task_id)
-            if task:
-                task.status = VideoStatus.COMPLETED
-                task.progress = 100
-                # Update video_metadata (not metadata)
-                if task.video_metadata is None:
-                    task.video_metadata = {}
-                task.video_metadata.update({
-                    'fragments_count': len(fragments),
-                    'successful_uploads': len(successful_uploads),
-                    'sheet_url': sheet_result.get('sheet_url', ''),
-                    'drive_folder_url': upload_results[0].get('folder_url', '') if upload_results else ''
-                })
-                session.commit()
+        _set_task_state(task_id, status=VideoStatus.COMPLETED, progress=100, metadata={
+            'fragments_count': len(fragments),
+            'successful_uploads': len(successful_uploads),
+            'sheet_url': sheet_result.get('sheet_url', ''),
+            'drive_folder_url': upload_results[0].get('folder_url', '') if upload_results else ''
+        })
 
         # Step 9: Clean up temporary files
         logger.info(f"Step 9/9: Cleaning up temporary files for task {task_id}")
-        cleanup_temp_files([download_result["local_path"]] + [chunk for chunk in video_chunks])
+        # Каталог загрузки удаляется целиком (rmtree удаляет относительно fd каталога),
+        # фрагменты остаются до отправки уведомления
+        shutil.rmtree(os.path.join(settings.video_temp_dir, task_id), ignore_errors=True)
+        cleanup_temp_files([chunk for chunk in video_chunks if chunk != download_result["local_path"]])
         
-        # Step 10: Send completion notification
-        send_completion_notification(user_id, task_id, len(fragments))
+        # Step 10: Send completion notification (отдельной задачей, слот обработки не ждёт Telegram)
+        send_completion_notification.apply_async(args=[user_id, task_id, len(fragments)])
 
         logger.info(f"Uploaded file processing completed successfully for task {task_id}")
         return {
@@ -586,12 +696,7 @@ def process_uploaded_file_chain(self, task_id: str, file_id: str, file_name: str
         logger.error(f"Uploaded file processing failed for task {task_id}: {exc}")
         
         # Update task status to failed
-        with get_sync_db_session() as session:
-            task = session.get(VideoTaskModel, task_id)
-            if task:
-                task.status = VideoStatus.FAILED
-                task.error_message = str(exc)[:500]
-                session.commit()
+        _set_task_state(task_id, status=VideoStatus.FAILED, error_message=str(exc)[:500])
         
         # Retry with exponential backoff
         max_retries = 2
@@ -606,40 +711,26 @@ def download_telegram_file_sync(task_id: str, file_id: str, file_name: str, file
     Synchronous wrapper for downloading Telegram files.
     This is needed because Celery tasks can't easily handle async operations.
     """
-    import asyncio
-    from aiogram import Bot
-    from app.config.settings import settings
-    
     if settings_dict is None:
         settings_dict = {}
     
     async def _download():
-        bot = Bot(token=settings.telegram_bot_token.get_secret_value())
-        try:
-            # Create download directory
-            download_dir = f"/tmp/videos/{task_id}"
-            os.makedirs(download_dir, exist_ok=True)
-            
-            # Initialize downloader (no cookies needed for Telegram files)
-            from app.video_processing.downloader import VideoDownloader
-            downloader = VideoDownloader(download_dir, None, "")
-            
-            # Download file
-            result = await downloader.download_telegram_file(bot, file_id, file_name, file_size)
-            return result
-        finally:
-            await bot.session.close()
+        # Create download directory
+        download_dir = os.path.join(settings.video_temp_dir, task_id)
+        _make_task_dir(download_dir)
+        
+        # Initialize downloader (no cookies needed for Telegram files)
+        downloader = VideoDownloader(download_dir, None, "")
+        
+        # Download file
+        result = await downloader.download_telegram_file(_get_worker_bot(), file_id, file_name, file_size)
+        return result
     
-    # Run the async function in a new event loop
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        return loop.run_until_complete(_download())
-    finally:
-        loop.close()
+    # Run on the worker's long-lived loop so the bot session stays open
+    return _get_worker_loop().run_until_complete(_download())
 
 
-@shared_task(base=VideoTask, bind=True)
+@shared_task(base=VideoTask, bind=True, acks_late=True, reject_on_worker_lost=True)
 def process_video_chain_optimized(self, task_id: str, url: str, settings_dict: Dict[str, Any]) -> Dict[str, Any]:
     """
     Optimized video processing chain: download -> full processing with FFmpeg -> fragment -> upload.
@@ -647,58 +738,57 @@ def process_video_chain_optimized(self, task_id: str, url: str, settings_dict: D
     """
     logger.info(f"Starting FFmpeg-optimized video processing chain for task {task_id}")
     
-    # Check for duplicate tasks - prevent multiple executions of the same task
-    with get_sync_db_session() as session:
-        task = session.get(VideoTaskModel, task_id)
-        if not task:
-            logger.error(f"Task {task_id} not found in database")
-            return {"error": "Task not found"}
-        
-        # If task is already completed or failed, don't process again
-        if task.status in [VideoStatus.COMPLETED, VideoStatus.FAILED]:
-            logger.info(f"Task {task_id} already {task.status.value}, skipping duplicate execution")
-            return {"error": f"Task already {task.status.value}"}
-        
-        # Check if task is already being processed by another worker
-        if task.status in [VideoStatus.PROCESSING, VideoStatus.UPLOADING] and self.request.retries == 0:
-            logger.warning(f"Task {task_id} is already being processed by another worker")
-            return {"error": "Task already being processed"}
+    # Check for duplicate tasks - prevent multiple executions of the same task.
+    # The same UPDATE moves the task to Step 1
+    refusal = _claim_task(task_id, is_retry=self.request.retries > 0)
+    if refusal:
+        return refusal
+    
+    # Step 1: Download video
+    logger.info(f"Step 1/7: Downloading video for task {task_id}")
     
+    # Скачивание идёт отдельной задачей в очереди video_download (со своими ретраями),
+    # слот обработки не простаивает, пока видео качается
+    quality = settings_dict.get("quality", "1080p")
+    raise self.replace(chain(
+        download_video.si(task_id, url, quality, settings_dict),
+        process_downloaded_video_optimized.s(task_id, settings_dict)
+    ))
+
+
+@shared_task(base=VideoTask, bind=True, acks_late=True, reject_on_worker_lost=True)
+def process_downloaded_video_optimized(self, download_result: Dict[str, Any], task_id: str, settings_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Second stage of the optimized chain: split the video and fan the chunks out.
+    
+    The task replaces itself with a chord of process_single_chunk tasks
+    whose callback, finalize_chunks, saves and uploads the fragments.
+    
+    Args:
+        download_result: Result of download_video
+        task_id: Video task ID
+        settings_dict: Processing settings
+    """
     try:
-        # Step 1: Download video
-        logger.info(f"Step 1/7: Downloading video for task {task_id}")
-        with get_sync_db_session() as session:
-            task = session.get(VideoTaskModel, task_id)
-            if task:
-                task.status = VideoStatus.DOWNLOADING
-                task.progress = 10
-                session.commit()
-        
-        quality = settings_dict.get("quality", "1080p")
-        download_result = download_video(task_id, url, quality, settings_dict)
-        
         # Step 2: Split video into chunks if it's long (to avoid timeouts)
         logger.info(f"Step 2/7: Checking if video needs to be split for task {task_id}")
         
         # Initialize the processor
-        output_dir = f"/tmp/processed/{task_id}"
-        os.makedirs(output_dir, exist_ok=True)
+        output_dir = os.path.join(settings.video_processed_dir, task_id)
         processor = VideoProcessor(output_dir)
         
         # Split video into chunks if longer than 5 minutes (300 seconds)
         chunk_duration = 300  # 5 minutes per chunk (было 600, но это слишком долго для faster-whisper)
         video_chunks = processor.split_video(download_result["local_path"], chunk_duration)
+        if download_result["local_path"] not in video_chunks:
+            # Исходник больше не читается до удаления, освобождаем его страницы в кэше
+            _drop_page_cache(download_result["local_path"])
         
         logger.info(f"Video split into {len(video_chunks)} chunks for processing")
         
         # Step 3: Process each chunk separately
         logger.info(f"Step 3/7: Processing video chunks for task {task_id}")
-        with get_sync_db_session() as session:
-            task = session.get(VideoTaskModel, task_id)
-            if task:
-                task.status = VideoStatus.PROCESSING
-                task.progress = 30
-                session.commit()
+        _set_task_state(task_id, status=VideoStatus.PROCESSING, progress=30)
 
         # Get user style settings to pass to the processor
         user_settings = get_user_settings(task_id)
@@ -707,59 +797,138 @@ def process_video_chain_optimized(self, task_id: str, url: str, settings_dict: D
         processing_settings = settings_dict.copy()
         processing_settings.update(user_settings)
 
-        # Process each chunk using the new FFmpeg-native method
-        processed_chunks = []
-        total_chunks = len(video_chunks)
-        failed_chunks = []
+    except Exception as exc:
+        task_logger = get_task_logger(__name__)
+        task_logger.error(f"Optimized video processing chain failed for task {task_id}: {exc}", exc_info=True)
         
-        for i, chunk_path in enumerate(video_chunks):
-            try:
-                logger.info(f"Processing chunk {i+1}/{total_chunks}: {os.path.basename(chunk_path)}")
-                
-                # Create chunk-specific output directory
-                chunk_output_dir = os.path.join(output_dir, f"chunk_{i+1}")
-                os.makedirs(chunk_output_dir, exist_ok=True)
-                chunk_processor = VideoProcessor(chunk_output_dir)
-                
-                # Process chunk with title including part number only if enabled and multiple chunks
-                chunk_title = settings_dict.get("title", "")
-                add_part_numbers = settings_dict.get("add_part_numbers", False)  # Default: disabled
-                if len(video_chunks) > 1 and chunk_title and add_part_numbers:
-                    chunk_title = f"{chunk_title} - Часть {i+1}"
-                
-                chunk_settings = processing_settings.copy()
-                chunk_settings['title'] = chunk_title
-                
-                # Use shorter timeout for chunks (увеличено для больших видео)
-                chunk_settings['ffmpeg_timeout'] = min(processing_settings.get('ffmpeg_timeout', 3600), 3600)
-                
-                chunk_result = chunk_processor.process_video_ffmpeg(
-                    video_path=chunk_path,
-                    settings=chunk_settings
-                )
-                
-                processed_chunks.append({
-                    'chunk_number': i + 1,
-                    'chunk_path': chunk_path,
-                    'processed_path': chunk_result['processed_video_path'],
-                    'processor': chunk_processor
-                })
-                
-                # Update progress
-                chunk_progress = 30 + int((i + 1) / total_chunks * 30)  # 30-60%
-                with get_sync_db_session() as session:
-                    task = session.get(VideoTaskModel, task_id)
-                    if task:
-                        task.progress = chunk_progress
-                        session.commit()
-                        
-                logger.info(f"Chunk {i+1}/{total_chunks} processed successfully")
-                
-            except Exception as e:
-                logger.error(f"Failed to process chunk {i+1}: {e}")
-                failed_chunks.append(i + 1)
-                # Continue with other chunks instead of failing the entire task
-                continue
+        # Update task status to failed
+        _set_task_state(task_id, status=VideoStatus.FAILED, error_message=str(exc))
+        
+        # More conservative retry logic - only retry on certain types of errors
+        # and with fewer retries
+        if self.request.retries < 2:  # Reduced from 5 to 2
+            # Only retry on temporary errors
+            if any(keyword in str(exc).lower() for keyword in ['timeout', 'connection', 'network', 'temporary']):
+                countdown = 120 * (self.request.retries + 1)  # Linear backoff instead of exponential
+                logger.info(f"Retrying task {task_id} (attempt {self.request.retries + 1}/2) in {countdown} seconds")
+                raise self.retry(exc=exc, countdown=countdown, max_retries=2)
+            else:
+                logger.error(f"Permanent error for task {task_id}, not retrying: {exc}")
+                raise exc
+        else:
+            logger.error(f"Max retries reached for task {task_id}")
+            raise exc
+    
+    # Чанки расходятся по воркерам очереди video_processing, финализация
+    # (фрагменты, загрузка, Sheets) запускается, когда готовы все чанки.
+    # Счётчик готовых чанков от прошлой попытки обнулить, иначе прогресс убежит вперёд
+    clear_task_progress(task_id)
+    total_chunks = len(video_chunks)
+    raise self.replace(chord(
+        group(
+            process_single_chunk.s(task_id, chunk_path, i, total_chunks, processing_settings)
+            for i, chunk_path in enumerate(video_chunks)
+        ),
+        finalize_chunks.s(task_id, download_result, settings_dict)
+    ))
+
+
+@shared_task(base=VideoTask, bind=True, acks_late=True, reject_on_worker_lost=True)
+def process_single_chunk(self, task_id: str, chunk_path: str, chunk_index: int, total_chunks: int, processing_settings: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Process one chunk of a split video (header task of the chunk chord).
+    
+    Errors are returned instead of raised, so one failed chunk doesn't
+    fail the whole chord and the other chunks are still used. A chunk that
+    comes back after its worker died is reported as failed instead of being
+    encoded again, so a chunk that crashes the worker can't loop forever.
+    
+    Args:
+        task_id: Video task ID
+        chunk_path: Path to the chunk file
+        chunk_index: Zero-based chunk index
+        total_chunks: Number of chunks of the video
+        processing_settings: Task settings combined with user style settings
+        
+    Returns:
+        Dict with chunk number and its fragments, or the error
+    """
+    chunk_number = chunk_index + 1
+    # Повторная доставка после гибели воркера (OOM, падение libass/NVENC): второй раз не кодируем
+    if (self.request.delivery_info or {}).get('redelivered'):
+        logger.error(f"Chunk {chunk_number}/{total_chunks} was redelivered after its worker died, skipping it")
+        return {
+            'chunk_number': chunk_number,
+            'chunk_path': chunk_path,
+            'error': 'chunk was redelivered after its worker died, not re-encoding'
+        }
+    
+    try:
+        logger.info(f"Processing chunk {chunk_number}/{total_chunks}: {os.path.basename(chunk_path)}")
+        
+        # Create chunk-specific output directory
+        output_dir = os.path.join(settings.video_processed_dir, task_id)
+        chunk_output_dir = os.path.join(output_dir, f"chunk_{chunk_number}")
+        chunk_processor = VideoProcessor(chunk_output_dir)
+        
+        # Process chunk with title including part number only if enabled and multiple chunks
+        chunk_title = processing_settings.get("title", "")
+        add_part_numbers = processing_settings.get("add_part_numbers", False)  # Default: disabled
+        if total_chunks > 1 and chunk_title and add_part_numbers:
+            chunk_title = f"{chunk_title} - Часть {chunk_number}"
+        
+        chunk_settings = processing_settings.copy()
+        chunk_settings['title'] = chunk_title
+        
+        # Use shorter timeout for chunks (увеличено для больших видео)
+        chunk_settings['ffmpeg_timeout'] = min(processing_settings.get('ffmpeg_timeout', 3600), 3600)
+        # Fragments are written by the same encode, no separate cutting pass
+        chunk_settings['segment_duration'] = processing_settings.get("duration", 30)
+        
+        chunk_result = chunk_processor.process_video_ffmpeg(
+            video_path=chunk_path,
+            settings=chunk_settings
+        )
+        # Фрагменты чанка готовы, сам чанк больше не нужен: на диске не копятся все чанки сразу
+        cleanup_temp_files([chunk_path])
+        
+        # Чанки заканчиваются в любом порядке, прогресс считается по числу готовых
+        finished = count_finished_chunk(task_id)
+        chunk_progress = 30 + int(min(finished or chunk_number, total_chunks) / total_chunks * 30)  # 30-60%
+        if finished is None or not set_task_progress(task_id, chunk_progress):
+            _set_task_state(task_id, durable=False, progress=chunk_progress)
+        
+        logger.info(f"Chunk {chunk_number}/{total_chunks} processed successfully")
+        return {
+            'chunk_number': chunk_number,
+            'chunk_path': chunk_path,
+            'fragments': chunk_result['fragments']
+        }
+        
+    except Exception as e:
+        logger.error(f"Failed to process chunk {chunk_number}: {e}")
+        return {'chunk_number': chunk_number, 'chunk_path': chunk_path, 'error': str(e)}
+
+
+# Финализация не повторяется: загруженные фрагменты удаляются по ходу загрузки
+@shared_task(base=VideoTask, bind=True, autoretry_for=(), max_retries=0)
+def finalize_chunks(self, chunk_results: List[Dict[str, Any]], task_id: str, download_result: Dict[str, Any], settings_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Chord callback of the optimized chain: fragments -> database -> upload -> Sheets.
+    
+    Args:
+        chunk_results: Results of process_single_chunk, in chunk order
+        task_id: Video task ID
+        download_result: Result of download_video
+        settings_dict: Processing settings
+        
+    Returns:
+        Dict with processing results
+    """
+    try:
+        total_chunks = len(chunk_results)
+        processed_chunks = [r for r in chunk_results if 'error' not in r]
+        failed_chunks = [r['chunk_number'] for r in chunk_results if 'error' in r]
         
         # Check if we have enough successful chunks to continue
         if len(processed_chunks) == 0:
@@ -776,27 +945,8 @@ def process_video_chain_optimized(self, task_id: str, url: str, settings_dict: D
         fragment_counter = 1
         
         for chunk_info in processed_chunks:
-            chunk_processor = chunk_info['processor']
-            processed_path = chunk_info['processed_path']
-            
-            # Create fragments from this chunk
-            chunk_title = settings_dict.get('title', '')
-            add_part_numbers = settings_dict.get("add_part_numbers", False)
-            
-            # Only add part number if explicitly enabled and multiple chunks exist
-            if len(processed_chunks) > 1 and chunk_title and add_part_numbers:
-                fragment_title = f"{chunk_title} - Часть {chunk_info['chunk_number']}"
-            else:
-                fragment_title = chunk_title
-            
-            chunk_fragments = chunk_processor.create_fragments(
-                video_path=processed_path,
-                fragment_duration=settings_dict.get("duration", 30),
-                title=fragment_title
-            )
-            
             # Renumber fragments globally and update paths
-            for fragment_data in chunk_fragments:
+            for fragment_data in chunk_info['fragments']:
                 fragment_data['fragment_number'] = fragment_counter
                 fragment_data['chunk_number'] = chunk_info['chunk_number']
                 all_fragments.append(fragment_data)
@@ -804,96 +954,57 @@ def process_video_chain_optimized(self, task_id: str, url: str, settings_dict: D
         
         fragments = all_fragments
         
-        # Step 5: Save fragments to database
-        for fragment_data in fragments:
-            with get_sync_db_session() as session:
-                fragment_model = VideoFragment(
-                    id=str(uuid.uuid4()),
-                    task_id=task_id,
-                    fragment_number=fragment_data['fragment_number'],
-                    filename=fragment_data['filename'],
-                    local_path=fragment_data['local_path'],
-                    duration=fragment_data['duration'],
-                    start_time=fragment_data['start_time'],
-                    end_time=fragment_data.get('start_time', 0) + fragment_data['duration'],
-                    size_bytes=fragment_data['size_bytes'],
-                    has_subtitles=settings_dict.get('enable_subtitles', True)
-                )
-                session.add(fragment_model)
-                session.commit()
-                fragment_data['id'] = fragment_model.id
-
-        # Step 6: Upload to Google Drive
+        # Step 5-6: Upload to Google Drive while the fragments are saved to the database
         logger.info(f"Step 6/7: Uploading to Google Drive for task {task_id}")
-        with get_sync_db_session() as session:
-            task = session.get(VideoTaskModel, task_id)
-            if task:
-                task.status = VideoStatus.UPLOADING
-                task.progress = 70
-                session.commit()
+        task_user_id = _set_task_state(task_id, status=VideoStatus.UPLOADING, progress=70)
         
-        from app.services.google_drive import GoogleDriveService
         drive_service = GoogleDriveService()
-        upload_results = drive_service.upload_multiple_files(
-            file_paths=[f["local_path"] for f in fragments],
-            task_id=task_id
-        )
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            upload_future = executor.submit(
+                drive_service.upload_multiple_files,
+                file_paths=[f["local_path"] for f in fragments],
+                task_id=task_id,
+                # Фрагмент больше не нужен локально, как только он в Drive
+                on_uploaded=_upload_progress_callback(task_id, len(fragments), delete_uploaded=True)
+            )
+            save_fragments(task_id, fragments, settings_dict)
+            upload_results = upload_future.result()
         successful_uploads = [r for r in upload_results if r.get("success")]
         logger.info(f"Successfully uploaded {len(successful_uploads)}/{len(fragments)} files to Google Drive.")
 
-        # Update fragments with Google Drive URLs
+        # Update fragments with Google Drive URLs: one batched UPDATE and one commit
+        drive_url_updates = []
         for i, upload_result in enumerate(upload_results):
             if upload_result.get("success") and i < len(fragments):
                 fragment_data = fragments[i]
                 
                 # Используем прямую ссылку для скачивания вместо view ссылки
-                drive_url = upload_result.get("direct_url", "")  # Изменено с file_url на direct_url
+                drive_url = upload_result.get("direct_url", "")
                 view_url = upload_result.get("file_url", "")     # Ссылка для просмотра
+                if not drive_url:
+                    logger.warning(f"No direct URL available for fragment {fragment_data.get('fragment_number', i+1)}")
+                    # Используем view URL как fallback если нет прямой ссылки
+                    drive_url = view_url
+                    if drive_url:
+                        logger.warning(f"Using view URL as fallback for fragment {fragment_data.get('fragment_number', i+1)}: {drive_url}")
                 
-                # Update fragment in database with drive URL
-                with get_sync_db_session() as session:
-                    fragment = session.get(VideoFragment, fragment_data['id'])
-                    if fragment and drive_url:
-                        # КРИТИЧЕСКИ ВАЖНО: Сохраняем URL в поле drive_url!
-                        fragment.drive_url = drive_url
-                        
-                        # Correctly handle JSON metadata field
-                        current_metadata = fragment.metadata
-                        if isinstance(current_metadata, dict):
-                            updated_metadata = current_metadata.copy()
-                        else:
-                            # If metadata is corrupted or not a dict, reset it.
-                            logger.warning(f"Fragment {fragment.id} metadata was corrupted. Type: {type(current_metadata)}. Resetting.")
-                            updated_metadata = {}
-                        
-                        updated_metadata['view_url'] = view_url
-                        updated_metadata['public'] = upload_result.get('public', False)
-                        
-                        # Assign the updated dictionary back
-                        fragment.metadata = updated_metadata
-                        
-                        session.commit()
-                        fragment_data['drive_url'] = drive_url
-                        fragment_data['view_url'] = view_url
-                        fragment_data['public'] = upload_result.get('public', False)
-                        logger.info(f"Updated fragment {fragment.fragment_number} with direct download URL: {drive_url}")
-                    elif not drive_url:
-                        logger.warning(f"No direct URL available for fragment {fragment_data.get('fragment_number', i+1)}")
-                        # Используем view URL как fallback если нет прямой ссылки
-                        fallback_url = view_url
-                        if fallback_url:
-                            fragment.drive_url = fallback_url
-                            session.commit()
-                            fragment_data['drive_url'] = fallback_url
-                            logger.warning(f"Using view URL as fallback for fragment {fragment.fragment_number}: {fallback_url}")
+                if drive_url:
+                    drive_url_updates.append({"id": fragment_data['id'], "drive_url": drive_url})
+                    fragment_data['drive_url'] = drive_url
+                fragment_data['view_url'] = view_url
+                fragment_data['public'] = upload_result.get('public', False)
+        
+        if drive_url_updates:
+            with get_sync_db_session() as session:
+                session.bulk_update_mappings(VideoFragment, drive_url_updates)
+                session.commit()
+            logger.info(f"Saved Drive URLs of {len(drive_url_updates)} fragments")
 
         # Step 7: Log to Google Sheets
         logger.info(f"Step 7/7: Logging results to Google Sheets for task {task_id}")
         
-        # Get user ID from task
-        with get_sync_db_session() as session:
-            task = session.get(VideoTaskModel, task_id)
-            user_id_for_sheets = task.user_id if task else 0
+        # User ID was returned by the UPLOADING update
+        user_id_for_sheets = task_user_id or 0
         
         log_to_sheets(
             task_id=task_id,
@@ -906,28 +1017,13 @@ def process_video_chain_optimized(self, task_id: str, url: str, settings_dict: D
         
         # Step 8: Finalize and Cleanup
         logger.info(f"Finalizing and cleaning up task {task_id}")
-        with get_sync_db_session() as session:
-            task = session.get(VideoTaskModel, task_id)
-            if task:
-                task.status = VideoStatus.COMPLETED
-                task.progress = 100
-                session.commit()
-                
-                # Send completion notification
-                send_completion_notification.apply_async(args=[task.user_id, task_id, len(fragments)])
-        
-        # Collect all paths for cleanup
-        cleanup_paths = [download_result["local_path"]]
-        
-        # Add chunk paths
-        for chunk_info in processed_chunks:
-            cleanup_paths.append(chunk_info['chunk_path'])
-            cleanup_paths.append(chunk_info['processed_path'])
-        
-        # Add fragment paths
-        cleanup_paths.extend([f["local_path"] for f in fragments])
+        task_user_id = _set_task_state(task_id, status=VideoStatus.COMPLETED, progress=100)
+        if task_user_id is not None:
+            # Send completion notification
+            send_completion_notification.apply_async(args=[task_user_id, task_id, len(fragments)])
         
-        cleanup_temp_files(cleanup_paths)
+        # Remove the whole task working dirs (download, chunks, fragments and intermediates)
+        cleanup_task_dirs(task_id)
         
         result = {
             "task_id": task_id,
@@ -947,76 +1043,102 @@ def process_video_chain_optimized(self, task_id: str, url: str, settings_dict: D
         task_logger = get_task_logger(__name__)
         task_logger.error(f"Optimized video processing chain failed for task {task_id}: {exc}", exc_info=True)
         
-        # Update task status to failed
-        with get_sync_db_session() as session:
-            task = session.get(VideoTaskModel, task_id)
-            if task:
-                task.status = VideoStatus.FAILED
-                task.error_message = str(exc)
-                session.commit()
+        # Update task status to failed. No retry: uploaded fragments are already
+        # deleted and a re-run would insert a second set of fragment rows
+        _set_task_state(task_id, status=VideoStatus.FAILED, error_message=str(exc))
+        raise
+
+
+# Стили пользователя кэшируются на короткое время: задачи одного пользователя
+# идут подряд, а изменения настроек подхватываются не позже чем через TTL
+USER_STYLE_CACHE_TTL = 60  # seconds
+USER_STYLE_CACHE_MAX_SIZE = 1024
+_user_style_cache: Dict[int, Tuple[float, Dict[str, Any]]] = {}
+
+
+FONTS_DIR = "/app/fonts"
+DEFAULT_TITLE_FONT_PATH = "/app/fonts/Obelix Pro.ttf"
+
+
+def _scan_title_fonts(fonts_dir: str) -> Dict[str, str]:
+    """
+    Map font names to their *-Regular.ttf files under the fonts directory.
+    
+    Args:
+        fonts_dir: Directory with the bundled fonts
         
-        # More conservative retry logic - only retry on certain types of errors
-        # and with fewer retries
-        if self.request.retries < 2:  # Reduced from 5 to 2
-            # Only retry on temporary errors
-            if any(keyword in str(exc).lower() for keyword in ['timeout', 'connection', 'network', 'temporary']):
-                countdown = 120 * (self.request.retries + 1)  # Linear backoff instead of exponential
-                logger.info(f"Retrying task {task_id} (attempt {self.request.retries + 1}/2) in {countdown} seconds")
-                raise self.retry(exc=exc, countdown=countdown, max_retries=2)
-            else:
-                logger.error(f"Permanent error for task {task_id}, not retrying: {exc}")
-                raise exc
-        else:
-            logger.error(f"Max retries reached for task {task_id}")
-            raise exc
+    Returns:
+        Dict of font name -> font file path
+    """
+    font_paths = {}
+    for root, _, files in os.walk(fonts_dir):
+        for file_name in files:
+            if file_name.endswith('-Regular.ttf'):
+                font_paths[file_name[:-len('-Regular.ttf')]] = os.path.join(root, file_name)
+    return font_paths
+
+
+# Шрифты сканируются один раз при импорте, а не stat на каждую задачу
+_TITLE_FONT_PATHS = _scan_title_fonts(FONTS_DIR)
 
 
 def get_user_settings(task_id: str) -> Dict[str, Any]:
     """
     Retrieves user-specific settings and style preferences from the database.
+    
+    Results are cached per user for USER_STYLE_CACHE_TTL seconds.
     """
     with get_sync_db_session() as session:
-        task = session.get(VideoTaskModel, task_id)
-        if not task or not task.user_id:
+        user_id = session.execute(
+            select(VideoTaskModel.user_id).where(VideoTaskModel.id == task_id)
+        ).scalar_one_or_none()
+        if not user_id:
             logger.info("No user found for task, using default styles.")
             return {
                 "title_style": DEFAULT_TEXT_STYLES['title'],
                 "subtitle_font_path": get_subtitle_font_path()
             }
         
-        user = session.get(User, task.user_id)
-        if not user or not user.settings:
-            logger.info(f"No custom settings for user {task.user_id}, using defaults.")
-            return {
+        cached = _user_style_cache.get(user_id)
+        if cached and time.monotonic() - cached[0] < USER_STYLE_CACHE_TTL:
+            return copy.deepcopy(cached[1])
+        
+        user_settings = session.execute(
+            select(User.settings).where(User.id == user_id)
+        ).scalar_one_or_none()
+        if not user_settings:
+            logger.info(f"No custom settings for user {user_id}, using defaults.")
+            result = {
                 "title_style": DEFAULT_TEXT_STYLES['title'],
                 "subtitle_font_path": get_subtitle_font_path()
             }
-
-        settings = user.settings
-        title_style = settings.get('title_style', DEFAULT_TEXT_STYLES['title'])
-        
-        # Get font path from settings if available
-        font_name = title_style.get('font', 'Obelix Pro')
-        font_path = f"/app/fonts/{font_name.replace(' ', '/')}/static/{font_name}-Regular.ttf"
-        if not os.path.exists(font_path):
-             font_path = f"/app/fonts/Obelix Pro.ttf" # Default fallback
-        
-        logger.info(f"Loaded settings for user {task.user_id}: {title_style}")
-        return {
-            "title_style": title_style,
-            "font_path": font_path,
-            "subtitle_font_path": get_subtitle_font_path()
-        }
+        else:
+            settings = user_settings
+            title_style = settings.get('title_style', DEFAULT_TEXT_STYLES['title'])
+            
+            # Get font path from settings if available
+            font_name = title_style.get('font', 'Obelix Pro')
+            
+            logger.info(f"Loaded settings for user {user_id}: {title_style}")
+            result = {
+                "title_style": title_style,
+                "font_path": _TITLE_FONT_PATHS.get(font_name, DEFAULT_TITLE_FONT_PATH),
+                "subtitle_font_path": get_subtitle_font_path()
+            }
+    
+    if len(_user_style_cache) >= USER_STYLE_CACHE_MAX_SIZE:
+        _user_style_cache.clear()
+    _user_style_cache[user_id] = (time.monotonic(), result)
+    return copy.deepcopy(result)
 
 
 def cut_into_fragments(task_id: str, processed_video_path: str, settings_dict: Dict[str, Any]) -> List[Dict[str, Any]]:
     """
     Cut processed video into fragments. This now correctly uses the FFmpeg processor.
     """
-    output_dir = f"/tmp/processed/{task_id}/fragments"
-    os.makedirs(output_dir, exist_ok=True)
+    output_dir = os.path.join(settings.video_processed_dir, task_id, "fragments")
     
-    # Initialize processor
+    # Initialize processor (it creates its output directory)
     processor = VideoProcessor(output_dir)
     
     fragments = processor.create_fragments(
@@ -1038,7 +1160,6 @@ def upload_to_drive(task_id: str, fragments: List[Dict[str, Any]]) -> List[Dict[
     Returns:
         List of upload results
     """
-    from app.services.google_drive import GoogleDriveService
     
     drive_service = GoogleDriveService()
     
@@ -1072,7 +1193,6 @@ def log_to_sheets(
     Returns:
         Logging result
     """
-    from app.services.google_sheets import GoogleSheetsService
     
     sheets_service = GoogleSheetsService()
     
@@ -1095,6 +1215,66 @@ def log_to_sheets(
     return result
 
 
+def _upload_progress_callback(task_id: str, total: int, delete_uploaded: bool = False):
+    """
+    Build an on_uploaded callback that reports upload progress (70-95%).
+    
+    Args:
+        task_id: Video task ID
+        total: Number of files being uploaded
+        delete_uploaded: Delete each local file once it is in Drive
+        
+    Returns:
+        Callback for GoogleDriveService.upload_multiple_files
+    """
+    lock = threading.Lock()
+    uploaded = 0
+    
+    def on_uploaded(result: Dict[str, Any]) -> None:
+        nonlocal uploaded
+        with lock:  # Записи прогресса идут по порядку, значение только растёт
+            uploaded += 1
+            progress = 70 + int(uploaded / total * 25)
+            if not set_task_progress(task_id, progress):
+                _set_task_state(task_id, durable=False, progress=progress)
+        if delete_uploaded and result.get("success"):
+            try:
+                os.unlink(result["file_path"])
+            except OSError as e:
+                logger.warning(f"Failed to delete uploaded fragment {result['file_path']}: {e}")
+    
+    return on_uploaded
+
+
+def save_fragments(task_id: str, fragments: List[Dict[str, Any]], settings_dict: Dict[str, Any]) -> None:
+    """
+    Save fragments to the database with one INSERT batch and one commit.
+    
+    Args:
+        task_id: Video task ID
+        fragments: Fragment dicts, each gets its new 'id'
+        settings_dict: Processing settings
+    """
+    fragment_rows = []
+    for fragment_data in fragments:
+        fragment_data['id'] = str(uuid.uuid4())
+        fragment_rows.append(dict(
+            id=fragment_data['id'],
+            task_id=task_id,
+            fragment_number=fragment_data['fragment_number'],
+            filename=fragment_data['filename'],
+            local_path=fragment_data['local_path'],
+            duration=fragment_data['duration'],
+            start_time=fragment_data['start_time'],
+            end_time=fragment_data.get('start_time', 0) + fragment_data['duration'],
+            size_bytes=fragment_data['size_bytes'],
+            has_subtitles=settings_dict.get('enable_subtitles', True)
+        ))
+    with get_sync_db_session() as session:
+        session.bulk_insert_mappings(VideoFragment, fragment_rows)
+        session.commit()
+
+
 def cleanup_temp_files(file_paths: List[str]) -> None:
     """
     Clean up temporary files.
@@ -1104,13 +1284,27 @@ def cleanup_temp_files(file_paths: List[str]) -> None:
     """
     for file_path in file_paths:
         try:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                logger.info(f"Cleaned up: {file_path}")
+            os.unlink(file_path)
+            logger.info(f"Cleaned up: {file_path}")
+        except FileNotFoundError:
+            pass
         except Exception as e:
             logger.warning(f"Failed to cleanup {file_path}: {e}")
 
 
+def cleanup_task_dirs(task_id: str) -> None:
+    """
+    Remove the download and processing directories of a task.
+    
+    Args:
+        task_id: Video task ID
+    """
+    for root_dir in (settings.video_temp_dir, settings.video_processed_dir):
+        task_dir = os.path.join(root_dir, task_id)
+        shutil.rmtree(task_dir, ignore_errors=True)
+    logger.info(f"Cleaned up working directories of task {task_id}")
+
+
 @shared_task(base=VideoTask)
 def cleanup_stale_tasks() -> Dict[str, Any]:
     """
@@ -1122,8 +1316,6 @@ def cleanup_stale_tasks() -> Dict[str, Any]:
     logger.info("Starting cleanup of stale tasks")
     
     try:
-        from datetime import datetime, timedelta
-        
         # Consider tasks stuck in processing for more than 4 hours as stale (увеличено для больших видео)
         cutoff_time = datetime.utcnow() - timedelta(hours=4)
         
@@ -1131,7 +1323,6 @@ def cleanup_stale_tasks() -> Dict[str, Any]:
         
         with get_sync_db_session() as session:
             # Find stale tasks
-            from sqlalchemy import select, update
             
             result = session.execute(
                 select(VideoTaskModel).where(
@@ -1182,33 +1373,43 @@ def cleanup_old_files() -> Dict[str, Any]:
     logger.info("Starting cleanup of old files")
     
     try:
-        import shutil
-        from datetime import datetime, timedelta
-        
         # Cleanup directories
-        cleanup_dirs = ["/tmp/videos", "/tmp/processed"]
+        cleanup_dirs = [settings.video_temp_dir, settings.video_processed_dir]
         files_deleted = 0
+        dirs_deleted = 0
         space_freed_mb = 0
         
-        cutoff_time = datetime.now() - timedelta(hours=24)  # Delete files older than 24 hours
+        cutoff_time = time.time() - 24 * 3600  # Delete files older than 24 hours
         
+        # Один проход scandir по каждому корню: брошенные каталоги задач удаляем целиком
+        # (один stat на каталог), свежие каталоги принадлежат идущим задачам и не обходятся,
+        # у файлов верхнего уровня один stat даёт и время изменения, и размер
         for cleanup_dir in cleanup_dirs:
-            if os.path.exists(cleanup_dir):
-                for root, dirs, files in os.walk(cleanup_dir):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        try:
-                            file_time = datetime.fromtimestamp(os.path.getmtime(file_path))
-                            if file_time < cutoff_time:
-                                file_size = os.path.getsize(file_path)
-                                os.remove(file_path)
-                                files_deleted += 1
-                                space_freed_mb += file_size / (1024 * 1024)
-                        except Exception as e:
-                            logger.warning(f"Failed to delete {file_path}: {e}")
+            try:
+                with os.scandir(cleanup_dir) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    entry_stat = entry.stat(follow_symlinks=False)
+                    if entry_stat.st_mtime >= cutoff_time:
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        shutil.rmtree(entry.path, ignore_errors=True)
+                        dirs_deleted += 1
+                    else:
+                        os.unlink(entry.path)
+                        files_deleted += 1
+                        space_freed_mb += entry_stat.st_size / (1024 * 1024)
+                except FileNotFoundError:
+                    continue
+                except Exception as e:
+                    logger.warning(f"Failed to delete {entry.path}: {e}")
         
         cleanup_result = {
             "files_deleted": files_deleted,
+            "dirs_deleted": dirs_deleted,
             "space_freed_mb": round(space_freed_mb, 2),
             "cleanup_time": datetime.now().isoformat()
         }
@@ -1232,8 +1433,6 @@ def update_statistics() -> Dict[str, Any]:
     logger.info("Updating user statistics")
     
     try:
-        from datetime import datetime
-        
         # TODO: Implement actual statistics calculation
         # For now, return mock statistics data
         stats_result = {
@@ -1266,20 +1465,16 @@ def send_completion_notification(user_id: int, task_id: str, fragments_count: in
     logger.info(f"Sending completion notification for task {task_id} to user {user_id}")
     
     try:
-        import asyncio
-        import tempfile
-        import os
-        from aiogram import Bot
-        from aiogram.types import FSInputFile
-        from app.config.settings import settings
-        from app.bot.keyboards.main_menu import get_back_keyboard
         
         # Get actual fragments count and drive links from database
         with get_sync_db_session() as session:
-            task = session.get(VideoTaskModel, task_id)
-            if not task:
+            task_row = session.execute(
+                select(VideoTaskModel.created_at).where(VideoTaskModel.id == task_id)
+            ).first()
+            if task_row is None:
                 logger.error(f"Task {task_id} not found in database")
                 return {"error": "Task not found"}
+            task_created_at = task_row.created_at
             
             fragments = session.query(VideoFragment).filter_by(task_id=task_id).all()
             actual_fragments_count = len(fragments)
@@ -1343,7 +1538,7 @@ def send_completion_notification(user_id: int, task_id: str, fragments_count: in
             logger.info(f"Collected {len(drive_links)} drive links for notification")
         
         async def send_notification():
-            bot = Bot(token=settings.telegram_bot_token.get_secret_value())
+            bot = _get_worker_bot()
             
             # Create links file if we have drive links OR if sending files directly
             links_file_path = None
@@ -1354,7 +1549,7 @@ def send_completion_notification(user_id: int, task_id: str, fragments_count: in
                         f.write(f"🎬 Ссылки на обработанные видео\n")
                         f.write(f"📋 ID задачи: {task_id}\n")
                         f.write(f"📊 Всего фрагментов: {actual_fragments_count}\n")
-                        f.write(f"📅 Дата создания: {task.created_at.strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+                        f.write(f"📅 Дата создания: {task_created_at.strftime('%Y-%m-%d %H:%M:%S')}\n\n")
                         
                         if drive_links:
                             f.write("💡 ССЫЛКИ НА GOOGLE DRIVE:\n")
@@ -1577,14 +1772,9 @@ def send_completion_notification(user_id: int, task_id: str, fragments_count: in
                         os.unlink(links_file_path)
                     except:
                         pass
-            finally:
-                await bot.session.close()
-        
-        # Run async function
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(send_notification())
-        loop.close()
+        
+        # Run async function on the worker's long-lived loop
+        _get_worker_loop().run_until_complete(send_notification())
         
         return {
             "user_id": user_id,